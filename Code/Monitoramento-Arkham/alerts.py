@@ -0,0 +1,249 @@
+import math
+from threading import Lock
+
+import numpy as np
+
+# Alertas avaliados na ingestão, a cada amostra aceita, para todas as regras de uma vez.
+# Uma regra dispara quando o valor fica fora de [low, high] por pelo menos min_duration
+# segundos seguidos, e só volta ao normal dentro de [low + hysteresis, high - hysteresis]
+# (evita alertas piscando na borda da faixa). Depois de disparar, a mesma regra só
+# dispara de novo no mesmo dispositivo após cooldown segundos. AlertEngine.replay() aplica
+# as mesmas regras a séries já gravadas, para revisão retrospectiva.
+
+
+class AlertRule:
+    def __init__(self, name, field, low=None, high=None, hysteresis=0.0, min_duration=0.0,
+                 cooldown=0.0, requires_finger=False, message=""):
+        if low is None and high is None:
+            raise ValueError("Regra precisa de low e/ou high")
+        self.name = name
+        self.field = field
+        self.low = low
+        self.high = high
+        self.hysteresis = hysteresis
+        self.min_duration = min_duration
+        self.cooldown = cooldown
+        self.requires_finger = requires_finger  # sem dedo no sensor o valor não é avaliado
+        self.message = message
+
+
+# Faixas que o teste2.py verificava na última linha exibida
+DEFAULT_RULES = [
+    AlertRule("heart_rate", "bpm", low=60, high=100, hysteresis=3, min_duration=10, cooldown=300,
+              requires_finger=True, message="Frequência cardíaca fora do normal"),
+    AlertRule("temperature", "temperature", low=35, high=37.5, hysteresis=0.2, min_duration=30, cooldown=600,
+              message="Temperatura fora do intervalo esperado"),
+    AlertRule("spo2", "spo2", low=95, hysteresis=1, min_duration=10, cooldown=300,
+              requires_finger=True, message="Nível de oxigênio abaixo do ideal"),
+]
+
+
+class AlertState:
+    # Estado de um dispositivo: alguns floats por regra, qualquer que seja o volume de amostras
+    def __init__(self, device_id, rule_count):
+        self.device_id = device_id
+        self.active = np.zeros(rule_count, dtype=bool)
+        self.since = np.full(rule_count, np.nan)       # início da violação em curso
+        self.last_fired = np.full(rule_count, -np.inf)
+
+
+def _runs(mask):
+    # Run-length encoding de uma máscara: (inícios, fins exclusivos) dos trechos True
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _value(reading, field):
+    value = reading.get(field)
+    return np.nan if value is None else value
+
+
+class AlertEngine:
+    """Avalia um conjunto de regras sobre as leituras de cada dispositivo.
+
+    evaluate() recebe as leituras aceitas de um dispositivo (em ordem de
+    timestamp) e monta as comparações de todas as amostras x regras com NumPy;
+    só as regras com alguma violação, ou com alerta ativo que pode encerrar,
+    passam pela máquina de estados amostra a amostra. Devolve os eventos
+    "triggered"/"resolved", que publish() entrega aos assinantes.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = list(rules)
+        self.fields = [rule.field for rule in self.rules]
+        self._low = np.array([-np.inf if r.low is None else r.low for r in self.rules], dtype=np.float64)
+        self._high = np.array([np.inf if r.high is None else r.high for r in self.rules], dtype=np.float64)
+        hysteresis = np.array([r.hysteresis for r in self.rules], dtype=np.float64)
+        self._clear_low = self._low + hysteresis
+        self._clear_high = self._high - hysteresis
+        self._requires_finger = np.array([r.requires_finger for r in self.rules], dtype=bool)
+        # Os mesmos limites em floats do Python, para o caminho de uma amostra só
+        self._limits = list(zip(self._low.tolist(), self._high.tolist(),
+                                self._clear_low.tolist(), self._clear_high.tolist()))
+        self._listeners = []
+        self._active = {}  # (device_id, regra) -> evento "triggered" ainda não encerrado
+        self._lock = Lock()
+
+    def new_state(self, device_id):
+        return AlertState(device_id, len(self.rules))
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def active_alerts(self, device_id=None):
+        with self._lock:
+            return [event for (device, _), event in self._active.items() if device_id in (None, device)]
+
+    def evaluate(self, state, readings):
+        """Chamado sob o lock do dispositivo, na mesma ordem em que as leituras entram no histórico."""
+        n = len(readings)
+        if n == 0:
+            return []
+        if n == 1:
+            return self._evaluate_one(state, readings[0])
+        times = np.fromiter((r["timestamp"] for r in readings), dtype=np.float64, count=n)
+        values = np.array([[_value(r, field) for field in self.fields] for r in readings], dtype=np.float64)
+        finger = np.fromiter((r.get("has_finger", True) for r in readings), dtype=bool, count=n)
+        values[~finger[:, None] & self._requires_finger] = np.nan
+        # NaN (valor ausente) não está fora nem dentro da faixa
+        outside = (values < self._low) | (values > self._high)
+        inside = (values >= self._clear_low) & (values <= self._clear_high)
+
+        any_outside = outside.any(axis=0)
+        # Caso comum: tudo dentro da faixa e nenhum alerta ativo; só descarta violações pendentes
+        state.since[~any_outside & ~state.active] = np.nan
+        events = []
+        for j in np.flatnonzero(any_outside | (state.active & inside.any(axis=0))):
+            self._walk(state, j, times, values[:, j], outside[:, j], inside[:, j], events)
+        return events
+
+    def _evaluate_one(self, state, reading):
+        # /api/data: uma amostra por requisição; montar as matrizes custaria mais que as comparações
+        t = reading["timestamp"]
+        finger = reading.get("has_finger", True)
+        events = []
+        for j, rule in enumerate(self.rules):
+            value = reading.get(rule.field)
+            if value is None or (rule.requires_finger and not finger):
+                outside = inside = False
+            else:
+                low, high, clear_low, clear_high = self._limits[j]
+                outside = value < low or value > high
+                inside = clear_low <= value <= clear_high
+            self._step(state, j, t, value, outside, inside, events)
+        return events
+
+    def _walk(self, state, j, times, values, outside, inside, events):
+        for i in range(len(times)):
+            self._step(state, j, times[i], values[i], outside[i], inside[i], events)
+
+    def _step(self, state, j, t, value, outside, inside, events):
+        # Máquina de estados de uma regra para uma amostra
+        if state.active[j]:
+            if inside:
+                state.active[j] = False
+                state.since[j] = np.nan
+                events.append(self._event(state, j, "resolved", t, value))
+        elif outside:
+            if math.isnan(state.since[j]):
+                state.since[j] = t
+            rule = self.rules[j]
+            if t >= state.since[j] + rule.min_duration and t >= state.last_fired[j] + rule.cooldown:
+                state.active[j] = True
+                state.last_fired[j] = t
+                events.append(self._event(state, j, "triggered", t, value))
+        else:
+            state.since[j] = np.nan
+
+    def _event(self, state, j, kind, timestamp, value):
+        rule = self.rules[j]
+        event = {
+            "device_id": state.device_id,
+            "rule": rule.name,
+            "field": rule.field,
+            "state": kind,
+            "value": float(value),
+            "low": rule.low,
+            "high": rule.high,
+            "since": float(state.since[j]) if kind == "triggered" else None,
+            "timestamp": float(timestamp),
+            "message": rule.message,
+        }
+        with self._lock:
+            if kind == "triggered":
+                self._active[(state.device_id, rule.name)] = event
+            else:
+                self._active.pop((state.device_id, rule.name), None)
+        return event
+
+    def replay(self, columns, device_id=None):
+        """Episódios de alerta que as regras teriam gerado sobre uma série gravada.
+
+        columns: colunas em ordem de timestamp com "timestamp", "has_finger" e
+        os campos das regras (como devolvem SegmentStore.query e
+        service.history_columns). O resultado é o mesmo de passar a série por
+        evaluate() a partir de um estado novo, mas calculado com máscaras sobre
+        a série inteira: os trechos fora da faixa saem por run-length encoding
+        e só os longos o bastante para disparar passam pelo laço de episódios.
+        """
+        times = np.asarray(columns["timestamp"], dtype=np.float64)
+        finger = np.asarray(columns["has_finger"], dtype=bool) if "has_finger" in columns else None
+        episodes = []
+        for j, rule in enumerate(self.rules):
+            values = np.asarray(columns[rule.field], dtype=np.float64)
+            if rule.requires_finger and finger is not None:
+                values = np.where(finger, values, np.nan)
+            outside = (values < self._low[j]) | (values > self._high[j])
+            inside = (values >= self._clear_low[j]) & (values <= self._clear_high[j])
+            episodes.extend(self._replay_rule(j, device_id, times, values, outside, inside))
+        episodes.sort(key=lambda episode: episode["triggered"])
+        return episodes
+
+    def _replay_rule(self, j, device_id, times, values, outside, inside):
+        rule = self.rules[j]
+        starts, ends = _runs(outside)
+        # Amostra de cada trecho em que a violação completa min_duration; com timestamps repetidos
+        # (e min_duration=0) a busca cairia antes do início do trecho
+        due = np.maximum(np.searchsorted(times, times[starts] + rule.min_duration, side="left"), starts)
+        candidates = np.flatnonzero(due < ends)
+        inside_at = np.flatnonzero(inside)
+        episodes = []
+        last_fired = -np.inf
+        resolved = -1  # amostra que encerrou o último alerta
+        for r in candidates:
+            start, end = starts[r], ends[r]
+            if start < resolved:
+                continue  # trecho dentro de um alerta que já estava ativo
+            trigger = max(due[r], np.searchsorted(times, last_fired + rule.cooldown, side="left"))
+            if trigger >= end:
+                continue  # cooldown ainda não tinha passado
+            last_fired = times[trigger]
+            k = np.searchsorted(inside_at, trigger, side="right")
+            resolved = inside_at[k] if k < len(inside_at) else len(times)
+            episodes.append(self._episode(j, device_id, times, values, start, trigger, resolved))
+            if resolved == len(times):
+                break  # ainda ativo no fim da série
+        return episodes
+
+    def _episode(self, j, device_id, times, values, start, trigger, resolved):
+        rule = self.rules[j]
+        # Valor mais distante da faixa entre o início da violação e o encerramento
+        window = values[start:resolved]
+        worst = window[np.nanargmax(np.maximum(self._low[j] - window, window - self._high[j]))]
+        return {
+            "device_id": device_id,
+            "rule": rule.name,
+            "field": rule.field,
+            "since": float(times[start]),
+            "triggered": float(times[trigger]),
+            "resolved": float(times[resolved]) if resolved < len(times) else None,
+            "value": float(values[trigger]),
+            "worst": float(worst),
+            "samples": int(resolved - start),
+        }
+
+    def publish(self, events):
+        # Fora do lock do dispositivo: os assinantes podem fazer I/O (log, SSE)
+        for event in events:
+            for callback in self._listeners:
+                callback(event)
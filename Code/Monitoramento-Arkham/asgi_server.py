@@ -0,0 +1,221 @@
+"""Servidor assíncrono (ASGI) com o mesmo contrato HTTP do server.py.
+
+Atende /api/data, /api/data/batch, /api/latest, /api/latest/<device_id>,
+/api/history, /api/stream, /api/alerts e /metrics em um único event loop:
+conexões ociosas e clientes de streaming não ocupam uma thread cada. O log
+"arkham" sai em JSON por uma thread (logs.py) e fica em WARNING;
+ARKHAM_LOG_LEVEL=INFO inclui uma amostra das leituras recebidas.
+
+Execução (requer uvicorn):
+
+    python asgi_server.py                       # 1 processo, porta 5000
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+
+Vários processos: os dados de cada pulseira ficam na memória do processo que
+recebeu a leitura, então cada dispositivo precisa sempre cair no mesmo
+processo, tanto para gravação quanto para leitura. Suba um processo por porta
+e distribua por dispositivo no proxy, por exemplo no nginx:
+
+    upstream arkham {
+        hash $device_key consistent;
+        server 127.0.0.1:5001;
+        server 127.0.0.1:5002;
+    }
+    map $arg_device $device_key { "" $http_x_device_id; default $arg_device; }
+
+com `ARKHAM_DATA_DIR=dados-1 uvicorn asgi_server:app --port 5001` e
+`ARKHAM_DATA_DIR=dados-2 ... --port 5002` (cada processo precisa do seu
+próprio diretório de segmentos). Nesse modo as pulseiras devem enviar o
+cabeçalho X-Device-Id e os dashboards devem usar ?device= (/api/latest e
+/api/stream sem filtro mostram só um processo).
+`uvicorn --workers N` em uma única porta não preserva essa afinidade.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs
+
+import logs
+import metrics
+import service
+from streaming import KEEPALIVE_INTERVAL, SSE_KEEPALIVE, format_sse
+
+logs.configure(service.logger, os.environ.get("ARKHAM_LOG_LEVEL", "WARNING"))
+
+MAX_BODY_SIZE = 1024 * 1024
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+# Rotas com rótulo próprio nas métricas (/api/latest/<device_id> é tratada à parte)
+ROUTES = {"/api/data", "/api/data/batch", "/api/latest", "/api/history", "/api/stream", "/api/alerts", "/metrics"}
+
+
+async def read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("Cliente desconectou durante o envio")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise ValueError(f"Corpo da requisição excede {MAX_BODY_SIZE} bytes")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def request_headers(scope):
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    # resolve_device_id procura "X-Device-Id"
+    if "x-device-id" in headers:
+        headers["X-Device-Id"] = headers["x-device-id"]
+    return headers
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())] + CORS_HEADERS
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_preflight(send):
+    await send({
+        "type": "http.response.start",
+        "status": 204,
+        "headers": CORS_HEADERS + [(b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                                   (b"access-control-allow-headers", b"Content-Type, X-Device-Id")]
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def stream(receive, send, device_id, source, snapshot, event_type):
+    subscription = source.subscribe_async(device_id)
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        (b"x-accel-buffering", b"no")] + CORS_HEADERS
+        })
+        for event in snapshot(device_id):
+            chunk = format_sse(event, event_type)
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        while not disconnected.is_set():
+            event = await subscription.get(timeout=KEEPALIVE_INTERVAL)
+            chunk = SSE_KEEPALIVE if event is None else format_sse(event, event_type)
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    except OSError:
+        pass
+    finally:
+        source.unsubscribe(subscription)
+        watcher.cancel()
+
+
+def route_name(path):
+    # Rótulo das métricas: o padrão da rota, como no Flask, para não criar uma série por dispositivo
+    if path.startswith("/api/latest/"):
+        return "/api/latest/<device_id>"
+    if path in ROUTES:
+        return path
+    return "other"
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return await dispatch(scope, receive, send)
+    start = time.perf_counter()
+    status = [500]
+
+    async def send_and_record(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        await send(message)
+
+    try:
+        await dispatch(scope, receive, send_and_record)
+    finally:
+        path = scope["path"].rstrip("/") or "/"
+        metrics.observe_request(route_name(path), scope["method"], status[0], time.perf_counter() - start)
+
+
+async def dispatch(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                logging.getLogger("arkham").warning(service.describe_storage())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                service.segment_store.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    path = scope["path"].rstrip("/") or "/"
+    args = {key: values[0] for key, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+
+    if method == "OPTIONS":
+        return await send_preflight(send)
+
+    if method == "POST" and path in ("/api/data", "/api/data/batch"):
+        try:
+            body = await read_body(receive)
+        except ConnectionError:
+            return
+        except ValueError as e:
+            return await send_json(send, *service.error(str(e), 413))
+        headers = request_headers(scope)
+        handler = service.handle_data if path == "/api/data" else service.handle_batch
+        return await send_json(send, *handler(body, headers.get("content-type"), headers))
+
+    if method == "GET":
+        if path == "/metrics":
+            body = metrics.render().encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", metrics.CONTENT_TYPE.encode()),
+                            (b"content-length", str(len(body)).encode())]
+            })
+            return await send({"type": "http.response.body", "body": body})
+        if path == "/api/latest":
+            return await send_json(send, *service.handle_latest())
+        if path.startswith("/api/latest/"):
+            return await send_json(send, *service.handle_latest_device(path[len("/api/latest/"):]))
+        if path == "/api/history":
+            # Consultas longas serializam muitos pontos: saem do event loop
+            result = await asyncio.get_running_loop().run_in_executor(None, service.handle_history, args)
+            return await send_json(send, *result)
+        if path == "/api/stream":
+            return await stream(receive, send, args.get("device") or None,
+                                service.broadcaster, service.stream_snapshot, "reading")
+        if path == "/api/alerts":
+            return await stream(receive, send, args.get("device") or None,
+                                service.alert_broadcaster, service.alerts_snapshot, "alert")
+
+    await send_json(send, *service.error(f"Rota não encontrada: {method} {path}", 404))
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000, log_level="warning", access_log=False)
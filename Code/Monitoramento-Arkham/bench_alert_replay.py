@@ -0,0 +1,158 @@
+# Revisão retrospectiva de alertas: um mês de uma ala (uma amostra a cada 2 s por pulseira)
+# gravado em segmentos, relido com SegmentStore.query e avaliado com AlertEngine.replay,
+# contra a avaliação amostra a amostra (evaluate() linha por linha, como os checks do teste2.py).
+# No fim, confere replay x evaluate em séries aleatórias curtas com timestamps repetidos e
+# regras sem min_duration/cooldown, casos que a série de 2 em 2 s não exercita.
+# Uso: python bench_alert_replay.py [dispositivos] [dias]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from alerts import AlertEngine, AlertRule
+from segment_store import HEADER, HEADER_SIZE, MAGIC, RECORD_DTYPE, SEGMENT_RECORDS, SEGMENT_SUFFIX, VERSION, \
+    SegmentStore
+
+SAMPLE_INTERVAL = 2
+FIELDS = ["timestamp", "has_finger", "bpm", "temperature", "spo2"]
+
+
+def make_records(n, seed):
+    # Ruído em torno do normal, com episódios de taquicardia, febre e dessaturação
+    rng = np.random.default_rng(seed)
+    records = np.zeros(n, dtype=RECORD_DTYPE)
+    records["timestamp"] = time.time() - n * SAMPLE_INTERVAL + np.arange(n) * SAMPLE_INTERVAL
+    bpm = 78 + rng.normal(0, 4, n)
+    temperature = 36.6 + rng.normal(0, 0.08, n)
+    spo2 = 97.5 + rng.normal(0, 0.8, n)
+    for _ in range(n // 20000):
+        start, length = rng.integers(0, n), rng.integers(5, 600)
+        kind = rng.integers(3)
+        if kind == 0:
+            bpm[start:start + length] += rng.uniform(25, 50)
+        elif kind == 1:
+            temperature[start:start + length] += rng.uniform(1.2, 2.5)
+        else:
+            spo2[start:start + length] -= rng.uniform(3, 8)
+    records["bpm"] = bpm.clip(30, 220)
+    records["avg_bpm"] = records["bpm"]
+    records["temperature"] = temperature
+    records["spo2"] = spo2.clip(0, 100)
+    records["has_finger"] = rng.random(n) > 0.01
+    records["filtered_bpm"] = np.nan
+    return records
+
+
+def write_segments(directory, device_id, records):
+    # Mesmo formato que SegmentStore grava (cabeçalho + registros de largura fixa)
+    device_dir = os.path.join(directory, device_id)
+    os.makedirs(device_dir)
+    for number, offset in enumerate(range(0, len(records), SEGMENT_RECORDS), start=1):
+        with open(os.path.join(device_dir, f"{number:08d}{SEGMENT_SUFFIX}"), "wb") as f:
+            header = HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, device_id.encode("ascii"), time.time())
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(records[offset:offset + SEGMENT_RECORDS].tobytes())
+
+
+def as_readings(columns, fields=FIELDS):
+    rows = zip(*(columns[name].tolist() for name in fields))
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def per_row(engine, readings):
+    state = engine.new_state("dev")
+    events = []
+    for reading in readings:
+        events.extend(engine.evaluate(state, [reading]))
+    return events
+
+
+def as_episodes(events):
+    # Eventos triggered/resolved de evaluate() no formato dos episódios de replay(), por regra
+    episodes, open_by_rule = {}, {}
+    for e in events:
+        if e["state"] == "triggered":
+            open_by_rule[e["rule"]] = [e["since"], e["timestamp"], e["value"], None]
+            episodes.setdefault(e["rule"], []).append(open_by_rule[e["rule"]])
+        else:
+            open_by_rule.pop(e["rule"])[3] = e["timestamp"]
+    return {rule: [tuple(episode) for episode in items] for rule, items in episodes.items()}
+
+
+def check_equivalence(trials, seed=0):
+    rng = np.random.default_rng(seed)
+    for trial in range(trials):
+        n = int(rng.integers(1, 200))
+        # Passos de 0 s (timestamps repetidos, como HistoryBuffer aceita) a 3 s
+        times = np.cumsum(rng.choice([0.0, 0.0, 1.0, 2.0, 3.0], n)) + 1000
+        columns = {
+            "timestamp": times,
+            "bpm": np.round(80 + np.cumsum(rng.normal(0, 8, n))).clip(0, 250),
+            "has_finger": rng.random(n) > 0.1,
+        }
+        rules = [AlertRule(f"r{k}", "bpm", low=60, high=100, hysteresis=float(rng.choice([0, 3])),
+                           min_duration=float(rng.choice([0, 0, 2, 5])), cooldown=float(rng.choice([0, 0, 4])),
+                           requires_finger=bool(rng.integers(2)))
+                 for k in range(3)]
+        engine = AlertEngine(rules)
+        replayed = {}
+        for e in engine.replay(columns):
+            replayed.setdefault(e["rule"], []).append((e["since"], e["triggered"], e["value"], e["resolved"]))
+        expected = as_episodes(per_row(AlertEngine(rules), as_readings(columns, list(columns))))
+        assert replayed == expected, f"série {trial}: replay {replayed} != evaluate {expected}"
+    return trials
+
+
+if __name__ == '__main__':
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    days = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    n = int(days * 86400 / SAMPLE_INTERVAL)
+    engine = AlertEngine()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for d in range(devices):
+            write_segments(directory, f"leito-{d:02d}", make_records(n, d))
+        print(f"{devices} dispositivos x {days:g} dias = {devices * n:,} amostras"
+              f" ({devices * n * RECORD_DTYPE.itemsize / 2**20:.0f} MiB em segmentos)\n")
+
+        store = SegmentStore(directory)
+        start = time.perf_counter()
+        read = replayed = 0.0
+        episodes = 0
+        for device_id in store.device_ids():
+            t0 = time.perf_counter()
+            columns = store.query(device_id, fields=FIELDS)
+            t1 = time.perf_counter()
+            episodes += len(engine.replay(columns, device_id))
+            read += t1 - t0
+            replayed += time.perf_counter() - t1
+        total = time.perf_counter() - start
+        print("AlertEngine.replay sobre a ala inteira")
+        print(f"  leitura dos segmentos     {read:8.2f} s")
+        print(f"  máscaras + episódios      {replayed:8.2f} s  ({devices * n / replayed:,.0f} amostras/s)")
+        print(f"  total                     {total:8.2f} s  ({episodes} episódios)\n")
+
+        # Amostra a amostra: mede um dia de um dispositivo (a partir do primeiro episódio) e extrapola
+        device_id = store.device_ids()[0]
+        columns = store.query(device_id, fields=FIELDS)
+        first = np.searchsorted(columns["timestamp"], engine.replay(columns)[0]["since"]) if episodes else 0
+        day = {name: values[first:first + int(86400 / SAMPLE_INTERVAL)] for name, values in columns.items()}
+        readings = as_readings(day)
+        t0 = time.perf_counter()
+        events = per_row(AlertEngine(), readings)
+        elapsed = time.perf_counter() - t0
+        rate = len(readings) / elapsed
+        print("Avaliação linha por linha (evaluate() com uma amostra por vez)")
+        print(f"  {rate:,.0f} amostras/s; a ala inteira levaria ~{devices * n / rate / 60:.0f} min\n")
+
+        replayed_day = engine.replay(day, "dev")
+        triggered = [e["timestamp"] for e in events if e["state"] == "triggered"]
+        assert sorted(triggered) == sorted(e["triggered"] for e in replayed_day)
+        resolved = [e["timestamp"] for e in events if e["state"] == "resolved"]
+        assert sorted(resolved) == sorted(e["resolved"] for e in replayed_day if e["resolved"] is not None)
+        print(f"Mesmos {len(replayed_day)} episódios nas duas avaliações (1 dia de {device_id})")
+        store.close()
+
+    print(f"Mesmos episódios em {check_equivalence(300)} séries aleatórias com timestamps repetidos")
@@ -0,0 +1,84 @@
+# Vazão do AlertEngine (alerts.py) na ingestão: amostras avulsas (/api/data) e em lotes
+# (/api/data/batch) de vários dispositivos, com e sem alertas, e memória de estado por dispositivo.
+# Uso: python bench_alerts.py [dispositivos] [amostras_por_dispositivo]
+import sys
+import time
+
+import numpy as np
+
+from alerts import AlertEngine
+from device_store import DeviceStore
+
+BATCH = 100
+
+
+def make_readings(device_id, n, abnormal, seed):
+    # Sinais com ruído; em "abnormal" o BPM sai da faixa em trechos de 30 s
+    rng = np.random.default_rng(seed)
+    start = time.time() - n
+    bpm = rng.normal(80, 5, n)
+    if abnormal:
+        bpm[(np.arange(n) // 30) % 4 == 1] += 40
+    return [{
+        "device_id": device_id,
+        "temperature": float(t),
+        "bpm": int(b),
+        "avg_bpm": int(b),
+        "spo2": int(s),
+        "has_finger": bool(f),
+        "timestamp": start + i,
+    } for i, (t, b, s, f) in enumerate(zip(rng.normal(36.5, 0.2, n), bpm,
+                                            rng.normal(97, 1, n).clip(0, 100), rng.random(n) > 0.02))]
+
+
+def run(devices, per_device, abnormal, batch):
+    engine = AlertEngine()
+    events = []
+    engine.subscribe(events.append)
+    store = DeviceStore(per_device, alert_engine=engine)
+    streams = {f"dev-{d}": make_readings(f"dev-{d}", per_device, abnormal, d) for d in range(devices)}
+    start = time.perf_counter()
+    for offset in range(0, per_device, batch):
+        # Intercala os dispositivos como chegariam ao servidor
+        for device_id, readings in streams.items():
+            chunk = readings[offset:offset + batch]
+            if batch == 1:
+                store.update(chunk[0])
+            else:
+                store.update_many(device_id, chunk)
+    elapsed = time.perf_counter() - start
+    return devices * per_device / elapsed, len(events)
+
+
+def baseline(devices, per_device, abnormal, batch):
+    store = DeviceStore(per_device)
+    streams = {f"dev-{d}": make_readings(f"dev-{d}", per_device, abnormal, d) for d in range(devices)}
+    start = time.perf_counter()
+    for offset in range(0, per_device, batch):
+        for device_id, readings in streams.items():
+            chunk = readings[offset:offset + batch]
+            if batch == 1:
+                store.update(chunk[0])
+            else:
+                store.update_many(device_id, chunk)
+    return devices * per_device / (time.perf_counter() - start)
+
+
+def state_bytes(engine):
+    state = engine.new_state("dev")
+    return state.active.nbytes + state.since.nbytes + state.last_fired.nbytes
+
+
+if __name__ == '__main__':
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_device = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f"{devices} dispositivos x {per_device} amostras\n")
+    print(f"{'cenário':<34}{'sem alertas':>16}{'com AlertEngine':>18}{'eventos':>9}")
+    for batch in (1, BATCH):
+        for abnormal in (False, True):
+            without = baseline(devices, per_device, abnormal, batch)
+            rate, events = run(devices, per_device, abnormal, batch)
+            name = f"{'/api/data' if batch == 1 else f'lotes de {batch}'}, {'com' if abnormal else 'sem'} violações"
+            print(f"{name:<34}{without:>12,.0f}/s{rate:>14,.0f}/s{events:>9}")
+    print(f"\nEstado de alertas por dispositivo: {state_bytes(AlertEngine())} bytes em arrays"
+          " (independe do volume de amostras)")
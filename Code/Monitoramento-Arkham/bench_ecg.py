@@ -0,0 +1,77 @@
+# Compara o custo por atualização das funções de ECG antigas dos dashboards com o ECGGenerator (ecg.py).
+# Uso: python bench_ecg.py [numero_de_chamadas]
+import sys
+import time
+
+import numpy as np
+
+from ecg import ECGGenerator
+
+
+# === IMPLEMENTAÇÕES ANTERIORES (copiadas dos dashboards) ===
+def old_realtime_signal(bpm):
+    # dashboard-tempo-real.py: sintetiza 500 pontos para devolver só o último
+    if bpm == 0:
+        return 0
+    heart_rate = bpm / 60.0
+    t = np.linspace(0, 1.0/heart_rate, 500)
+    p_wave = 0.25 * np.sin(2 * np.pi * 5 * t) * (t < 0.2/heart_rate)
+    qrs = 1.5 * np.sin(2 * np.pi * 15 * t) * ((t >= 0.2/heart_rate) & (t < 0.25/heart_rate))
+    t_wave = 0.3 * np.sin(2 * np.pi * 2 * t) * ((t >= 0.3/heart_rate) & (t < 0.45/heart_rate))
+    ecg = p_wave + qrs + t_wave
+    return ecg[-1] + 0.05 * np.random.randn()
+
+
+def old_scope_signal(length=500, heart_rate=72, amplitude=1.5, noise=0.1):
+    # Streamlit Hands-ON/Dashboard Arkham.py
+    t = np.linspace(0, 2 * np.pi * (length / 100), length)
+    p_wave = 0.1 * np.sin(1.5 * t) * (np.sin(0.05 * t) ** 2)
+    qrs_complex = amplitude * np.sin(30 * t) * np.exp(-5 * (t % (2 * np.pi / (heart_rate / 60))))
+    t_wave = 0.2 * np.sin(0.8 * t) * (np.sin(0.05 * t) ** 10)
+    return p_wave + qrs_complex + t_wave + noise * np.random.randn(length)
+
+
+def old_window_data(heart_rate=72, duration=5, fs=250):
+    # Streamlit Hands-ON/teste.py
+    t = np.linspace(0, duration, int(duration * fs))
+    rr = 60 / heart_rate
+    p_wave = 0.25 * np.sin(2 * np.pi * 0.7 * t)
+    qrs_complex = 1.5 * np.sin(2 * np.pi * 15 * t) * np.exp(-20 * (t % rr))
+    t_wave = 0.3 * np.sin(2 * np.pi * 0.3 * t)
+    ecg = p_wave + qrs_complex + t_wave
+    ecg += 0.05 * np.random.normal(size=len(t))
+    return t, ecg
+
+
+def bench(name, func, calls, repeat=5):
+    best = min(_timed(func, calls) for _ in range(repeat))
+    print(f"{name:<44} {best / calls * 1e6:>9.1f} µs/chamada")
+    return best
+
+
+def _timed(func, calls):
+    bpms = 60 + np.arange(calls) % 40  # bpm variando como nas leituras reais
+    start = time.perf_counter()
+    for bpm in bpms:
+        func(int(bpm))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    generator = ECGGenerator(fs=250, noise=0.1)
+
+    print("Uma amostra por leitura (dashboard-tempo-real.py)")
+    old = bench("  antigo: generate_ecg_signal(bpm)", old_realtime_signal, calls)
+    new = bench("  ECGGenerator.sample(bpm)", generator.sample, calls)
+    print(f"  ganho: {old / new:.1f}x\n")
+
+    print("Segmento de 50 amostras (Dashboard Arkham.py)")
+    old = bench("  antigo: generate_ecg_signal(50, ...)", lambda bpm: old_scope_signal(50, bpm, 1.5, 0.1), calls)
+    new = bench("  ECGGenerator.next(50, ...)", lambda bpm: generator.next(50, bpm, 1.5), calls)
+    print(f"  ganho: {old / new:.1f}x\n")
+
+    print("Janela de 5 s a 250 Hz (teste.py)")
+    old = bench("  antigo: generate_ecg_data(bpm)", old_window_data, calls // 10)
+    new = bench("  ECGGenerator.next(1250, ...)", lambda bpm: generator.next(1250, bpm, 1.5), calls // 10)
+    print(f"  ganho: {old / new:.1f}x")
@@ -0,0 +1,74 @@
+# Compara a decodificação de leituras em JSON (formato do firmware) e no formato binário.
+# Uso: python bench_wire_format.py [numero_de_leituras]
+import json
+import sys
+import time
+
+from device_store import parse_reading, resolve_device_id
+from wire_format import decode_payload, encode_payload
+
+DEVICE_ID = "24:6F:28:AA:BB:CC"
+
+
+def make_readings(n):
+    now = time.time()
+    return [{
+        "timestamp": now - (n - i) * 2,
+        "temperature": 36.5 + (i % 10) / 10,
+        "bpm": 60 + i % 40,
+        "avg_bpm": 70 + i % 20,
+        "spo2": 95 + i % 5,
+        "has_finger": i % 7 != 0
+    } for i in range(n)]
+
+
+def json_bodies(readings):
+    # Um corpo por leitura, como o firmware envia hoje
+    return [json.dumps({
+        "device_id": DEVICE_ID,
+        "temperature": round(r["temperature"], 2),
+        "bpm": r["bpm"],
+        "avg_bpm": r["avg_bpm"],
+        "spo2": r["spo2"],
+        "has_finger": r["has_finger"]
+    }).encode() for r in readings]
+
+
+def binary_bodies(readings):
+    return [encode_payload(DEVICE_ID, [r]) for r in readings]
+
+
+def decode_json(bodies):
+    for body in bodies:
+        data = json.loads(body)
+        parse_reading(data, resolve_device_id(data))
+
+
+def decode_binary(bodies):
+    for body in bodies:
+        decode_payload(body)
+
+
+def bench(name, func, bodies, repeat=5):
+    best = min(_timed(func, bodies) for _ in range(repeat))
+    size = sum(len(b) for b in bodies)
+    print(f"{name:<22} {len(bodies) / best:>12,.0f} leituras/s  "
+          f"{size / len(bodies):>6.1f} bytes/leitura  {size / best / 1e6:>7.1f} MB/s")
+    return best
+
+
+def _timed(func, bodies):
+    start = time.perf_counter()
+    func(bodies)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    readings = make_readings(n)
+    t_json = bench("JSON (1 por POST)", decode_json, json_bodies(readings))
+    t_bin = bench("Binário (1 por POST)", decode_binary, binary_bodies(readings))
+    batch = [encode_payload(DEVICE_ID, readings[i:i + 100]) for i in range(0, n, 100)]
+    t_batch = min(_timed(decode_binary, batch) for _ in range(5))
+    print(f"{'Binário (lote de 100)':<22} {n / t_batch:>12,.0f} leituras/s")
+    print(f"Ganho do binário sobre JSON: {t_json / t_bin:.1f}x (individual), {t_json / t_batch:.1f}x (lote)")
@@ -1,162 +1,310 @@
 import streamlit as st
-import requests
+import json
 import time
-import plotly.graph_objects as go
+import streamlit.components.v1 as components
 from datetime import datetime
 import numpy as np
-from pykalman import KalmanFilter
+
+from ecg import MAX_BPM, MIN_BPM, R_PEAK_POSITION, WAVES, ECGGenerator
+from fetcher import BackgroundFetcher
+from ring_buffer import RingBuffer
 
 # === CONFIGURAÇÕES ===
 FLASK_SERVER = "http://IP_LOCAL:5000"
+DEVICE_ID = "default"  # identificador da pulseira (MAC enviado pelo firmware)
 UPDATE_INTERVAL = 1
-MAX_RETRIES = 3
-
-# === INICIALIZAÇÃO DO HISTÓRICO ===
-if 'data_history' not in st.session_state:
-    st.session_state.data_history = {
-        'time': [],
-        'temperature': [],
-        'bpm': [],
-        'filtered_bpm': [],
-        'avg_bpm': [],
-        'spo2': [],
-        'ecg': []
-    }
+STREAM_READ_TIMEOUT = 30  # maior que o keepalive do /api/stream (15 s)
+STALE_AFTER = 5  # segundos sem leitura nova até o aviso de dados desatualizados
+
+HISTORY_POINTS = 30   # pontos exibidos nos gráficos de sinais vitais
+ECG_FS = 100          # taxa do ECG sintético (amostras/s)
+ECG_POINTS = 500      # amostras exibidas no gráfico de ECG (5 s)
+ECG_NOISE = 0.05
+MAX_HISTORY_POINTS = 50000
+# No modo "Plotly (subplots)" cada atualização reenvia os traços inteiros: a janela enviada é limitada
+PLOTLY_MAX_POINTS = 2000
+
+# Colunas do histórico da sessão (valores ausentes ficam NaN/NaT)
+HISTORY_COLUMNS = {
+    'time': 'datetime64[ms]',
+    'temperature': np.float32,
+    'bpm': np.float32,
+    'filtered_bpm': np.float32,
+    'avg_bpm': np.float32,
+    'spo2': np.float32,
+}
 
 # === FUNÇÕES AUXILIARES ===
-def fetch_data():
-    for _ in range(MAX_RETRIES):
-        try:
-            response = requests.get(f"{FLASK_SERVER}/api/latest", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                data.setdefault('temperature', 0.0)
-                data.setdefault('bpm', 0)
-                data.setdefault('avg_bpm', 0)
-                data.setdefault('spo2', 0)
-                data.setdefault('has_finger', False)
-                data.setdefault('ecg', generate_ecg_signal(data['bpm'] if data['has_finger'] else 0))
-                return data
-        except Exception as e:
-            st.warning(f"Erro ao buscar dados: {str(e)}")
-            time.sleep(1)
-    return None
-
-def generate_ecg_signal(bpm):
-    if bpm == 0:
-        return 0
-    heart_rate = bpm / 60.0
-    t = np.linspace(0, 1.0/heart_rate, 500)
-    p_wave = 0.25 * np.sin(2 * np.pi * 5 * t) * (t < 0.2/heart_rate)
-    qrs = 1.5 * np.sin(2 * np.pi * 15 * t) * ((t >= 0.2/heart_rate) & (t < 0.25/heart_rate))
-    t_wave = 0.3 * np.sin(2 * np.pi * 2 * t) * ((t >= 0.3/heart_rate) & (t < 0.45/heart_rate))
-    ecg = p_wave + qrs + t_wave
-    return ecg[-1] + 0.05 * np.random.randn()
-
-def moving_average(data, window=5):
-    if len(data) < window:
-        return data
-    return np.convolve(data, np.ones(window)/window, mode='valid')
-
-def kalman_filter(signal):
-    if len(signal) < 2:
-        return signal
-    kf = KalmanFilter(initial_state_mean=signal[0], 
-                      initial_state_covariance=1,
-                      transition_matrices=[1],
-                      observation_matrices=[1],
-                      observation_covariance=4,
-                      transition_covariance=0.1)
-    filtered_state_means, _ = kf.filter(signal)
-    return filtered_state_means.flatten()
+def complete_data(data):
+    data.setdefault('temperature', 0.0)
+    data.setdefault('bpm', 0)
+    data.setdefault('avg_bpm', 0)
+    data.setdefault('spo2', 0)
+    data.setdefault('has_finger', False)
+    data.setdefault('filtered_bpm', None)  # calculado no servidor (ver BPM_FILTERS em service.py)
+    return data
+
+def get_fetcher(mode):
+    # Um fetcher (thread + sessão HTTP) por sessão do navegador; recriado ao trocar o modo
+    fetcher = st.session_state.get('fetcher')
+    if fetcher is None or fetcher.mode != mode or not fetcher.alive:
+        if fetcher is not None:
+            fetcher.stop()
+        fetcher = BackgroundFetcher(FLASK_SERVER, DEVICE_ID, mode=mode, interval=UPDATE_INTERVAL,
+                                    stream_timeout=STREAM_READ_TIMEOUT)
+        st.session_state.fetcher = fetcher
+    return fetcher
+
+def show_status(fetcher):
+    # Com o servidor lento ou fora do ar a página segue com os dados antigos, mostrando a idade deles
+    age = fetcher.age()
+    age_text = "nenhum dado recebido" if age is None else f"última leitura há {age:.0f} s"
+    if fetcher.last_error is not None:
+        retry = fetcher.retry_in()
+        retry_text = f"nova tentativa em {retry:.0f} s" if retry is not None else "reconectando"
+        status_ph.error(f"Erro ao conectar com o servidor de dados: {fetcher.last_error} "
+                        f"({retry_text}; {age_text})")
+    elif age is None:
+        status_ph.info("Aguardando dados do servidor...")
+    elif age > STALE_AFTER:
+        status_ph.warning(f"Sem dados novos: {age_text}")
+    else:
+        status_ph.caption(f"Última leitura há {age:.1f} s")
+
+def history_buffer(key, capacity, dtypes):
+    # Cria o buffer na primeira execução; se a janela mudar, mantém as amostras mais recentes
+    buffer = st.session_state.get(key)
+    if buffer is None:
+        buffer = RingBuffer(capacity, dtypes)
+    elif buffer.capacity != capacity:
+        buffer = buffer.resized(capacity)
+    st.session_state[key] = buffer
+    return buffer
+
+def ecg_samples(data):
+    # ECG sintético: amostras equivalentes ao tempo decorrido desde a leitura anterior
+    if 'ecg_generator' not in st.session_state:
+        st.session_state.ecg_generator = ECGGenerator(fs=ECG_FS, noise=ECG_NOISE)
+    now = time.monotonic()
+    elapsed = now - st.session_state.get('ecg_clock', now - UPDATE_INTERVAL)
+    st.session_state.ecg_clock = now
+    n = max(1, int(min(elapsed, ecg_history.capacity / ECG_FS) * ECG_FS))
+    return st.session_state.ecg_generator.next(n, data['bpm'] if data['has_finger'] else 0)
 
 # === SIDEBAR ===
 with st.sidebar:
     st.image("logo-maloca.png", use_container_width=True)
     st.image("logo-arkham.png", use_container_width=True)
+    st.header("Atualização")
+    update_mode = st.radio("Modo", ["Streaming (SSE)", "Polling"],
+                           help="Streaming recebe cada leitura assim que o servidor a aceita")
+    st.markdown("---")
     st.header("Opções de Visualização")
     show_temp = st.checkbox("Temperatura", True)
     show_bpm = st.checkbox("Frequência Cardíaca", True)
     show_spo2 = st.checkbox("Oxigenação Sanguínea", True)
     show_ecg = st.checkbox("ECG", True)
+    history_points = st.number_input("Pontos no gráfico", 10, MAX_HISTORY_POINTS, HISTORY_POINTS, step=10)
+    ecg_points = st.number_input("Amostras de ECG", 10, MAX_HISTORY_POINTS, ECG_POINTS, step=10)
+    render_mode = st.radio("Renderização", ["Incremental", "Plotly (subplots)"],
+                           help="Incremental: o navegador recebe só os pontos novos do servidor; "
+                                "Plotly: uma única figura com todos os gráficos, reenviada a cada "
+                                f"atualização (até {PLOTLY_MAX_POINTS} pontos por traço)")
     st.markdown("---")
     st.header("Filtros de Sinal")
-    apply_ma = st.checkbox("Média Móvel")
-    apply_kalman = st.checkbox("Filtro de Kalman")
+    show_filtered = st.checkbox("BPM filtrado", True,
+                                help="Rejeição de outliers, média móvel e Kalman aplicados no servidor")
+
+# === HISTÓRICO DA SESSÃO ===
+data_history = history_buffer('data_history', history_points, HISTORY_COLUMNS)
+ecg_history = history_buffer('ecg_history', ecg_points, {'ecg': np.float32})
 
 # === LAYOUT PRINCIPAL ===
 st.title('Monitor de Saúde em Tempo Real')
+status_ph = st.empty()
 col1, col2, col3, col4 = st.columns(4)
 temp_ph = col1.empty()
 bpm_ph = col2.empty()
 avg_bpm_ph = col3.empty()
 spo2_ph = col4.empty()
 
-chart_temp = st.empty() if show_temp else None
-chart_bpm = st.empty() if show_bpm else None
-chart_spo2 = st.empty() if show_spo2 else None
-chart_ecg = st.empty() if show_ecg else None
+# Gráficos: (título, eixo y, [(coluna, nome, cor)], janela de pontos)
+CHARTS = {
+    'temp': ("Temperatura Corporal", "°C", [('temperature', "Temperatura", '#FFA500')], history_points),
+    'bpm': ("Frequência Cardíaca", "BPM", [('bpm', "BPM Original", '#0000FF')]
+            + ([('filtered_bpm', "BPM Filtrado", '#008000')] if show_filtered else []), history_points),
+    'spo2': ("Oxigenação Sanguínea", "SpO2 (%)", [('spo2', "SpO2", '#800080')], history_points),
+    'ecg': ("Eletrocardiograma (ECG)", "Voltagem", [('ecg', "ECG", '#FF0000')], ecg_points),
+}
+visible_charts = [key for key, show in (('temp', show_temp), ('bpm', show_bpm),
+                                        ('spo2', show_spo2), ('ecg', show_ecg)) if show]
 
-# === LOOP PRINCIPAL ===
-while True:
-    data = fetch_data()
-    if data:
-        current_time = datetime.now().strftime("%H:%M:%S")
-
-        st.session_state.data_history['time'].append(current_time)
-        st.session_state.data_history['temperature'].append(data['temperature'])
-        st.session_state.data_history['bpm'].append(data['bpm'] if data['has_finger'] else None)
-        st.session_state.data_history['avg_bpm'].append(data['avg_bpm'])
-        st.session_state.data_history['spo2'].append(data['spo2'])
-        st.session_state.data_history['ecg'].append(data['ecg'])
-
-        for key in st.session_state.data_history:
-            max_len = 100 if key == 'ecg' else 30
-            st.session_state.data_history[key] = st.session_state.data_history[key][-max_len:]
-
-        # Aplica filtros ao BPM
-        bpm_data = [x for x in st.session_state.data_history['bpm'] if x is not None]
-        filtered_bpm = bpm_data
-
-        if apply_ma:
-            filtered_bpm = moving_average(filtered_bpm, window=5)
-        if apply_kalman:
-            filtered_bpm = kalman_filter(filtered_bpm)
-
-        st.session_state.data_history['filtered_bpm'] = list(filtered_bpm) + [None] * (len(st.session_state.data_history['bpm']) - len(filtered_bpm))
-
-        # === ATUALIZA MÉTRICAS ===
-        temp_ph.metric("Temperatura (°C)", f"{data['temperature']:.1f}")
-        bpm_ph.metric("BPM", str(data['bpm']) if data['has_finger'] else "--")
-        avg_bpm_ph.metric("Média BPM", str(data['avg_bpm']) if data['has_finger'] else "--")
-        spo2_ph.metric("SpO2 (%)", str(data['spo2']) if data['has_finger'] else "--")
-
-        # === GRÁFICOS ===
-        if show_temp:
-            fig_temp = go.Figure()
-            fig_temp.add_trace(go.Scatter(x=st.session_state.data_history['time'], y=st.session_state.data_history['temperature'], name="Temperatura", line=dict(color='orange')))
-            fig_temp.update_layout(title="Temperatura Corporal", xaxis_title="Tempo", yaxis_title="°C")
-            chart_temp.plotly_chart(fig_temp, use_container_width=True)
-
-        if show_bpm:
-            fig_bpm = go.Figure()
-            fig_bpm.add_trace(go.Scatter(x=st.session_state.data_history['time'], y=st.session_state.data_history['bpm'], name="BPM Original", line=dict(color='blue')))
-            fig_bpm.add_trace(go.Scatter(x=st.session_state.data_history['time'], y=st.session_state.data_history['filtered_bpm'], name="BPM Filtrado", line=dict(color='green', dash='dot')))
-            fig_bpm.update_layout(title="Frequência Cardíaca", xaxis_title="Tempo", yaxis_title="BPM")
-            chart_bpm.plotly_chart(fig_bpm, use_container_width=True)
-
-        if show_spo2:
-            fig_spo2 = go.Figure()
-            fig_spo2.add_trace(go.Scatter(x=st.session_state.data_history['time'], y=st.session_state.data_history['spo2'], name="SpO2", line=dict(color='purple')))
-            fig_spo2.update_layout(title="Oxigenação Sanguínea", xaxis_title="Tempo", yaxis_title="SpO2 (%)")
-            chart_spo2.plotly_chart(fig_spo2, use_container_width=True)
-
-        if show_ecg:
-            fig_ecg = go.Figure()
-            fig_ecg.add_trace(go.Scatter(y=st.session_state.data_history['ecg'], name="ECG", line=dict(color='red')))
-            fig_ecg.update_layout(title="Eletrocardiograma (ECG)", xaxis_title="Amostras", yaxis_title="Voltagem")
-            chart_ecg.plotly_chart(fig_ecg, use_container_width=True)
+# No modo incremental os gráficos são desenhados pelo navegador: a figura (layout fixo) é
+# enviada uma única vez e cada evento do /api/stream acrescenta os pontos novos com
+# Plotly.extendTraces, sem passar pelo Streamlit. O ECG sintético é gerado no próprio
+# navegador a partir do BPM de cada leitura, com os mesmos batimentos de ecg.py (ondas P-QRS-T
+# e acumulador de fase), então só as amostras novas entram no traçado.
+BROWSER_CHARTS = ('temp', 'bpm', 'spo2', 'ecg')
+FINGER_FIELDS = ('bpm', 'filtered_bpm')  # sem dedo no sensor esses pontos ficam vazios
+
+EXTEND_TRACES_JS = """
+var plot = document.getElementById('{plot_id}');
+var fields = %s, windows = %s, fingerFields = %s, ecg = %s;
+var traces = fields.map(function (_, i) { return i; });
+var ecgIndex = ecg.start, ecgPhase = 0, ecgBpm = null, ecgBeat = null, ecgClock = null;
+
+function beat(bpm) {
+    // Mesmo cálculo de ecg._template: soma de gaussianas com intervalos corrigidos por sqrt(RR)
+    var rr = 60 / Math.round(Math.min(Math.max(bpm, ecg.min_bpm), ecg.max_bpm));
+    var values = new Array(Math.round(rr * ecg.fs)).fill(0);
+    for (var i = 0; i < values.length; i++) {
+        ecg.waves.forEach(function (wave) {
+            var center = ecg.r_peak * rr + wave[0] * Math.sqrt(rr);
+            values[i] += wave[2] * Math.exp(-0.5 * Math.pow((i / ecg.fs - center) / wave[1], 2));
+        });
+    }
+    return values;
+}
+
+function ecgSamples(bpm) {
+    // Amostras equivalentes ao tempo desde a leitura anterior, continuando a fase do batimento
+    var now = performance.now() / 1000;
+    var elapsed = ecgClock === null ? ecg.interval : now - ecgClock;
+    ecgClock = now;
+    var n = Math.max(1, Math.floor(Math.min(elapsed, ecg.window / ecg.fs) * ecg.fs));
+    if (!(bpm > 0)) return new Array(n).fill(0);
+    if (bpm !== ecgBpm) { ecgBpm = bpm; ecgBeat = beat(bpm); }
+    var start = Math.round(ecgPhase * ecgBeat.length) %% ecgBeat.length, samples = [];
+    for (var k = 0; k < n; k++) {
+        var noise = Math.sqrt(-2 * Math.log(1 - Math.random())) * Math.cos(2 * Math.PI * Math.random());
+        samples.push(ecgBeat[(start + k) %% ecgBeat.length] + ecg.noise * noise);
+    }
+    ecgPhase = ((start + n) %% ecgBeat.length) / ecgBeat.length;
+    return samples;
+}
+
+var source = new EventSource(%s);
+source.addEventListener('reading', function (event) {
+    var reading = JSON.parse(event.data);
+    var time = new Date(reading.timestamp * 1000);
+    var x = [], y = [];
+    fields.forEach(function (field) {
+        if (field === 'ecg') {
+            var samples = ecgSamples(reading.has_finger ? reading.bpm : 0);
+            x.push(samples.map(function (_, k) { return ecgIndex + k; }));
+            y.push(samples);
+            ecgIndex += samples.length;
+        } else {
+            var empty = fingerFields.indexOf(field) >= 0 && !reading.has_finger;
+            x.push([time]);
+            y.push([empty ? null : reading[field]]);
+        }
+    });
+    Plotly.extendTraces(plot, {x: x, y: y}, traces, {x: windows, y: windows});
+});
+"""
+
+if render_mode == "Incremental":
+    browser_charts = [key for key in visible_charts if key in BROWSER_CHARTS]
+    python_charts = [key for key in visible_charts if key not in BROWSER_CHARTS]
+else:
+    browser_charts, python_charts = [], visible_charts
+browser_chart_ph = st.empty()
+chart_all = st.empty()
+subplot_fig = None  # figura da execução atual do script (um rerun monta outra)
+
+# === RENDERIZAÇÃO ===
+def chart_series(key, column, limit=None):
+    # Views dos buffers (sem cópia): (x, y), só as `limit` mais recentes se pedido;
+    # o ECG usa o índice da amostra como x
+    if key == 'ecg':
+        y = ecg_history.window(column)
+        x = np.arange(len(y))
+    else:
+        x, y = data_history.window('time'), data_history.window(column)
+    return (x, y) if limit is None else (x[-limit:], y[-limit:])
+
+def build_subplot_figure(keys, limit=None):
+    # Figura única com um subplot por gráfico; o layout é montado uma vez por execução.
+    # Plotly só é importado quando algum gráfico é montado (~100 ms a menos na partida)
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=len(keys), cols=1, vertical_spacing=0.08,
+                        subplot_titles=[CHARTS[key][0] for key in keys])
+    for row, key in enumerate(keys, start=1):
+        _, y_label, series, _ = CHARTS[key]
+        for column, name, color in series:
+            x, y = chart_series(key, column, limit)
+            fig.add_trace(go.Scatter(x=x, y=y, name=name, line=dict(color=color)), row=row, col=1)
+        fig.update_yaxes(title_text=y_label, row=row, col=1)
+    # uirevision mantém zoom e legenda entre as atualizações
+    fig.update_layout(height=300 * len(keys), uirevision='arkham', showlegend=True)
+    return fig
+
+def browser_chart_html(keys):
+    fig = build_subplot_figure(keys)
+    series = [(column, CHARTS[key][3]) for key in keys for column, _, _ in CHARTS[key][2]]
+    ecg = {'start': len(ecg_history.window('ecg')), 'fs': ECG_FS, 'noise': ECG_NOISE, 'window': ecg_points,
+           'interval': UPDATE_INTERVAL, 'waves': WAVES, 'r_peak': R_PEAK_POSITION,
+           'min_bpm': MIN_BPM, 'max_bpm': MAX_BPM}
+    script = EXTEND_TRACES_JS % (json.dumps([column for column, _ in series]),
+                                 json.dumps([window for _, window in series]),
+                                 json.dumps(FINGER_FIELDS),
+                                 json.dumps(ecg),
+                                 json.dumps(f"{FLASK_SERVER}/api/stream?device={DEVICE_ID}"))
+    return fig.to_html(include_plotlyjs='cdn', full_html=False, post_script=script,
+                       config={'responsive': True})
+
+def update_subplot_figure(keys):
+    # Só os dados dos traços mudam; o layout montado em build_subplot_figure é reaproveitado.
+    # plotly_chart reenvia os traços inteiros, por isso a janela fica limitada a PLOTLY_MAX_POINTS
+    global subplot_fig
+    if subplot_fig is None:
+        subplot_fig = build_subplot_figure(keys, PLOTLY_MAX_POINTS)
     else:
-        st.error("Erro ao conectar com o servidor de dados.")
+        traces = iter(subplot_fig.data)
+        for key in keys:
+            for column, _, _ in CHARTS[key][2]:
+                trace = next(traces)
+                trace.x, trace.y = chart_series(key, column, PLOTLY_MAX_POINTS)
+    chart_all.plotly_chart(subplot_fig, use_container_width=True)
+
+if browser_charts:
+    with browser_chart_ph:
+        components.html(browser_chart_html(browser_charts), height=300 * len(browser_charts) + 20)
+
+def reading_time(data):
+    # Mesma base de tempo do navegador (new Date(reading.timestamp * 1000)): hora local da leitura,
+    # não a da chegada ao dashboard; datetime.now() só quando a leitura não traz timestamp
+    timestamp = data.get('timestamp')
+    return datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
+
+def render(data):
+    finger = data['has_finger']
+    data_history.append({
+        'time': reading_time(data),
+        'temperature': data['temperature'],
+        'bpm': data['bpm'] if finger else None,
+        'filtered_bpm': data['filtered_bpm'] if finger else None,
+        'avg_bpm': data['avg_bpm'],
+        'spo2': data['spo2'],
+    })
+    ecg_history.extend({'ecg': ecg_samples(data)})
 
-    time.sleep(UPDATE_INTERVAL)
+    # === ATUALIZA MÉTRICAS ===
+    temp_ph.metric("Temperatura (°C)", f"{data['temperature']:.1f}")
+    bpm_ph.metric("BPM", str(data['bpm']) if data['has_finger'] else "--")
+    avg_bpm_ph.metric("Média BPM", str(data['avg_bpm']) if data['has_finger'] else "--")
+    spo2_ph.metric("SpO2 (%)", str(data['spo2']) if data['has_finger'] else "--")
+
+    # === GRÁFICOS ===
+    if python_charts:
+        update_subplot_figure(python_charts)
+
+# === LOOP PRINCIPAL ===
+# A rede fica na thread do fetcher: aqui só se consome a fila, sem esperar por conexões
+fetcher = get_fetcher("stream" if update_mode == "Streaming (SSE)" else "poll")
+while True:
+    for data in fetcher.drain(timeout=UPDATE_INTERVAL):
+        render(complete_data(data))
+    show_status(fetcher)
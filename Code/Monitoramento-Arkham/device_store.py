@@ -0,0 +1,257 @@
+import math
+import re
+import time
+from threading import Lock
+
+import numpy as np
+
+from history import HISTORY_FIELDS, HistoryBuffer
+from rollups import Rollups
+
+# Dispositivo usado quando a pulseira não envia identificação (firmware antigo)
+DEFAULT_DEVICE_ID = "default"
+DEVICE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+# Tolerância para relógio do dispositivo adiantado em relação ao servidor (s)
+MAX_CLOCK_SKEW = 60
+# Faixas que cabem nas colunas do histórico (uint16/uint8 e float32)
+INT_RANGES = {name: (0, int(np.iinfo(dtype).max)) for name, dtype in HISTORY_FIELDS.items()
+              if np.issubdtype(dtype, np.integer)}
+MAX_TEMPERATURE = float(np.finfo(np.float32).max)
+
+
+def empty_reading(device_id):
+    return {
+        "device_id": device_id,
+        "temperature": 0.0,
+        "bpm": 0,
+        "avg_bpm": 0,
+        "spo2": 0,
+        "has_finger": False,
+        "filtered_bpm": None,
+        "timestamp": 0
+    }
+
+
+def resolve_device_id(data, headers=None, default=DEFAULT_DEVICE_ID):
+    # Ordem de prioridade: campo "device_id" do JSON, cabeçalho X-Device-Id, padrão
+    device_id = data.get('device_id') if isinstance(data, dict) else None
+    if device_id is None and headers is not None:
+        device_id = headers.get('X-Device-Id')
+    if device_id is None:
+        return default
+    device_id = str(device_id)
+    if not DEVICE_ID_PATTERN.match(device_id):
+        raise ValueError(f"device_id inválido: {device_id!r}")
+    return device_id
+
+
+def parse_timestamp(value, now):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("timestamp deve ser numérico (epoch em segundos)")
+    timestamp = float(value)
+    if not 0 < timestamp <= now + MAX_CLOCK_SKEW:
+        raise ValueError(f"timestamp fora do intervalo aceito: {value}")
+    return timestamp
+
+
+def check_reading(reading):
+    # Valores que não cabem nas colunas do histórico são rejeitados antes de qualquer gravação
+    for name, (low, high) in INT_RANGES.items():
+        if not low <= reading[name] <= high:
+            raise ValueError(f"'{name}' fora do intervalo aceito ({low} a {high}): {reading[name]}")
+    if not abs(reading["temperature"]) <= MAX_TEMPERATURE:
+        raise ValueError(f"'temperature' inválida: {reading['temperature']}")
+    if not math.isfinite(reading["timestamp"]):
+        raise ValueError(f"timestamp inválido: {reading['timestamp']}")
+    return reading
+
+
+def parse_reading(data, device_id, timestamp=None):
+    if not isinstance(data, dict):
+        raise ValueError("Corpo da requisição deve ser um objeto JSON")
+    try:
+        reading = {
+            "device_id": device_id,
+            "temperature": float(data.get('temperature', 0.0)),
+            "bpm": int(data.get('bpm', 0)),
+            "avg_bpm": int(data.get('avg_bpm', 0)),
+            "spo2": int(data.get('spo2', 0)),
+            "has_finger": bool(data.get('has_finger', False)),
+            "timestamp": time.time() if timestamp is None else timestamp
+        }
+    except (TypeError, OverflowError) as e:
+        raise ValueError(f"Valor inválido na leitura: {e}")
+    return check_reading(reading)
+
+
+class DeviceState:
+    # Estado de uma pulseira; cada dispositivo tem seu próprio lock
+    def __init__(self, device_id, history_capacity, bpm_filter=None, alert_state=None, lock=None):
+        self.device_id = device_id
+        self.lock = Lock() if lock is None else lock
+        self.latest = empty_reading(device_id)
+        self.history = HistoryBuffer(history_capacity)
+        self.rollups = Rollups()
+        self.bpm_filter = bpm_filter
+        self.alert_state = alert_state
+
+
+class DeviceStore:
+    """Armazenamento particionado por dispositivo.
+
+    O lock global só é usado para registrar um dispositivo novo; as escritas
+    de leituras usam o lock do próprio dispositivo, então pulseiras diferentes
+    não disputam o mesmo mutex. Se houver persistence (SegmentStore), as
+    leituras aceitas são repassadas a ela na mesma ordem em que entram no
+    histórico.
+
+    filter_factory cria o pipeline de filtros de BPM de cada dispositivo
+    (ver filters.py). Ele roda uma vez por leitura aceita, sob o lock do
+    dispositivo, e o resultado vai em "filtered_bpm" junto dos valores brutos.
+
+    alert_engine (AlertEngine, ver alerts.py) avalia as regras de alerta sobre
+    as leituras aceitas, também sob o lock do dispositivo e na ordem do
+    histórico; os eventos são publicados depois de liberar o lock.
+
+    lock_factory(nome) cria os locks ("registry" e "device"), por exemplo
+    metrics.TimedLock para medir a espera por eles.
+    """
+
+    def __init__(self, history_capacity, persistence=None, filter_factory=None, alert_engine=None,
+                 lock_factory=None):
+        self.history_capacity = history_capacity
+        self.persistence = persistence
+        self.filter_factory = filter_factory
+        self.alert_engine = alert_engine
+        self.lock_factory = lock_factory or (lambda name: Lock())
+        self._devices = {}
+        self._registry_lock = self.lock_factory("registry")
+
+    def get(self, device_id):
+        return self._devices.get(device_id)
+
+    def get_or_create(self, device_id):
+        device = self._devices.get(device_id)
+        if device is None:
+            with self._registry_lock:
+                device = self._devices.get(device_id)
+                if device is None:
+                    bpm_filter = self.filter_factory() if self.filter_factory is not None else None
+                    alert_state = self.alert_engine.new_state(device_id) if self.alert_engine is not None else None
+                    device = DeviceState(device_id, self.history_capacity, bpm_filter, alert_state,
+                                         self.lock_factory("device"))
+                    self._devices[device_id] = device
+        return device
+
+    @staticmethod
+    def _ingest(device, reading):
+        # Chamado com device.lock adquirido. Tudo que pode fazer o append falhar é verificado
+        # antes, para o filtro só avançar com leituras que de fato entram no histórico
+        check_reading(reading)
+        if not device.history.accepts(reading["timestamp"]):
+            raise ValueError("Amostra fora de ordem: timestamp anterior ao último armazenado")
+        filtered = None
+        if device.bpm_filter is not None:
+            if reading["has_finger"]:
+                filtered = device.bpm_filter.update(reading["bpm"])
+            else:
+                # Dedo retirado: a próxima medição começa do zero
+                device.bpm_filter.reset()
+        reading["filtered_bpm"] = None if filtered is None else round(filtered, 2)
+        device.history.append(reading)
+        device.rollups.add(reading)
+
+    def update(self, reading):
+        device = self.get_or_create(reading["device_id"])
+        with device.lock:
+            self._ingest(device, reading)
+            device.latest = reading
+            if self.persistence is not None:
+                self.persistence.append(reading)
+            alerts = self._evaluate_alerts(device, [reading])
+        self._publish_alerts(alerts)
+        return device
+
+    def _evaluate_alerts(self, device, readings):
+        if self.alert_engine is None:
+            return []
+        return self.alert_engine.evaluate(device.alert_state, readings)
+
+    def _publish_alerts(self, alerts):
+        if alerts:
+            self.alert_engine.publish(alerts)
+
+    def seed(self, reading):
+        # Restaura a última leitura conhecida (ex.: lida do disco na inicialização) sem persistir de novo
+        device = self.get_or_create(reading["device_id"])
+        reading.setdefault("filtered_bpm", None)
+        with device.lock:
+            device.history.append(reading)
+            device.latest = reading
+
+    def update_many(self, device_id, readings):
+        """Grava várias leituras de um dispositivo com uma única aquisição do lock.
+
+        As leituras são ordenadas por timestamp; as anteriores à última amostra
+        já armazenada são rejeitadas. Retorna (aceitas, [(leitura, erro), ...]).
+        """
+        device = self.get_or_create(device_id)
+        accepted, rejected = [], []
+        with device.lock:
+            try:
+                for reading in sorted(readings, key=lambda r: r["timestamp"]):
+                    try:
+                        self._ingest(device, reading)
+                    except ValueError as e:
+                        rejected.append((reading, str(e)))
+                        continue
+                    accepted.append(reading)
+            finally:
+                # Mesmo com uma falha inesperada no meio do lote, o que entrou no histórico
+                # vira a leitura atual e é persistido: memória e disco não divergem
+                if accepted:
+                    device.latest = accepted[-1]
+                    if self.persistence is not None:
+                        self.persistence.extend(device_id, accepted)
+            alerts = self._evaluate_alerts(device, accepted)
+        self._publish_alerts(alerts)
+        return accepted, rejected
+
+    def latest(self, device_id):
+        device = self._devices.get(device_id)
+        if device is None:
+            return None
+        # A leitura é substituída por inteiro a cada POST, então ler a referência basta
+        return device.latest
+
+    def history(self, device_id, since=None, until=None, fields=None):
+        device = self._devices.get(device_id)
+        if device is None:
+            return None
+        with device.lock:
+            return device.history.query(since, until, fields)
+
+    def rollup(self, device_id, width, since, until, fields):
+        # Buckets pré-calculados do nível mais adequado, ou None se nenhum cobre o intervalo
+        device = self._devices.get(device_id)
+        if device is None:
+            return None
+        with device.lock:
+            level = device.rollups.best_level(width, since)
+            if level is None:
+                return None
+            starts, stats = level.query(since, until, fields)
+        return level.width, starts, stats
+
+    def first_timestamp(self, device_id):
+        device = self._devices.get(device_id)
+        if device is None:
+            return None
+        with device.lock:
+            return device.history.first_timestamp
+
+    def latest_all(self):
+        return {device_id: device.latest for device_id, device in list(self._devices.items())}
+
+    def device_ids(self):
+        return list(self._devices.keys())
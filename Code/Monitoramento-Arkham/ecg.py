@@ -0,0 +1,159 @@
+from functools import lru_cache
+
+import numpy as np
+
+# ECG sintético para os dashboards (visual, não é um sinal medido).
+# Um batimento é a soma de gaussianas (ondas P, Q, R, S e T); o batimento de cada
+# (bpm, amplitude, fs) é calculado uma vez e guardado em cache, e as amostras saem
+# dele por um acumulador de fase: cada chamada custa um índice circular + ruído.
+
+DEFAULT_FS = 250  # amostras por segundo
+MIN_BPM, MAX_BPM = 20, 250
+TEMPLATE_CACHE_SIZE = 128  # batimentos guardados (o menos usado é descartado)
+
+# Onda: (deslocamento em relação ao pico R em s * sqrt(RR), largura em s, altura relativa ao R)
+WAVES = (
+    (-0.16, 0.025, 0.15),   # P
+    (-0.025, 0.010, -0.15),  # Q
+    (0.0, 0.012, 1.0),      # R
+    (0.030, 0.010, -0.25),  # S
+    (0.28, 0.045, 0.30),    # T
+)
+R_PEAK_POSITION = 0.4  # posição do pico R dentro do batimento (fração do RR)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _template(bpm, amplitude, fs):
+    rr = 60.0 / bpm
+    t = np.arange(int(round(rr * fs))) / fs
+    r_peak = R_PEAK_POSITION * rr
+    # Intervalos P-R e Q-T acompanham sqrt(RR) (correção de Bazett)
+    scale = np.sqrt(rr)
+    beat = np.zeros_like(t)
+    for offset, width, height in WAVES:
+        center = r_peak + offset * scale
+        beat += height * np.exp(-0.5 * ((t - center) / width) ** 2)
+    beat *= amplitude
+    beat.flags.writeable = False  # compartilhado entre todos os geradores
+    return beat
+
+
+def beat_template(bpm, amplitude=1.0, fs=DEFAULT_FS):
+    """Um batimento completo (somente leitura); bpm e amplitude são arredondados para limitar o cache."""
+    bpm = int(round(min(max(bpm, MIN_BPM), MAX_BPM)))
+    return _template(bpm, round(float(amplitude), 2), int(fs))
+
+
+class ECGGenerator:
+    """Gera amostras contínuas de ECG a partir dos batimentos em cache.
+
+    A fase (fração do batimento atual) é mantida entre chamadas, então trocar
+    o bpm ou a amplitude não quebra o traçado. bpm <= 0 (sem dedo no sensor)
+    gera linha de base, sem ruído.
+    """
+
+    def __init__(self, fs=DEFAULT_FS, noise=0.05, seed=None):
+        self.fs = fs
+        self.noise = noise
+        self.phase = 0.0
+        self._rng = np.random.default_rng(seed)
+        self._key = None
+        self._template = None
+
+    def next(self, n, bpm, amplitude=1.0, noise=None):
+        if bpm is None or bpm <= 0:
+            return np.zeros(n)
+        if self._key != (bpm, amplitude):
+            self._key = (bpm, amplitude)
+            self._template = beat_template(bpm, amplitude, self.fs)
+        template = self._template
+        length = len(template)
+        start = int(round(self.phase * length)) % length
+        if start + n <= length:
+            samples = template[start:start + n].copy()
+        else:
+            samples = np.take(template, np.arange(start, start + n), mode="wrap")
+        self.phase = ((start + n) % length) / length
+        noise = self.noise if noise is None else noise
+        if noise:
+            samples += noise * self._rng.standard_normal(n)
+        return samples
+
+    def sample(self, bpm, amplitude=1.0):
+        return float(self.next(1, bpm, amplitude)[0])
+
+
+class SweepBuffer:
+    """Buffer da tela de ECG com ponteiro de escrita, sem realocação a cada atualização.
+
+    write() grava as amostras novas no ponteiro e volta ao início ao chegar no
+    fim (no máximo duas cópias de fatia). O traçado é montado só na renderização:
+    sweep() desenha como um monitor de beira de leito (a tela é percorrida da
+    esquerda para a direita, com um vão logo após o ponteiro) e scroll() devolve
+    a janela em ordem cronológica. Ambos reduzem o traçado a no máximo
+    2 * max_points pontos (mínimo e máximo de cada grupo, preservando os picos R),
+    então o custo de desenho não cresce com a duração da janela ou com a taxa.
+    """
+
+    def __init__(self, capacity, fs=DEFAULT_FS, max_points=1000, gap_seconds=0.05):
+        self.capacity = capacity
+        self.fs = fs
+        self.max_points = max_points
+        self.gap = max(1, int(gap_seconds * fs))
+        self.data = np.full(capacity, np.nan)
+        self.pos = 0
+        self._size = 0
+        self._step = max(1, -(-capacity // max_points))
+        # Eixo x (s) do traçado; com redução, dois pontos (mín e máx) por grupo
+        starts = np.arange(0, capacity, self._step) / fs
+        self._x = starts if self._step == 1 else np.repeat(starts, 2)
+        self._per_group = 1 if self._step == 1 else 2
+
+    def write(self, samples):
+        samples = np.asarray(samples)[-self.capacity:]
+        n = len(samples)
+        first = min(n, self.capacity - self.pos)
+        self.data[self.pos:self.pos + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.pos = (self.pos + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def _reduce(self, values):
+        if self._step == 1:
+            return values.copy()
+        # fmin/fmax ignoram os NaN da tela ainda não preenchida
+        pad = -len(values) % self._step
+        groups = np.concatenate((values, np.full(pad, np.nan))) if pad else values
+        groups = groups.reshape(-1, self._step)
+        # Uma operação vetorial por coluna do grupo (mais rápido que reduzir linhas curtas)
+        low, high = groups[:, 0].copy(), groups[:, 0].copy()
+        for j in range(1, self._step):
+            np.fmin(low, groups[:, j], out=low)
+            np.fmax(high, groups[:, j], out=high)
+        out = np.empty(2 * len(groups))
+        out[0::2], out[1::2] = low, high
+        return out
+
+    def sweep(self):
+        # (x em s, y) na posição fixa da tela; o vão marca onde a próxima amostra será escrita
+        y = self._reduce(self.data)
+        gap_start = self._per_group * -(-self.pos // self._step)
+        gap_stop = self._per_group * -(-(self.pos + self.gap) // self._step)
+        y[gap_start:max(gap_stop, gap_start + self._per_group)] = np.nan
+        return self._x[:len(y)], y
+
+    def scroll(self):
+        # (x em s, y) da amostra mais antiga para a mais recente; a cópia contígua só existe aqui
+        ordered = np.concatenate((self.data[self.pos:], self.data[:self.pos]))
+        y = self._reduce(ordered)
+        return self._x[:len(y)], y
+
+    def resized(self, capacity, fs=None, max_points=None):
+        # Nova tela com outra janela/taxa, mantendo as amostras mais recentes
+        buffer = SweepBuffer(capacity, self.fs if fs is None else fs,
+                             self.max_points if max_points is None else max_points,
+                             self.gap / self.fs)
+        if self._size:
+            ordered = np.concatenate((self.data[self.pos:], self.data[:self.pos]))
+            buffer.write(ordered[-self._size:])
+        return buffer
@@ -0,0 +1,139 @@
+import json
+import queue
+import random
+import time
+from threading import Event, Thread
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Espera entre tentativas depois de falhas consecutivas: BASE_BACKOFF * 2^(n-1), até MAX_BACKOFF
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30
+# Leituras guardadas enquanto a página não consome; acima disso as mais antigas são descartadas
+QUEUE_SIZE = 256
+# Sem nenhum drain() nesse tempo a sessão do navegador acabou: a thread encerra sozinha
+IDLE_TIMEOUT = 60
+
+
+class BackgroundFetcher:
+    """Busca leituras do servidor em uma thread e as entrega por uma fila.
+
+    Uma única requests.Session (keep-alive, pool de conexões) é usada por
+    fetcher. Falhas não bloqueiam quem renderiza: a thread espera com backoff
+    exponencial e a página continua mostrando os dados antigos, com a idade
+    informada por age().
+
+    mode="stream" lê o /api/stream (SSE); mode="poll" consulta
+    /api/latest/<device_id> a cada `interval` segundos.
+    """
+
+    def __init__(self, base_url, device_id, mode="stream", interval=1.0, timeout=2, stream_timeout=30):
+        self.base_url = base_url
+        self.device_id = device_id
+        self.mode = mode
+        self.interval = interval
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = None
+        self._received_at = None
+        self._drained_at = time.monotonic()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name=f"fetcher-{device_id}", daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def age(self):
+        # Segundos desde a última leitura recebida (None se nenhuma chegou ainda)
+        if self._received_at is None:
+            return None
+        return time.monotonic() - self._received_at
+
+    def retry_in(self):
+        if self.retry_at is None:
+            return None
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def drain(self, timeout=None):
+        """Devolve todas as leituras pendentes, esperando até `timeout` s pela primeira."""
+        self._drained_at = time.monotonic()
+        readings = []
+        try:
+            readings.append(self.queue.get(timeout=timeout))
+            while True:
+                readings.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return readings
+
+    def stop(self):
+        self._stop.set()
+        self.session.close()
+
+    # === THREAD ===
+    def _idle(self):
+        return time.monotonic() - self._drained_at > IDLE_TIMEOUT
+
+    def _put(self, reading):
+        self._received_at = time.monotonic()
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = None
+        while True:
+            try:
+                self.queue.put_nowait(reading)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while not self._stop.is_set() and not self._idle():
+            try:
+                if self.mode == "stream":
+                    self._stream()
+                else:
+                    self._poll()
+                    self._stop.wait(self.interval)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                self.failures += 1
+                self.last_error = str(e)
+                delay = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (self.failures - 1))
+                delay *= random.uniform(0.5, 1.0)  # jitter: dashboards não reconectam todos juntos
+                self.retry_at = time.monotonic() + delay
+                self._stop.wait(delay)
+        self.session.close()
+
+    def _poll(self):
+        response = self.session.get(f"{self.base_url}/api/latest/{self.device_id}", timeout=self.timeout)
+        response.raise_for_status()
+        self._put(response.json())
+
+    def _stream(self):
+        with self.session.get(f"{self.base_url}/api/stream", params={"device": self.device_id},
+                              stream=True, timeout=(self.timeout, self.stream_timeout)) as response:
+            response.raise_for_status()
+            event_data = []
+            for line in response.iter_lines(decode_unicode=True):
+                if self._stop.is_set() or self._idle():
+                    return
+                if line.startswith("data:"):
+                    event_data.append(line[5:].strip())
+                elif line == "" and event_data:
+                    self._put(json.loads("\n".join(event_data)))
+                    event_data = []
+        raise ConnectionError("Servidor encerrou o streaming")
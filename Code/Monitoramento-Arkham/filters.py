@@ -0,0 +1,102 @@
+from collections import deque
+
+# Filtros de sinal incrementais: cada amostra nova custa O(1), sem reprocessar o histórico.
+# Para a mesma sequência de entrada, os resultados são os mesmos de
+# np.convolve(x, np.ones(w)/w, mode='valid') (depois que a janela enche) e de
+# pykalman.KalmanFilter.filter com matrizes escalares [1] (a menos de arredondamento
+# de ponto flutuante).
+
+
+class MovingAverage:
+    # Média móvel com soma acumulada. Enquanto a janela não enche (início e depois de cada
+    # reset) devolve a própria amostra, como a versão em lote fazia com len(data) < window
+    def __init__(self, window=5):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+
+    def update(self, value):
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        if len(self._values) < self.window:
+            return value
+        return self._sum / self.window
+
+    def reset(self):
+        self._values.clear()
+        self._sum = 0.0
+
+
+class ScalarKalman:
+    # Filtro de Kalman 1D (modelo de passeio aleatório); a primeira amostra é o estado inicial
+    def __init__(self, initial_state_covariance=1, observation_covariance=4, transition_covariance=0.1):
+        self.initial_state_covariance = initial_state_covariance
+        self.observation_covariance = observation_covariance
+        self.transition_covariance = transition_covariance
+        self.mean = None
+        self.covariance = None
+
+    def update(self, value):
+        if self.mean is None:
+            predicted_mean = value
+            predicted_covariance = self.initial_state_covariance
+        else:
+            predicted_mean = self.mean
+            predicted_covariance = self.covariance + self.transition_covariance
+        gain = predicted_covariance / (predicted_covariance + self.observation_covariance)
+        self.mean = predicted_mean + gain * (value - predicted_mean)
+        self.covariance = (1 - gain) * predicted_covariance
+        return self.mean
+
+    def reset(self):
+        self.mean = None
+        self.covariance = None
+
+
+class OutlierRejector:
+    """Descarta leituras fora da faixa fisiológica ou muito longe da mediana recente (Hampel).
+
+    Toda leitura dentro da faixa entra na janela, mesmo quando rejeitada, para que
+    uma mudança real de patamar passe a ser aceita depois de alguns segundos.
+    """
+
+    def __init__(self, window=7, threshold=3.0, min_deviation=10, min_value=25, max_value=250):
+        self.threshold = threshold
+        self.min_deviation = min_deviation
+        self.min_value = min_value
+        self.max_value = max_value
+        self._values = deque(maxlen=window)
+
+    def update(self, value):
+        if not self.min_value <= value <= self.max_value:
+            return None
+        outlier = False
+        if len(self._values) >= 3:
+            ordered = sorted(self._values)
+            median = ordered[len(ordered) // 2]
+            mad = sorted(abs(v - median) for v in ordered)[len(ordered) // 2]
+            outlier = abs(value - median) > max(self.threshold * 1.4826 * mad, self.min_deviation)
+        self._values.append(value)
+        return None if outlier else value
+
+    def reset(self):
+        self._values.clear()
+
+
+class FilterPipeline:
+    # Encadeia filtros; devolve None enquanto algum estágio ainda não tem saída
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    def update(self, value):
+        for stage in self.stages:
+            if value is None:
+                return None
+            value = stage.update(value)
+        return value
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Colunas guardadas por amostra e seus tipos (define o custo fixo de memória)
+HISTORY_FIELDS = {
+    "timestamp": np.float64,
+    "temperature": np.float32,
+    "bpm": np.uint16,
+    "avg_bpm": np.uint16,
+    "spo2": np.uint8,
+    "has_finger": np.bool_,
+    "filtered_bpm": np.float32,  # NaN quando o filtro ainda não tem saída
+}
+
+# Colunas de ponto flutuante são arredondadas na serialização
+_FLOAT_DECIMALS = {"temperature": 2, "filtered_bpm": 2}
+# Colunas em que NaN representa "sem valor" (null no JSON)
+_NULLABLE = {"filtered_bpm"}
+
+
+def bytes_per_sample():
+    return sum(np.dtype(dtype).itemsize for dtype in HISTORY_FIELDS.values())
+
+
+class HistoryBuffer:
+    """Buffer circular de amostras de um dispositivo em colunas pré-alocadas.
+
+    A memória é fixada na criação (capacity * bytes_per_sample()). Quando o
+    buffer enche, a amostra mais antiga é sobrescrita. Os timestamps precisam
+    chegar em ordem não decrescente para que as consultas por intervalo usem
+    busca binária.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in HISTORY_FIELDS.items()}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    @property
+    def first_timestamp(self):
+        if self._size == 0:
+            return None
+        return float(self.columns["timestamp"][self._next if self._size == self.capacity else 0])
+
+    @property
+    def last_timestamp(self):
+        if self._size == 0:
+            return None
+        return float(self.columns["timestamp"][self._next - 1])
+
+    def accepts(self, timestamp):
+        last = self.last_timestamp
+        return last is None or timestamp >= last
+
+    def append(self, reading):
+        if not self.accepts(reading["timestamp"]):
+            raise ValueError("Amostra fora de ordem: timestamp anterior ao último armazenado")
+        i = self._next
+        for name, column in self.columns.items():
+            value = reading.get(name)
+            column[i] = np.nan if value is None and name in _NULLABLE else value
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _segments(self):
+        # Trechos (início, fim) do array em ordem cronológica
+        if self._size < self.capacity:
+            return [(0, self._size)]
+        if self._next == 0:
+            return [(0, self.capacity)]
+        return [(self._next, self.capacity), (0, self._next)]
+
+    def query(self, since=None, until=None, fields=None):
+        """Retorna as colunas pedidas com since <= timestamp <= until."""
+        fields = list(HISTORY_FIELDS) if fields is None else fields
+        timestamps = self.columns["timestamp"]
+        slices = []
+        for start, stop in self._segments():
+            segment = timestamps[start:stop]
+            lo = 0 if since is None else int(np.searchsorted(segment, since, side="left"))
+            hi = len(segment) if until is None else int(np.searchsorted(segment, until, side="right"))
+            if lo < hi:
+                slices.append((start + lo, start + hi))
+        result = {}
+        for name in fields:
+            column = self.columns[name]
+            parts = [column[lo:hi] for lo, hi in slices]
+            result[name] = np.concatenate(parts) if parts else column[:0].copy()
+        return result
+
+
+def to_json_columns(columns):
+    out = {}
+    for name, values in columns.items():
+        if name in _NULLABLE:
+            rounded = np.round(values.astype(np.float64), _FLOAT_DECIMALS[name])
+            out[name] = [None if v != v else v for v in rounded.tolist()]
+        elif name in _FLOAT_DECIMALS:
+            out[name] = np.round(values.astype(np.float64), _FLOAT_DECIMALS[name]).tolist()
+        else:
+            out[name] = values.tolist()
+    return out
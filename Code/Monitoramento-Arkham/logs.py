@@ -0,0 +1,74 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Log do servidor em JSON (um objeto por linha), gravado por uma thread: a requisição só
+# enfileira o registro. Registros marcados com extra={"sampled": True} (um por amostra
+# recebida) passam só 1 a cada LOG_SAMPLE_EVERY; avisos e erros passam sempre.
+
+LOG_SAMPLE_EVERY = 100
+LOG_QUEUE_SIZE = 10000
+
+# Atributos padrão do LogRecord; o resto veio de extra= e vai para o JSON
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "sampled"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RESERVED)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    # 1 a cada `every` registros com sampled=True; os demais passam todos
+    def __init__(self, every=LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = every
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return next(self._counter) % self.every == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # A formatação fica para a thread do QueueListener; os dicts passados em extra=
+    # não devem ser alterados depois do log (as leituras não são)
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # fila cheia: descarta em vez de segurar a requisição
+
+
+def configure(logger, level=logging.INFO, sample_every=LOG_SAMPLE_EVERY, stream=None):
+    """Liga `logger` a um handler assíncrono com saída em JSON; devolve o QueueListener."""
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    handler = _QueueHandler(log_queue)
+    logger.handlers = [handler]
+    logger.filters = [f for f in logger.filters if not isinstance(f, SampleFilter)]
+    logger.addFilter(SampleFilter(sample_every))
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,248 @@
+import bisect
+import time
+from threading import Lock
+
+import numpy as np
+
+# Métricas do servidor no formato texto do Prometheus (GET /metrics), sem dependências:
+# contadores e histogramas com rótulos, atualizados no caminho de ingestão com um lock
+# por série. Taxas (ex.: amostras/s por dispositivo) saem de rate() sobre os contadores.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOCK_WAIT_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 0.01, 0.1, 1.0)
+PAYLOAD_BUCKETS = (64, 128, 256, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+# Rotas de streaming: contadas, mas a duração da conexão não entra no histograma de latência
+STREAM_ROUTES = {"/api/stream", "/api/alerts"}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = Lock()
+
+    def labels(self, *values):
+        # A série de cada combinação de rótulos é criada uma vez; guarde o retorno no caminho quente
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.label_names, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, label_names, values):
+        return [f"{name}{_labels(label_names, values)} {_number(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "zeros", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # o último é o +Inf
+        self.sum = 0.0
+        self.zeros = None  # função com o total de observações de valor 0 contadas fora do histograma
+        self._lock = Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def observe_many(self, values):
+        # Lote de valores (ex.: atraso de cada amostra de um /api/data/batch) em uma aquisição do lock
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.bincount(np.searchsorted(self.buckets, values, side="left"), minlength=len(self.counts))
+        total = float(values.sum())
+        with self._lock:
+            for i, n in enumerate(counts.tolist()):
+                self.counts[i] += n
+            self.sum += total
+
+    def render(self, name, label_names, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        if self.zeros is not None:
+            counts[bisect.bisect_left(self.buckets, 0.0)] += self.zeros()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(label_names, values, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, values)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(label_names, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labels=()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class Gauge(_Metric):
+    # Valor lido na hora da coleta (ex.: número de dispositivos); function devolve {rótulos: valor}
+    kind = "gauge"
+
+    def __init__(self, name, help, function, labels=()):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.function().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, values)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "arkham_http_requests_total", "Requisições HTTP por rota, método e status", ("route", "method", "status")))
+REQUEST_LATENCY = registry.register(Histogram(
+    "arkham_http_request_duration_seconds", "Tempo de atendimento por rota (sem as rotas de streaming)",
+    LATENCY_BUCKETS, ("route", "method")))
+PAYLOAD_BYTES = registry.register(Histogram(
+    "arkham_ingest_payload_bytes", "Tamanho do corpo das requisições de ingestão", PAYLOAD_BUCKETS, ("route",)))
+SAMPLES = registry.register(Counter(
+    "arkham_samples_total", "Amostras aceitas por dispositivo (amostras/s: rate())", ("device_id",)))
+REJECTED = registry.register(Counter(
+    "arkham_samples_rejected_total", "Amostras rejeitadas na validação ou por estarem fora de ordem", ("route",)))
+SENSOR_LAG = registry.register(Histogram(
+    "arkham_sensor_lag_seconds", "Atraso entre o timestamp do dispositivo e a chegada ao servidor",
+    LAG_BUCKETS))
+LOCK_WAIT = registry.register(Histogram(
+    "arkham_lock_wait_seconds", "Espera para adquirir os locks do armazenamento", LOCK_WAIT_BUCKETS, ("lock",)))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render():
+    return registry.render()
+
+
+def observe_request(route, method, status, seconds):
+    REQUESTS.labels(route, method, str(status)).inc()
+    if route not in STREAM_ROUTES:
+        REQUEST_LATENCY.labels(route, method).observe(seconds)
+
+
+# TimedLocks por nome, para somar as aquisições sem disputa na coleta. Referências fortes:
+# o histograma não pode diminuir quando um lock some (e os dispositivos nunca são removidos)
+_timed_locks = {}
+_timed_locks_lock = Lock()
+
+
+def _uncontended(name):
+    with _timed_locks_lock:
+        locks = list(_timed_locks[name])
+    return sum(lock.uncontended for lock in locks)
+
+
+class TimedLock:
+    """Lock que registra em LOCK_WAIT quanto cada aquisição esperou.
+
+    A aquisição sem disputa é tentada primeiro (acquire não bloqueante) e
+    conta como espera zero: só incrementa um contador do próprio lock, já
+    protegido por ele, somado ao histograma na coleta. Assim os locks de
+    dispositivos diferentes não passam pelo lock de uma série compartilhada.
+    """
+
+    __slots__ = ("_lock", "_wait", "uncontended")
+
+    def __init__(self, name):
+        self._lock = Lock()
+        self._wait = LOCK_WAIT.labels(name)
+        self.uncontended = 0
+        with _timed_locks_lock:
+            if name not in _timed_locks:
+                _timed_locks[name] = []
+                self._wait.zeros = lambda: _uncontended(name)
+            _timed_locks[name].append(self)
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self.uncontended += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        self._wait.observe(time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
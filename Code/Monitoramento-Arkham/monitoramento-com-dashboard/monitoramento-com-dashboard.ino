@@ -1,5 +1,7 @@
 #include <WiFi.h>
 #include <HTTPClient.h>
+#include <time.h>
+#include <sys/time.h>
 #include <Wire.h>
 #include <Adafruit_GFX.h>
 #include <Adafruit_SSD1306.h>
@@ -10,6 +12,14 @@
 const char* ssid = "Nome da rede Wifi";
 const char* password = "Senha";
 const char* serverUrl = "http://SEU_IP_LOCAL:5000/api/data";
+const char* batchUrl = "http://SEU_IP_LOCAL:5000/api/data/batch";
+const char* ntpServer = "pool.ntp.org";
+
+// 1 = envia leituras no formato binário (wire_format.py no servidor), 0 = JSON
+#define USE_BINARY_FORMAT 0
+
+// Identificador da pulseira (MAC do ESP32), preenchido no setup
+String deviceId;
 
 // Endereço I2C do MAX30205
 const uint8_t MAX30205_ADDRESS = 0x48;
@@ -45,6 +55,20 @@ int beatAvg;
 unsigned long lastDataSend = 0;
 const unsigned long SEND_INTERVAL = 2000; 
 
+// Amostras guardadas enquanto o WiFi/servidor está indisponível (enviadas em lote)
+struct PendingSample {
+  double timestamp;
+  float temp;
+  int bpm;
+  int avgBpm;
+  int spo2;
+  bool hasFinger;
+};
+#define PENDING_SIZE 60 // 2 minutos de amostras com SEND_INTERVAL de 2 s
+PendingSample pendingSamples[PENDING_SIZE];
+int pendingStart = 0;
+int pendingCount = 0;
+
 // Variável de calibração da temperatura
 float calibrationOffset = 0.0;
 
@@ -57,6 +81,12 @@ void setupHeartSensor();
 void readHeartRateAndSpO2();
 void scanI2C();
 void sendDataToServer(float temp, int bpm, int avgBpm, int spo2, bool hasFinger);
+bool postSample(double timestamp, float temp, int bpm, int avgBpm, int spo2, bool hasFinger);
+void bufferSample(double timestamp, float temp, int bpm, int avgBpm, int spo2, bool hasFinger);
+bool flushPendingSamples();
+void dropPendingSamples(int count);
+bool clockSynced();
+double currentTimestamp();
 void connectToWiFi();
 void reconnectWiFiIfNeeded();
 
@@ -79,6 +109,8 @@ void setup() {
 
   // Conecta ao WiFi
   connectToWiFi();
+  deviceId = WiFi.macAddress();
+  configTime(0, 0, ntpServer); // timestamps em UTC para o envio em lote
 
   // Verifica dispositivos I2C
   scanI2C();
@@ -390,35 +422,177 @@ void updateDisplay(float temperature, bool alert, int bpm, int avgBpm, int spo2,
 
 // Envia dados para o servidor Flask
 void sendDataToServer(float temp, int bpm, int avgBpm, int spo2, bool hasFinger) {
-  if (WiFi.status() == WL_CONNECTED) {
-    HTTPClient http;
-    
-    // Cria o objeto JSON para enviar
-    String httpRequestData = "{\"temperature\":" + String(temp, 2) + 
-                            ",\"bpm\":" + String(bpm) + 
-                            ",\"avg_bpm\":" + String(avgBpm) + 
-                            ",\"spo2\":" + String(spo2) + 
-                            ",\"has_finger\":" + String(hasFinger ? "true" : "false") + 
-                            "}";
-    
-    http.begin(serverUrl);
-    http.addHeader("Content-Type", "application/json");
-    
-    int httpResponseCode = http.POST(httpRequestData);
-    
-    if (httpResponseCode > 0) {
-      String response = http.getString();
-      Serial.println("Dados enviados com sucesso!");
-      Serial.println("Resposta do servidor: " + response);
+  // Sem hora sincronizada não dá para enviar em lote: envia direto e o servidor usa a hora dele
+  if (!clockSynced()) {
+    if (WiFi.status() == WL_CONNECTED) {
+      postSample(0, temp, bpm, avgBpm, spo2, hasFinger);
     } else {
-      Serial.print("Erro no envio: ");
-      Serial.println(httpResponseCode);
+      Serial.println("WiFi desconectado - dados não enviados");
     }
-    
-    http.end();
+    return;
+  }
+
+  // O mesmo relógio carimba as amostras ao vivo e as guardadas, então o lote atrasado
+  // nunca fica "fora de ordem" em relação ao que já foi enviado
+  double now = currentTimestamp();
+
+  if (WiFi.status() != WL_CONNECTED) {
+    bufferSample(now, temp, bpm, avgBpm, spo2, hasFinger);
+    Serial.println("WiFi desconectado - amostra guardada para envio em lote");
+    return;
+  }
+
+  if (pendingCount > 0) {
+    // Há amostras atrasadas: envia tudo, incluindo a atual, em uma única requisição
+    bufferSample(now, temp, bpm, avgBpm, spo2, hasFinger);
+    flushPendingSamples();
+    return;
+  }
+
+  if (!postSample(now, temp, bpm, avgBpm, spo2, hasFinger)) {
+    bufferSample(now, temp, bpm, avgBpm, spo2, hasFinger);
+  }
+}
+
+// Envia uma leitura para /api/data (timestamp 0 = sem hora sincronizada); retorna false se o servidor não respondeu
+bool postSample(double timestamp, float temp, int bpm, int avgBpm, int spo2, bool hasFinger) {
+  HTTPClient http;
+
+#if USE_BINARY_FORMAT
+  // Cabeçalho "AK" | versão | tamanho do id | id, seguido de um registro de 18 bytes
+  uint8_t payload[4 + 64 + 18];
+  size_t idLength = min((size_t)deviceId.length(), (size_t)64);
+  size_t pos = 0;
+  payload[pos++] = 'A';
+  payload[pos++] = 'K';
+  payload[pos++] = 1;
+  payload[pos++] = (uint8_t)idLength;
+  memcpy(payload + pos, deviceId.c_str(), idLength);
+  pos += idLength;
+  uint16_t bpm16 = bpm, avg16 = avgBpm;
+  uint8_t spo2u8 = spo2, flags = hasFinger ? 1 : 0;
+  memcpy(payload + pos, &timestamp, 8); pos += 8; // ESP32 é little-endian, como o formato
+  memcpy(payload + pos, &temp, 4); pos += 4;
+  memcpy(payload + pos, &bpm16, 2); pos += 2;
+  memcpy(payload + pos, &avg16, 2); pos += 2;
+  payload[pos++] = spo2u8;
+  payload[pos++] = flags;
+
+  http.begin(serverUrl);
+  http.addHeader("Content-Type", "application/vnd.arkham.sample");
+  int httpResponseCode = http.POST(payload, pos);
+#else
+  // Cria o objeto JSON para enviar
+  String httpRequestData = "{\"device_id\":\"" + deviceId + "\"" +
+                          ",\"temperature\":" + String(temp, 2) + 
+                          ",\"bpm\":" + String(bpm) + 
+                          ",\"avg_bpm\":" + String(avgBpm) + 
+                          ",\"spo2\":" + String(spo2) + 
+                          ",\"has_finger\":" + String(hasFinger ? "true" : "false");
+  if (timestamp > 0) {
+    httpRequestData += ",\"timestamp\":" + String(timestamp, 3);
+  }
+  httpRequestData += "}";
+
+  http.begin(serverUrl);
+  http.addHeader("Content-Type", "application/json");
+
+  int httpResponseCode = http.POST(httpRequestData);
+#endif
+
+  if (httpResponseCode > 0) {
+    String response = http.getString();
+    Serial.println("Dados enviados com sucesso!");
+    Serial.println("Resposta do servidor: " + response);
+  } else {
+    Serial.print("Erro no envio: ");
+    Serial.println(httpResponseCode);
+  }
+
+  http.end();
+  return httpResponseCode > 0 && httpResponseCode < 500;
+}
+
+// Guarda uma amostra no buffer circular; quando cheio, descarta a mais antiga
+void bufferSample(double timestamp, float temp, int bpm, int avgBpm, int spo2, bool hasFinger) {
+  int index = (pendingStart + pendingCount) % PENDING_SIZE;
+  if (pendingCount == PENDING_SIZE) {
+    pendingStart = (pendingStart + 1) % PENDING_SIZE;
   } else {
-    Serial.println("WiFi desconectado - dados não enviados");
+    pendingCount++;
+  }
+  pendingSamples[index] = {timestamp, temp, bpm, avgBpm, spo2, hasFinger};
+}
+
+// Envia as amostras guardadas para /api/data/batch em uma única requisição
+bool flushPendingSamples() {
+  String body = "{\"device_id\":\"" + deviceId + "\",\"samples\":[";
+  for (int i = 0; i < pendingCount; i++) {
+    PendingSample& sample = pendingSamples[(pendingStart + i) % PENDING_SIZE];
+    if (i > 0) body += ",";
+    body += "{\"timestamp\":" + String(sample.timestamp, 3) +
+            ",\"temperature\":" + String(sample.temp, 2) +
+            ",\"bpm\":" + String(sample.bpm) +
+            ",\"avg_bpm\":" + String(sample.avgBpm) +
+            ",\"spo2\":" + String(sample.spo2) +
+            ",\"has_finger\":" + String(sample.hasFinger ? "true" : "false") +
+            "}";
   }
+  body += "]}";
+
+  HTTPClient http;
+  http.begin(batchUrl);
+  http.addHeader("Content-Type", "application/json");
+  int httpResponseCode = http.POST(body);
+  String response = httpResponseCode > 0 ? http.getString() : "";
+  http.end();
+
+  // Só uma resposta com o resultado por amostra ("accepted"/"errors", em 200 ou 400) encerra o lote:
+  // as aceitas foram gravadas e as listadas em "errors" são inválidas (reenviar não adianta).
+  // Qualquer outra resposta (5xx, 413, proxy...) mantém todas no buffer para a próxima tentativa.
+  if (response.indexOf("\"accepted\"") < 0) {
+    Serial.print("Erro no envio do lote: ");
+    Serial.println(httpResponseCode);
+    return false;
+  }
+
+  int sent = pendingCount;
+  int rejected = 0;
+  for (int pos = response.indexOf("\"index\":"); pos >= 0; pos = response.indexOf("\"index\":", pos + 1)) {
+    int index = response.substring(pos + 8).toInt();
+    if (index >= 0 && index < sent) {
+      PendingSample& sample = pendingSamples[(pendingStart + index) % PENDING_SIZE];
+      Serial.print("Amostra descartada pelo servidor: ");
+      Serial.println(String(sample.timestamp, 3));
+      rejected++;
+    }
+  }
+  dropPendingSamples(sent);
+  Serial.print("Lote enviado: ");
+  Serial.print(sent - rejected);
+  Serial.print(" aceitas, ");
+  Serial.print(rejected);
+  Serial.println(" rejeitadas");
+  return true;
+}
+
+// Remove as `count` amostras mais antigas do buffer (as que entraram no último lote)
+void dropPendingSamples(int count) {
+  count = min(count, pendingCount);
+  pendingStart = (pendingStart + count) % PENDING_SIZE;
+  pendingCount -= count;
+}
+
+// Verifica se o relógio já foi sincronizado via NTP
+bool clockSynced() {
+  return time(nullptr) > 1700000000;
+}
+
+// Hora atual em segundos (epoch UTC) com fração de milissegundos
+double currentTimestamp() {
+  struct timeval tv;
+  gettimeofday(&tv, nullptr);
+  return tv.tv_sec + tv.tv_usec / 1e6;
 }
 
 // Conecta ao WiFi
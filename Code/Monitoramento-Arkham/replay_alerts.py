@@ -0,0 +1,74 @@
+"""Revisão retrospectiva de alertas: quando cada pulseira teria alertado com um conjunto de regras.
+
+Lê o histórico gravado pelo servidor (segmentos em ARKHAM_DATA_DIR) e aplica
+AlertEngine.replay() a cada dispositivo.
+
+    python replay_alerts.py                              # todos os dispositivos, regras padrão
+    python replay_alerts.py --device 24:6F:28:AA:BB:CC --since 1717200000 --until 1719792000
+    python replay_alerts.py --rules regras.json --json    # outro conjunto de regras, saída em JSON
+
+regras.json é uma lista de objetos com os argumentos de AlertRule, por exemplo
+[{"name": "taquicardia", "field": "bpm", "high": 120, "min_duration": 30, "requires_finger": true}].
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from alerts import DEFAULT_RULES, AlertEngine, AlertRule
+from segment_store import SegmentStore
+
+DATA_DIR = os.environ.get("ARKHAM_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados"))
+
+
+def load_rules(path):
+    if path is None:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        return [AlertRule(**rule) for rule in json.load(f)]
+
+
+def replay(segment_store, engine, device_ids, since=None, until=None):
+    # Só as colunas usadas pelas regras são lidas dos segmentos
+    fields = sorted({"timestamp", "has_finger", *engine.fields})
+    for device_id in device_ids:
+        columns = segment_store.query(device_id, since, until, fields)
+        yield device_id, len(columns["timestamp"]), engine.replay(columns, device_id)
+
+
+def format_time(timestamp):
+    return "-" if timestamp is None else datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reaplica regras de alerta ao histórico gravado")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--device", action="append", help="repetir para vários dispositivos (padrão: todos)")
+    parser.add_argument("--since", type=float, help="epoch em segundos")
+    parser.add_argument("--until", type=float, help="epoch em segundos")
+    parser.add_argument("--rules", help="arquivo JSON com as regras (padrão: alerts.DEFAULT_RULES)")
+    parser.add_argument("--json", action="store_true", help="episódios em JSON, um por linha")
+    args = parser.parse_args()
+
+    segment_store = SegmentStore(args.data_dir)
+    engine = AlertEngine(load_rules(args.rules))
+    start = time.perf_counter()
+    samples = 0
+    for device_id, count, episodes in replay(segment_store, engine, args.device or segment_store.device_ids(),
+                                             args.since, args.until):
+        samples += count
+        if args.json:
+            for episode in episodes:
+                print(json.dumps(episode))
+            continue
+        print(f"{device_id}: {count} amostras, {len(episodes)} episódios")
+        for e in episodes:
+            print(f"  {e['rule']:<14} violação {format_time(e['since'])}  alerta {format_time(e['triggered'])}"
+                  f"  fim {format_time(e['resolved'])}  pior {e['field']}={e['worst']:g}")
+    if not args.json:
+        print(f"{samples} amostras avaliadas em {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
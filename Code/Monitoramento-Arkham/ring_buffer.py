@@ -0,0 +1,75 @@
+import numpy as np
+
+
+def _missing(dtype):
+    return np.datetime64("NaT") if np.dtype(dtype).kind == "M" else np.nan
+
+
+class RingBuffer:
+    """Colunas de tamanho fixo com as últimas `capacity` amostras.
+
+    Cada coluna tem 2 * capacity posições e cada valor é gravado duas vezes
+    (em i e em i + capacity). Assim as últimas n amostras formam sempre uma
+    fatia contígua e window() devolve uma view, sem cópia. append() é O(1)
+    qualquer que seja a capacidade. None vira NaN (ou NaT nas colunas de data).
+    """
+
+    def __init__(self, capacity, dtypes):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positiva")
+        self.capacity = capacity
+        self.dtypes = dict(dtypes)
+        self.columns = {name: np.full(2 * capacity, _missing(dtype), dtype=dtype)
+                        for name, dtype in self.dtypes.items()}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, values):
+        i = self._next
+        for name, column in self.columns.items():
+            value = values.get(name)
+            if value is None:
+                value = _missing(column.dtype)
+            column[i] = column[i + self.capacity] = value
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, values):
+        # Várias amostras de uma vez: {coluna: array}; só as últimas `capacity` são mantidas
+        n = max(len(v) for v in values.values() if v is not None)
+        skip = max(0, n - self.capacity)
+        index = (self._next + np.arange(n - skip)) % self.capacity
+        for name, column in self.columns.items():
+            value = values.get(name)
+            value = _missing(column.dtype) if value is None else np.asarray(value)[skip:]
+            column[index] = value
+            column[index + self.capacity] = value
+        self._next = (self._next + n - skip) % self.capacity
+        self._size = min(self._size + n - skip, self.capacity)
+
+    def window(self, name, n=None):
+        # View (somente leitura) das últimas n amostras, da mais antiga para a mais recente
+        n = self._size if n is None else min(n, self._size)
+        end = self._next + self.capacity
+        view = self.columns[name][end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, name):
+        if self._size == 0:
+            return None
+        return self.columns[name][self._next + self.capacity - 1]
+
+    def resized(self, capacity):
+        # Novo buffer com outra capacidade, mantendo as amostras mais recentes que couberem
+        buffer = RingBuffer(capacity, self.dtypes)
+        n = min(self._size, capacity)
+        for name, column in buffer.columns.items():
+            recent = self.window(name, n)
+            column[:n] = column[capacity:capacity + n] = recent
+        buffer._next = n % capacity
+        buffer._size = n
+        return buffer
@@ -0,0 +1,147 @@
+import numpy as np
+
+# Agregados pré-calculados por dispositivo: largura do bucket (s) -> número de buckets guardados
+ROLLUP_LEVELS = {
+    60: 24 * 60,        # 1 min por 24 h
+    600: 7 * 24 * 6,    # 10 min por 7 dias
+    3600: 30 * 24,      # 1 h por 30 dias
+}
+ROLLUP_FIELDS = ("temperature", "bpm", "avg_bpm", "spo2", "filtered_bpm")
+# Sem dedo no sensor o firmware manda 0 nesses campos: não entram nos agregados
+FINGER_FIELDS = ("bpm", "avg_bpm", "spo2", "filtered_bpm")
+
+
+class RollupLevel:
+    """Buffer circular de buckets de largura fixa com min/max/soma/contagem por campo.
+
+    O bucket mais recente é atualizado no lugar a cada amostra; quando uma
+    amostra cai em um bucket novo, o mais antigo é descartado.
+    """
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.capacity = capacity
+        self.starts = np.full(capacity, np.nan)
+        self.stats = {
+            field: (np.full(capacity, np.inf, dtype=np.float32),
+                    np.full(capacity, -np.inf, dtype=np.float32),
+                    np.zeros(capacity),
+                    np.zeros(capacity, dtype=np.uint32))
+            for field in ROLLUP_FIELDS
+        }
+        self._head = -1
+        self._size = 0
+
+    @property
+    def first_start(self):
+        if self._size == 0:
+            return None
+        return float(self.starts[(self._head + 1) % self.capacity if self._size == self.capacity else 0])
+
+    def add(self, reading):
+        start = (reading["timestamp"] // self.width) * self.width
+        if self._size and start < self.starts[self._head]:
+            return
+        if not self._size or start > self.starts[self._head]:
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.starts[self._head] = start
+            for mins, maxs, sums, counts in self.stats.values():
+                mins[self._head] = np.inf
+                maxs[self._head] = -np.inf
+                sums[self._head] = 0
+                counts[self._head] = 0
+        i = self._head
+        for field, (mins, maxs, sums, counts) in self.stats.items():
+            if field in FINGER_FIELDS and not reading["has_finger"]:
+                continue
+            value = reading.get(field)
+            if value is None:
+                continue
+            if value < mins[i]:
+                mins[i] = value
+            if value > maxs[i]:
+                maxs[i] = value
+            sums[i] += value
+            counts[i] += 1
+
+    def query(self, since, until, fields):
+        # Mesma ideia do HistoryBuffer: até dois trechos ordenados, limites por busca binária
+        if self._size == 0:
+            return np.empty(0), {field: tuple(np.empty(0) for _ in range(4)) for field in fields}
+        if self._size < self.capacity:
+            segments = [(0, self._size)]
+        else:
+            first = (self._head + 1) % self.capacity
+            segments = [(first, self.capacity), (0, first)] if first else [(0, self.capacity)]
+        slices = []
+        for start, stop in segments:
+            part = self.starts[start:stop]
+            lo = int(np.searchsorted(part, since - self.width, side="right"))
+            hi = int(np.searchsorted(part, until, side="right"))
+            if lo < hi:
+                slices.append((start + lo, start + hi))
+        starts = np.concatenate([self.starts[lo:hi] for lo, hi in slices]) if slices else np.empty(0)
+        stats = {
+            field: tuple(np.concatenate([array[lo:hi] for lo, hi in slices]) if slices else array[:0]
+                         for array in self.stats[field])
+            for field in fields
+        }
+        return starts, stats
+
+
+class Rollups:
+    def __init__(self, levels=ROLLUP_LEVELS):
+        self.levels = [RollupLevel(width, capacity) for width, capacity in sorted(levels.items())]
+
+    def add(self, reading):
+        for level in self.levels:
+            level.add(reading)
+
+    def best_level(self, width, since):
+        # Nível mais grosso que ainda cabe na largura pedida e cobre o início do intervalo
+        best = None
+        for level in self.levels:
+            if level.width <= width and level.first_start is not None and level.first_start <= since:
+                best = level
+        return best
+
+
+def raw_stats(columns, fields):
+    # Converte amostras brutas em "buckets" de uma amostra para usar o mesmo combine()
+    has_finger = columns["has_finger"].astype(bool)
+    stats = {}
+    for field in fields:
+        values = columns[field].astype(np.float64)
+        valid = has_finger & ~np.isnan(values) if field in FINGER_FIELDS else ~np.isnan(values)
+        counts = valid.astype(np.uint32)
+        stats[field] = (np.where(valid, values, np.inf), np.where(valid, values, -np.inf),
+                        np.where(valid, values, 0.0), counts)
+    return stats
+
+
+def combine(starts, stats, width, origin):
+    """Agrupa buckets (ou amostras) ordenados por início em buckets de `width` segundos."""
+    if len(starts) == 0:
+        return np.empty(0), {field: (np.empty(0),) * 4 for field in stats}
+    groups = np.floor((starts - origin) / width).astype(np.int64)
+    index = np.concatenate(([0], np.flatnonzero(np.diff(groups)) + 1))
+    out_starts = origin + groups[index] * width
+    out = {}
+    for field, (mins, maxs, sums, counts) in stats.items():
+        out[field] = (np.minimum.reduceat(mins, index), np.maximum.reduceat(maxs, index),
+                      np.add.reduceat(sums, index), np.add.reduceat(counts.astype(np.int64), index))
+    return out_starts, out
+
+
+def to_json_aggregates(starts, stats):
+    data = {"timestamp": starts.tolist()}
+    for field, (mins, maxs, sums, counts) in stats.items():
+        empty = counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.round(sums / counts, 2)
+        data[f"{field}_min"] = [None if e else round(float(v), 2) for v, e in zip(mins, empty)]
+        data[f"{field}_max"] = [None if e else round(float(v), 2) for v, e in zip(maxs, empty)]
+        data[f"{field}_mean"] = [None if e else float(v) for v, e in zip(means, empty)]
+        data[f"{field}_count"] = counts.tolist()
+    return data
@@ -0,0 +1,297 @@
+import atexit
+import logging
+import os
+import struct
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from urllib.parse import quote
+
+import numpy as np
+
+# Formato dos segmentos em disco: cabeçalho de HEADER_SIZE bytes seguido de
+# registros de largura fixa (RECORD_DTYPE). Cada dispositivo tem seu diretório
+# e os segmentos são numerados em ordem; só o último recebe novas amostras.
+_V1_FIELDS = [
+    ("timestamp", "<f8"),
+    ("temperature", "<f4"),
+    ("bpm", "<u2"),
+    ("avg_bpm", "<u2"),
+    ("spo2", "u1"),
+    ("has_finger", "?"),
+]
+# Versão 2 acrescenta o BPM filtrado no servidor (NaN quando não há valor)
+RECORD_DTYPES = {
+    1: np.dtype(_V1_FIELDS),
+    2: np.dtype(_V1_FIELDS + [("filtered_bpm", "<f4")]),
+}
+MAGIC = b"AKSG"
+VERSION = 2
+RECORD_DTYPE = RECORD_DTYPES[VERSION]
+HEADER = struct.Struct("<4sHH64sd")  # magic, versão, tamanho do registro, device_id, criado em
+HEADER_SIZE = 128
+SEGMENT_SUFFIX = ".seg"
+
+# 1 dia de amostras a cada 2 s por segmento (~930 KiB)
+SEGMENT_RECORDS = 43200
+FLUSH_INTERVAL = 1.0
+
+logger = logging.getLogger("arkham")
+
+
+class Segment:
+    __slots__ = ("path", "dtype", "first_timestamp", "last_timestamp", "count")
+
+    def __init__(self, path, dtype=RECORD_DTYPE, first_timestamp=None, last_timestamp=None, count=0):
+        self.path = path
+        self.dtype = dtype
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+        self.count = count
+
+    def records(self, count=None):
+        # Leitura via mmap: só as páginas tocadas pela consulta são carregadas
+        count = self.count if count is None else count
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+class SegmentStore:
+    """Armazenamento durável de séries por dispositivo em segmentos append-only.
+
+    append/extend apenas enfileiram as leituras; uma thread grava tudo o que
+    acumulou a cada flush_interval segundos e faz um único fsync por arquivo
+    (group commit). Uma queda pode perder no máximo esse intervalo de dados.
+    As amostras de cada dispositivo devem chegar em ordem de timestamp.
+    """
+
+    def __init__(self, directory, segment_records=SEGMENT_RECORDS, flush_interval=FLUSH_INTERVAL,
+                 retention_days=None):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._segments = {}
+        self._pending = {}
+        self._files = {}
+        self._index_lock = Lock()
+        self._flush_lock = Lock()
+        self._stop = Event()
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._thread = Thread(target=self._run, name="segment-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # === RECUPERAÇÃO ===
+    def _recover(self):
+        # Lê só cabeçalho, primeiro e último registro de cada segmento
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if not entry.is_dir():
+                continue
+            device_id = None
+            segments = []
+            for name in sorted(os.listdir(entry.path)):
+                if not name.endswith(SEGMENT_SUFFIX):
+                    continue
+                path = os.path.join(entry.path, name)
+                segment_device, segment = self._read_segment_index(path)
+                if segment is None:
+                    continue
+                device_id = segment_device
+                segments.append(segment)
+            if device_id is not None:
+                self._segments[device_id] = segments
+
+    def _read_segment_index(self, path):
+        with open(path, "r+b") as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                return None, None
+            magic, version, record_size, raw_device, _ = HEADER.unpack_from(header)
+            dtype = RECORD_DTYPES.get(version)
+            if magic != MAGIC or dtype is None or record_size != dtype.itemsize:
+                return None, None
+            size = os.fstat(f.fileno()).st_size
+            count = (size - HEADER_SIZE) // record_size
+            if HEADER_SIZE + count * record_size != size:
+                # Registro parcial de uma gravação interrompida
+                f.truncate(HEADER_SIZE + count * record_size)
+            segment = Segment(path, dtype, count=count)
+            if count:
+                f.seek(HEADER_SIZE)
+                segment.first_timestamp = struct.unpack("<d", f.read(8))[0]
+                f.seek(HEADER_SIZE + (count - 1) * record_size)
+                segment.last_timestamp = struct.unpack("<d", f.read(8))[0]
+        return raw_device.rstrip(b"\0").decode("ascii"), segment
+
+    # === ESCRITA ===
+    def _queue(self, device_id):
+        pending = self._pending.get(device_id)
+        if pending is None:
+            with self._index_lock:
+                pending = self._pending.setdefault(device_id, deque())
+        return pending
+
+    def append(self, reading):
+        self._queue(reading["device_id"]).append(reading)
+
+    def extend(self, device_id, readings):
+        self._queue(device_id).extend(readings)
+
+    def flush(self):
+        with self._flush_lock:
+            touched = {}  # segmento -> [arquivo, registros, primeiro timestamp, último timestamp]
+            for device_id, pending in list(self._pending.items()):
+                n = len(pending)
+                if n:
+                    self._write(device_id, [pending.popleft() for _ in range(n)], touched)
+            # Group commit: um fsync por arquivo tocado neste ciclo
+            for f, _, _, _ in touched.values():
+                if not f.closed:
+                    f.flush()
+                    os.fsync(f.fileno())
+            # Só depois do fsync os registros ficam visíveis para as consultas
+            with self._index_lock:
+                for segment, (_, count, first, last) in touched.items():
+                    if segment.first_timestamp is None:
+                        segment.first_timestamp = first
+                    segment.count = count
+                    segment.last_timestamp = last
+
+    def _write(self, device_id, batch, touched):
+        records = np.array([
+            (r["timestamp"], r["temperature"], r["bpm"], r["avg_bpm"], r["spo2"], r["has_finger"],
+             np.nan if r.get("filtered_bpm") is None else r["filtered_bpm"])
+            for r in batch
+        ], dtype=RECORD_DTYPE)
+        offset = 0
+        while offset < len(records):
+            segment, f, count = self._segment_for_write(device_id, touched)
+            chunk = records[offset:offset + self.segment_records - count]
+            f.write(chunk.tobytes())
+            offset += len(chunk)
+            first = touched[segment][2] if segment in touched else float(chunk["timestamp"][0])
+            touched[segment] = [f, count + len(chunk), first, float(chunk["timestamp"][-1])]
+
+    def _segment_for_write(self, device_id, touched):
+        # Segmento ativo do dispositivo; cria um novo quando o atual está cheio ou é de versão antiga
+        segments = self._segments.get(device_id)
+        segment = segments[-1] if segments else None
+        if segment is not None and segment.dtype is RECORD_DTYPE:
+            count = touched[segment][1] if segment in touched else segment.count
+            if count < self.segment_records:
+                f = self._files.get(device_id)
+                if f is None or f.name != segment.path:
+                    f = self._open(device_id, segment.path)
+                return segment, f, count
+
+        device_dir = os.path.join(self.directory, quote(device_id, safe=""))
+        os.makedirs(device_dir, exist_ok=True)
+        number = int(os.path.basename(segment.path)[:-len(SEGMENT_SUFFIX)]) + 1 if segment else 1
+        path = os.path.join(device_dir, f"{number:08d}{SEGMENT_SUFFIX}")
+        with open(path, "wb") as new:
+            header = HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, device_id.encode("ascii"), time.time())
+            new.write(header.ljust(HEADER_SIZE, b"\0"))
+        segment = Segment(path)
+        with self._index_lock:
+            self._segments.setdefault(device_id, []).append(segment)
+        return segment, self._open(device_id, path), 0
+
+    def _open(self, device_id, path):
+        old = self._files.pop(device_id, None)
+        if old is not None:
+            old.flush()
+            os.fsync(old.fileno())
+            old.close()
+        f = open(path, "ab")
+        self._files[device_id] = f
+        return f
+
+    def _run(self):
+        last_cleanup = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if self.retention_days and time.monotonic() - last_cleanup > 3600:
+                    self.remove_expired()
+                    last_cleanup = time.monotonic()
+            except Exception:
+                # Qualquer erro mantém a thread viva (senão nada mais seria gravado enquanto a
+                # ingestão segue respondendo 200); as amostras do ciclo com erro são perdidas
+                logger.exception("Erro ao gravar segmentos")
+
+    def remove_expired(self):
+        limit = time.time() - self.retention_days * 86400
+        with self._index_lock:
+            for device_id, segments in self._segments.items():
+                # O último segmento (ativo) nunca é removido
+                while len(segments) > 1 and segments[0].last_timestamp is not None \
+                        and segments[0].last_timestamp < limit:
+                    os.remove(segments.pop(0).path)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    # === LEITURA ===
+    def device_ids(self):
+        return list(self._segments.keys())
+
+    def _snapshot(self, device_id):
+        with self._index_lock:
+            return [(s, s.count, s.first_timestamp, s.last_timestamp) for s in self._segments.get(device_id, [])]
+
+    def first_timestamp(self, device_id):
+        for _, count, first, _ in self._snapshot(device_id):
+            if count:
+                return first
+        return None
+
+    def last_reading(self, device_id):
+        for segment, count, _, _ in reversed(self._snapshot(device_id)):
+            if count:
+                record = segment.records(count)[-1]
+                filtered = float(record["filtered_bpm"]) if "filtered_bpm" in segment.dtype.names else np.nan
+                return {
+                    "device_id": device_id,
+                    "temperature": round(float(record["temperature"]), 2),
+                    "bpm": int(record["bpm"]),
+                    "avg_bpm": int(record["avg_bpm"]),
+                    "spo2": int(record["spo2"]),
+                    "has_finger": bool(record["has_finger"]),
+                    "filtered_bpm": None if np.isnan(filtered) else round(filtered, 2),
+                    "timestamp": float(record["timestamp"])
+                }
+        return None
+
+    def query(self, device_id, since=None, until=None, fields=None):
+        """Colunas com since <= timestamp <= until lidas dos segmentos já gravados."""
+        fields = list(RECORD_DTYPE.names) if fields is None else fields
+        parts = {name: [] for name in fields}
+        for segment, count, first, last in self._snapshot(device_id):
+            if count == 0 or (since is not None and last < since) or (until is not None and first > until):
+                continue
+            records = segment.records(count)
+            timestamps = records["timestamp"]
+            lo = 0 if since is None else int(np.searchsorted(timestamps, since, side="left"))
+            hi = count if until is None else int(np.searchsorted(timestamps, until, side="right"))
+            if lo >= hi:
+                continue
+            for name in fields:
+                if name in segment.dtype.names:
+                    parts[name].append(np.array(records[name][lo:hi]))
+                else:
+                    # Campo que não existia na versão do segmento
+                    parts[name].append(np.full(hi - lo, np.nan, dtype=RECORD_DTYPE[name]))
+        return {
+            name: np.concatenate(chunks) if chunks else np.empty(0, dtype=RECORD_DTYPE[name])
+            for name, chunks in parts.items()
+        }
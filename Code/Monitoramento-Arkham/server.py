@@ -1,51 +1,88 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+import logging
 import time
-from threading import Lock
-import json
+
+import logs
+import metrics
+import service
+from streaming import KEEPALIVE_INTERVAL, SSE_KEEPALIVE, format_sse
 
 app = Flask(__name__)
-CORS(app) 
-
-# Estrutura para armazenar os dados mais recentes
-latest_data = {
-    "temperature": 0.0,
-    "bpm": 0,
-    "avg_bpm": 0,
-    "spo2": 0,
-    "has_finger": False,
-    "timestamp": 0
-}
-data_lock = Lock()  
+CORS(app)
+
+# Log em JSON gravado por uma thread; as leituras recebidas são amostradas (ver logs.py)
+logs.configure(service.logger, logging.INFO)
+service.logger.info(service.describe_storage())
+
+# Dados e histórico de cada pulseira ficam em service.store
+store = service.store
+broadcaster = service.broadcaster
+
+def respond(result):
+    payload, status = result
+    return jsonify(payload), status
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Rota com o padrão do Flask (ex.: /api/latest/<device_id>) para não criar uma série por dispositivo
+    route = request.url_rule.rule if request.url_rule is not None else "other"
+    metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - g.request_start)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/api/data', methods=['POST'])
 def receive_data():
-    global latest_data
-    
-    try:
-        data = request.get_json()
-        
-        with data_lock:
-            latest_data = {
-                "temperature": float(data.get('temperature', 0.0)),
-                "bpm": int(data.get('bpm', 0)),
-                "avg_bpm": int(data.get('avg_bpm', 0)),
-                "spo2": int(data.get('spo2', 0)),
-                "has_finger": bool(data.get('has_finger', False)),
-                "timestamp": time.time()
-            }
-        
-        print("Dados recebidos:", latest_data)
-        return jsonify({"status": "success"}), 200
-    
-    except Exception as e:
-        print("Erro ao processar dados:", str(e))
-        return jsonify({"status": "error", "message": str(e)}), 400
+    return respond(service.handle_data(request.get_data(cache=False), request.content_type, request.headers))
+
+@app.route('/api/data/batch', methods=['POST'])
+def receive_batch():
+    return respond(service.handle_batch(request.get_data(cache=False), request.content_type, request.headers))
 
 @app.route('/api/latest', methods=['GET'])
 def get_latest_data():
-    with data_lock:
-        return jsonify(latest_data)
+    return respond(service.handle_latest())
+
+@app.route('/api/latest/<device_id>', methods=['GET'])
+def get_latest_device_data(device_id):
+    return respond(service.handle_latest_device(device_id))
+
+def sse_response(source, snapshot, event_type):
+    device_id = request.args.get('device') or None
+    subscription = source.subscribe(device_id)
+
+    def events():
+        try:
+            for event in snapshot(device_id):
+                yield format_sse(event, event_type)
+            while True:
+                event = subscription.get(timeout=KEEPALIVE_INTERVAL)
+                yield SSE_KEEPALIVE if event is None else format_sse(event, event_type)
+        finally:
+            source.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream', methods=['GET'])
+def stream_data():
+    return sse_response(broadcaster, service.stream_snapshot, "reading")
+
+@app.route('/api/alerts', methods=['GET'])
+def stream_alerts():
+    # Eventos "alert" (triggered/resolved); ao conectar, recebe os alertas ainda ativos
+    return sse_response(service.alert_broadcaster, service.alerts_snapshot, "alert")
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    return respond(service.handle_history(request.args))
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
@@ -0,0 +1,372 @@
+import json
+import logging
+import math
+import os
+import time
+
+import numpy as np
+
+from alerts import DEFAULT_RULES, AlertEngine
+from device_store import DeviceStore, check_reading, parse_reading, parse_timestamp, resolve_device_id
+from filters import FilterPipeline, MovingAverage, OutlierRejector, ScalarKalman
+from history import HISTORY_FIELDS, bytes_per_sample, to_json_columns
+from metrics import PAYLOAD_BYTES, REJECTED, SAMPLES, SENSOR_LAG, Gauge, TimedLock, registry
+from rollups import ROLLUP_FIELDS, combine, raw_stats, to_json_aggregates
+from segment_store import SegmentStore
+from streaming import Broadcaster
+from wire_format import decode_payload, is_binary_request
+
+# Lógica das rotas independente de framework: usada pelo servidor Flask (server.py)
+# e pelo servidor assíncrono (asgi_server.py). Cada handler devolve (corpo, status).
+
+logger = logging.getLogger("arkham")
+
+# Histórico em memória: últimas HISTORY_HOURS horas, uma amostra a cada SAMPLE_INTERVAL s
+HISTORY_HOURS = 12
+SAMPLE_INTERVAL = 2  # mesmo SEND_INTERVAL do firmware
+HISTORY_CAPACITY = int(HISTORY_HOURS * 3600 / SAMPLE_INTERVAL)
+
+# Limite de amostras por requisição em /api/data/batch
+MAX_BATCH_SIZE = 1000
+
+# Limite de buckets em /api/history?max_points= e maior largura de bucket (s)
+MAX_POINTS_LIMIT = 10000
+MAX_BUCKET = 10 * 365 * 86400
+
+# Histórico durável em disco (segmentos por dispositivo); ARKHAM_DATA_DIR muda o diretório
+DATA_DIR = os.environ.get("ARKHAM_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados"))
+RETENTION_DAYS = 30
+segment_store = SegmentStore(DATA_DIR, retention_days=RETENTION_DAYS)
+
+# Filtros de BPM aplicados uma vez por dispositivo, na chegada das amostras
+# (None desativa o estágio); o resultado sai como "filtered_bpm"
+BPM_FILTERS = {
+    "outlier_window": 7,   # rejeição de outliers (mediana/MAD das últimas N leituras)
+    "moving_average": 5,   # janela da média móvel
+    "kalman": True,
+}
+
+
+def make_bpm_filter():
+    stages = []
+    if BPM_FILTERS["outlier_window"]:
+        stages.append(OutlierRejector(window=BPM_FILTERS["outlier_window"]))
+    if BPM_FILTERS["moving_average"]:
+        stages.append(MovingAverage(window=BPM_FILTERS["moving_average"]))
+    if BPM_FILTERS["kalman"]:
+        stages.append(ScalarKalman())
+    return FilterPipeline(stages)
+
+
+# Regras de alerta avaliadas a cada amostra aceita (ver alerts.py)
+ALERT_RULES = DEFAULT_RULES
+alert_engine = AlertEngine(ALERT_RULES)
+
+# Estrutura para armazenar os dados mais recentes e o histórico de cada pulseira
+store = DeviceStore(HISTORY_CAPACITY, persistence=segment_store, filter_factory=make_bpm_filter,
+                    alert_engine=alert_engine, lock_factory=TimedLock)
+for _device_id in segment_store.device_ids():
+    _reading = segment_store.last_reading(_device_id)
+    if _reading is not None:
+        store.seed(_reading)
+
+# Clientes conectados em /api/stream e em /api/alerts
+broadcaster = Broadcaster()
+alert_broadcaster = Broadcaster()
+
+
+def _on_alert(event):
+    # Registrado no log mesmo sem nenhum cliente conectado em /api/alerts
+    logger.warning("Alerta %s: %s (%s=%s) em %s", event["state"], event["rule"],
+                   event["field"], event["value"], event["device_id"])
+    alert_broadcaster.publish(event["device_id"], event)
+
+
+alert_engine.subscribe(_on_alert)
+
+# Valores lidos a cada coleta do /metrics
+registry.register(Gauge("arkham_devices", "Dispositivos conhecidos pelo servidor",
+                        lambda: {(): len(store.device_ids())}))
+registry.register(Gauge("arkham_stream_clients", "Clientes conectados nos streams SSE",
+                        lambda: {("readings",): len(broadcaster), ("alerts",): len(alert_broadcaster)},
+                        ("stream",)))
+registry.register(Gauge("arkham_active_alerts", "Alertas disparados e ainda não encerrados",
+                        lambda: {(): len(alert_engine.active_alerts())}))
+
+
+def describe_storage():
+    return (f"Histórico por dispositivo: {HISTORY_CAPACITY} amostras "
+            f"({HISTORY_CAPACITY * bytes_per_sample() / 1024:.0f} KiB); "
+            f"{len(segment_store.device_ids())} dispositivos recuperados de {DATA_DIR}")
+
+
+def error(message, status=400):
+    return {"status": "error", "message": message}, status
+
+
+def _load_json(body):
+    try:
+        return json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Corpo da requisição não é um JSON válido")
+
+
+def handle_data(body, content_type, headers):
+    # POST /api/data: uma leitura em JSON ou no formato binário. Com o relógio sincronizado a
+    # pulseira envia o próprio timestamp (o mesmo usado nos lotes), para que as amostras guardadas
+    # offline não cheguem "fora de ordem"; sem ele (0 no binário, ausente no JSON) vale a hora do servidor
+    PAYLOAD_BYTES.labels("/api/data").observe(len(body))
+    now = time.time()
+    try:
+        if is_binary_request(content_type):
+            device_id, readings = decode_payload(body)
+            if len(readings) != 1:
+                raise ValueError("Use /api/data/batch para enviar mais de uma leitura")
+            reading = readings[0]
+            device_time = reading["timestamp"] or None
+            reading["timestamp"] = now if device_time is None else parse_timestamp(device_time, now)
+            check_reading(reading)
+        else:
+            data = _load_json(body)
+            device_id = resolve_device_id(data, headers)
+            device_time = data.get('timestamp') if isinstance(data, dict) else None
+            reading = parse_reading(data, device_id, None if device_time is None else parse_timestamp(device_time, now))
+
+        store.update(reading)
+        broadcaster.publish(device_id, reading)
+    except Exception as e:
+        REJECTED.labels("/api/data").inc()
+        logger.warning("Erro ao processar dados: %s", e)
+        return error(str(e))
+
+    SAMPLES.labels(device_id).inc()
+    if device_time is not None:
+        SENSOR_LAG.labels().observe(now - reading["timestamp"])
+    # Amostrado (ver logs.py): uma linha por leitura custaria mais que a própria ingestão
+    logger.info("Dados recebidos", extra={"sampled": True, "reading": reading})
+    return {"status": "success", "device_id": device_id}, 200
+
+
+def _parse_json_item(sample, batch_device_id, now):
+    if not isinstance(sample, dict):
+        raise ValueError("Amostra deve ser um objeto JSON")
+    device_id = resolve_device_id(sample, default=batch_device_id)
+    return parse_reading(sample, device_id, parse_timestamp(sample.get('timestamp'), now))
+
+
+def _parse_binary_item(reading, now):
+    reading["timestamp"] = parse_timestamp(reading["timestamp"], now)
+    return check_reading(reading)
+
+
+def handle_batch(body, content_type, headers):
+    # POST /api/data/batch: lista de amostras com timestamp do dispositivo, de uma ou mais pulseiras
+    PAYLOAD_BYTES.labels("/api/data/batch").observe(len(body))
+    try:
+        if is_binary_request(content_type):
+            _, samples = decode_payload(body)
+            parse_item = _parse_binary_item
+        else:
+            data = _load_json(body)
+            if isinstance(data, list):
+                data = {"samples": data}
+            if not isinstance(data, dict) or not isinstance(data.get('samples'), list):
+                raise ValueError('Corpo deve ser uma lista de amostras ou {"samples": [...]}')
+            samples = data['samples']
+            batch_device_id = resolve_device_id(data, headers)
+            parse_item = lambda sample, now: _parse_json_item(sample, batch_device_id, now)
+        if len(samples) > MAX_BATCH_SIZE:
+            raise ValueError(f"Lote com {len(samples)} amostras excede o limite de {MAX_BATCH_SIZE}")
+    except Exception as e:
+        REJECTED.labels("/api/data/batch").inc()
+        logger.warning("Erro ao processar lote: %s", e)
+        return error(str(e))
+
+    # Validação em uma passada, agrupando por dispositivo
+    now = time.time()
+    errors = []
+    by_device = {}
+    sample_index = {}
+    for i, sample in enumerate(samples):
+        try:
+            reading = parse_item(sample, now)
+        except (TypeError, ValueError) as e:
+            errors.append({"index": i, "message": str(e)})
+            continue
+        sample_index[id(reading)] = i
+        by_device.setdefault(reading["device_id"], []).append(reading)
+
+    # Uma aquisição de lock por dispositivo presente no lote
+    accepted = 0
+    for device_id, readings in by_device.items():
+        stored, rejected = store.update_many(device_id, readings)
+        accepted += len(stored)
+        for reading in stored:
+            broadcaster.publish(device_id, reading)
+        if stored:
+            SAMPLES.labels(device_id).inc(len(stored))
+            # Atraso de ponta a ponta: relógio do dispositivo até a chegada do lote
+            SENSOR_LAG.labels().observe_many(now - np.fromiter((r["timestamp"] for r in stored), np.float64))
+        errors.extend({"index": sample_index[id(reading)], "message": message} for reading, message in rejected)
+    errors.sort(key=lambda item: item["index"])
+    if errors:
+        REJECTED.labels("/api/data/batch").inc(len(errors))
+
+    logger.info("Lote recebido", extra={"sampled": True, "accepted": accepted, "rejected": len(errors)})
+    if errors and not accepted:
+        return {"status": "error", "accepted": 0, "rejected": len(errors), "errors": errors}, 400
+    return {
+        "status": "partial" if errors else "success",
+        "accepted": accepted,
+        "rejected": len(errors),
+        "errors": errors
+    }, 200
+
+
+def handle_latest():
+    return store.latest_all(), 200
+
+
+def handle_latest_device(device_id):
+    reading = store.latest(device_id)
+    if reading is None:
+        return error(f"Dispositivo não encontrado: {device_id}", 404)
+    return reading, 200
+
+
+def stream_snapshot(device_id):
+    # Estado atual enviado ao abrir o /api/stream, para o cliente não esperar a próxima leitura
+    if device_id is None:
+        return list(store.latest_all().values())
+    return [r for r in (store.latest(device_id),) if r is not None]
+
+
+def alerts_snapshot(device_id):
+    # Alertas ainda ativos, enviados ao abrir o /api/alerts
+    return alert_engine.active_alerts(device_id)
+
+
+def _float_arg(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Parâmetro '{name}' deve ser numérico (epoch em segundos)")
+    # nan/inf chegariam até math.ceil e virariam erro 500
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"Parâmetro '{name}' deve ser um número finito e positivo")
+    return number
+
+
+def history_columns(device_id, since, until, fields):
+    # Memória para o trecho recente; o que for anterior à amostra mais antiga do buffer vem dos segmentos
+    columns = store.history(device_id, since, until, fields)
+    if columns is None:
+        return None
+    oldest = store.first_timestamp(device_id)
+    if oldest is None or since is None or since < oldest:
+        disk_until = until if oldest is None else np.nextafter(oldest, -np.inf)
+        if until is not None:
+            disk_until = min(disk_until, until)
+        disk = segment_store.query(device_id, since, disk_until, fields)
+        if len(disk['timestamp']):
+            columns = {name: np.concatenate([disk[name], columns[name]]) for name in fields}
+    return columns
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Parâmetro '{name}' deve ser inteiro")
+
+
+def _fields_arg(args, allowed, default):
+    fields = args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip() and f.strip() != 'timestamp'] if fields else list(default)
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+    return fields
+
+
+def earliest_timestamp(device_id):
+    candidates = [t for t in (segment_store.first_timestamp(device_id), store.first_timestamp(device_id))
+                  if t is not None]
+    return min(candidates) if candidates else None
+
+
+def handle_history(args):
+    # GET /api/history?device=&since=&until=&fields=[&max_points= | &bucket=]
+    device_id = args.get('device')
+    if not device_id:
+        return error("Parâmetro 'device' é obrigatório")
+
+    try:
+        since = _float_arg(args, 'since')
+        until = _float_arg(args, 'until')
+        max_points = _int_arg(args, 'max_points')
+        bucket = _float_arg(args, 'bucket')
+        if max_points is not None and not 1 <= max_points <= MAX_POINTS_LIMIT:
+            raise ValueError(f"'max_points' deve estar entre 1 e {MAX_POINTS_LIMIT}")
+        if bucket is not None and not 1 <= bucket <= MAX_BUCKET:
+            raise ValueError(f"'bucket' deve estar entre 1 e {MAX_BUCKET} segundos")
+        aggregated = max_points is not None or bucket is not None
+        if aggregated:
+            fields = _fields_arg(args, ROLLUP_FIELDS, ROLLUP_FIELDS)
+        else:
+            fields = ['timestamp'] + _fields_arg(args, HISTORY_FIELDS, [f for f in HISTORY_FIELDS if f != 'timestamp'])
+    except ValueError as e:
+        return error(str(e))
+
+    if store.get(device_id) is None:
+        return error(f"Dispositivo não encontrado: {device_id}", 404)
+
+    if aggregated:
+        return aggregated_history(device_id, since, until, fields, max_points, bucket)
+
+    columns = history_columns(device_id, since, until, fields)
+    return {
+        "device_id": device_id,
+        "count": len(columns['timestamp']),
+        "data": to_json_columns(columns)
+    }, 200
+
+
+def aggregated_history(device_id, since, until, fields, max_points, bucket):
+    # Buckets com min/max/média por campo; usa os agregados pré-calculados quando cobrem o intervalo
+    until = time.time() if until is None else until
+    earliest = earliest_timestamp(device_id)
+    since = earliest if since is None else since
+    if since is None or since > until:
+        empty = {field: (np.empty(0),) * 4 for field in fields}
+        return {"device_id": device_id, "bucket": bucket, "source": "raw", "count": 0,
+                "data": to_json_aggregates(np.empty(0), empty)}, 200
+
+    # Intervalos enormes (until muito no futuro) não podem gerar larguras que estourem o int64 do combine()
+    width = bucket if bucket is not None else min(max(1.0, math.ceil((until - since) / max_points)), MAX_BUCKET)
+    # Antes da primeira amostra não há o que cobrir
+    covered_since = since if earliest is None else max(since, earliest)
+    rollup = store.rollup(device_id, width, covered_since, until, fields)
+    if rollup is not None:
+        level_width, starts, stats = rollup
+        width = math.ceil(width / level_width) * level_width
+        source = f"rollup_{level_width}s"
+    else:
+        columns = history_columns(device_id, since, until, ['timestamp', 'has_finger'] + fields)
+        starts, stats = columns['timestamp'], raw_stats(columns, fields)
+        source = "raw"
+
+    starts, stats = combine(starts, stats, width, (since // width) * width)
+    return {
+        "device_id": device_id,
+        "bucket": width,
+        "source": source,
+        "count": len(starts),
+        "data": to_json_aggregates(starts, stats)
+    }, 200
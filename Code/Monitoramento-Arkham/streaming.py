@@ -0,0 +1,96 @@
+import asyncio
+import json
+import queue
+from threading import Lock
+
+# Intervalo de keepalive do SSE; também serve para detectar clientes desconectados
+KEEPALIVE_INTERVAL = 15
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    # Fila de eventos de um cliente; device_id=None recebe todos os dispositivos
+    def __init__(self, device_id=None, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.device_id = device_id
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def matches(self, device_id):
+        return self.device_id is None or self.device_id == device_id
+
+    def put(self, event):
+        # Cliente lento: descarta o evento mais antigo em vez de travar a ingestão
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    # Versão para o servidor asyncio; publish pode ser chamado de qualquer thread
+    def __init__(self, loop, device_id=None, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.device_id = device_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = Lock()
+
+    def subscribe(self, device_id=None):
+        return self._add(Subscription(device_id))
+
+    def subscribe_async(self, device_id=None):
+        return self._add(AsyncSubscription(asyncio.get_running_loop(), device_id))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, device_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(device_id):
+                subscription.put(event)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+def format_sse(event, event_type="reading"):
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+
+SSE_KEEPALIVE = ": keepalive\n\n"
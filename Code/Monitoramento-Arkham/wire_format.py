@@ -0,0 +1,76 @@
+import struct
+
+from device_store import DEFAULT_DEVICE_ID, DEVICE_ID_PATTERN
+
+# Formato binário de envio das pulseiras (Content-Type abaixo), little-endian:
+#
+#   cabeçalho: magic "AK" | versão (u8) | tamanho do device_id (u8) | device_id (ASCII)
+#   registros: timestamp (f64, epoch; 0 = sem hora, usa a do servidor) | temperature (f32) | bpm (u16)
+#              avg_bpm (u16) | spo2 (u8) | flags (u8, bit 0 = has_finger)
+#
+# São 18 bytes por leitura, contra ~100 bytes do JSON equivalente.
+CONTENT_TYPE = "application/vnd.arkham.sample"
+MAGIC = b"AK"
+VERSION = 1
+HEADER = struct.Struct("<2sBB")
+RECORD = struct.Struct("<dfHHBB")
+FLAG_HAS_FINGER = 0x01
+
+
+def encode_payload(device_id, readings):
+    device_bytes = device_id.encode("ascii")
+    parts = [HEADER.pack(MAGIC, VERSION, len(device_bytes)), device_bytes]
+    for reading in readings:
+        parts.append(RECORD.pack(
+            reading.get("timestamp", 0.0),
+            reading.get("temperature", 0.0),
+            reading.get("bpm", 0),
+            reading.get("avg_bpm", 0),
+            reading.get("spo2", 0),
+            FLAG_HAS_FINGER if reading.get("has_finger") else 0
+        ))
+    return b"".join(parts)
+
+
+def decode_payload(body):
+    """Decodifica um payload binário em (device_id, [leituras]).
+
+    Lê direto do buffer da requisição via memoryview, sem cópias intermediárias.
+    O timestamp é devolvido como veio (0 = ausente); validá-lo fica a cargo da rota.
+    """
+    view = memoryview(body)
+    if len(view) < HEADER.size:
+        raise ValueError("Payload binário truncado (cabeçalho)")
+    magic, version, id_length = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Payload binário inválido (magic)")
+    if version != VERSION:
+        raise ValueError(f"Versão de payload não suportada: {version}")
+
+    offset = HEADER.size + id_length
+    if len(view) < offset:
+        raise ValueError("Payload binário truncado (device_id)")
+    device_id = bytes(view[HEADER.size:offset]).decode("ascii", errors="replace") or DEFAULT_DEVICE_ID
+    if not DEVICE_ID_PATTERN.match(device_id):
+        raise ValueError(f"device_id inválido: {device_id!r}")
+
+    records_size = len(view) - offset
+    if records_size == 0 or records_size % RECORD.size:
+        raise ValueError(f"Tamanho dos registros ({records_size} bytes) não é múltiplo de {RECORD.size}")
+
+    readings = []
+    for timestamp, temperature, bpm, avg_bpm, spo2, flags in RECORD.iter_unpack(view[offset:]):
+        readings.append({
+            "device_id": device_id,
+            "temperature": round(temperature, 2),
+            "bpm": bpm,
+            "avg_bpm": avg_bpm,
+            "spo2": spo2,
+            "has_finger": bool(flags & FLAG_HAS_FINGER),
+            "timestamp": timestamp
+        })
+    return device_id, readings
+
+
+def is_binary_request(content_type):
+    return (content_type or "").split(";")[0].strip().lower() == CONTENT_TYPE
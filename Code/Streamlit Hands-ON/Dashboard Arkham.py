@@ -1,8 +1,13 @@
 import streamlit as st
-import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
+import os
+import sys
+
+# Módulos compartilhados com o Monitoramento-Arkham (ECG sintético)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoramento-Arkham"))
+from ecg import ECGGenerator, SweepBuffer
 
 # Configuração da página
 st.set_page_config(layout="wide", page_title="Monitor ECG")
@@ -33,78 +38,82 @@ with st.sidebar:
     heart_rate = st.slider("Frequência cardíaca (BPM)", 40, 120, 72)
     amplitude = st.slider("Amplitude do sinal", 0.5, 3.0, 1.5)
     noise_level = st.slider("Nível de ruído", 0.0, 0.5, 0.1)
+    st.header("Tela")
+    window_seconds = st.slider("Janela exibida (s)", 1, 20, 2)
+    sample_rate = st.select_slider("Taxa de amostragem (Hz)", [100, 250, 500], 250)
+    display_mode = st.radio("Exibição", ["Varredura", "Rolagem"],
+                            help="Varredura: o traçado é redesenhado sobre a tela, como em um monitor; "
+                                 "Rolagem: a tela desloca para a esquerda")
+
+MAX_PLOT_POINTS = 1000  # acima disso a tela é reduzida (mín/máx por grupo de amostras)
 
 # Função para simular um sinal ECG mais realista
 def generate_ecg_signal(length=500, heart_rate=72, amplitude=1.5, noise=0.1):
-    # Gerar um sinal ECG básico com complexos QRS
-    t = np.linspace(0, 2 * np.pi * (length / 100), length)
-    
-    # Componentes do ECG
-    p_wave = 0.1 * np.sin(1.5 * t) * (np.sin(0.05 * t) ** 2)
-    qrs_complex = amplitude * np.sin(30 * t) * np.exp(-5 * (t % (2 * np.pi / (heart_rate / 60))))
-    t_wave = 0.2 * np.sin(0.8 * t) * (np.sin(0.05 * t) ** 10)
-    
-    # Combinar componentes e adicionar ruído
-    ecg = p_wave + qrs_complex + t_wave + noise * np.random.randn(length)
-    
-    return ecg
+    # Continua o traçado a partir do batimento em cache (ver ecg.py): custo de um índice + ruído
+    if 'ecg_generator' not in st.session_state or st.session_state.ecg_generator.fs != sample_rate:
+        st.session_state.ecg_generator = ECGGenerator(fs=sample_rate)
+    return st.session_state.ecg_generator.next(length, heart_rate, amplitude, noise)
 
-# Inicializar buffer de ECG
-if 'ecg_buffer' not in st.session_state:
-    st.session_state.ecg_buffer = generate_ecg_signal(500, heart_rate, amplitude, noise_level)
+# Buffer circular da tela (ver SweepBuffer em ecg.py): sem np.roll nem realocação a cada atualização
+capacity = window_seconds * sample_rate
+screen = st.session_state.get('ecg_screen')
+if screen is None:
+    screen = SweepBuffer(capacity, fs=sample_rate, max_points=MAX_PLOT_POINTS)
+    screen.write(generate_ecg_signal(capacity, heart_rate, amplitude, noise_level))
+elif screen.capacity != capacity or screen.fs != sample_rate:
+    screen = screen.resized(capacity, fs=sample_rate)
+st.session_state.ecg_screen = screen
 
 # Container principal para o ECG
 ecg_placeholder = st.empty()
 
+# Figura criada uma vez; a cada atualização só os dados do traço mudam
+fig = go.Figure()
+fig.add_trace(go.Scatter(
+    line=dict(color='#2e7d32', width=2),
+    name='Sinal ECG',
+    hoverinfo='none'
+))
+fig.update_layout(
+    title="Eletrocardiograma (ECG) em Tempo Real",
+    xaxis=dict(
+        title="Tempo (s)",
+        range=[0, window_seconds],
+        showgrid=True,
+        gridcolor='lightgray',
+        zeroline=False
+    ),
+    yaxis=dict(
+        title="Amplitude (mV)",
+        showgrid=True,
+        gridcolor='lightgray',
+        zeroline=True,
+        zerolinecolor='black'
+    ),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    height=400,
+    margin=dict(l=40, r=40, t=60, b=40),
+    showlegend=False,
+    uirevision='ecg'
+)
+fig.add_hline(y=0, line_dash="dot", line_color="gray")
+
+# Amostras geradas por atualização: o traçado anda em tempo real
+samples_per_update = max(1, round(sample_rate * update_interval / 1000))
+
 # Atualização contínua do ECG
 while True:
-    # Gerar novo segmento de ECG
-    new_segment = generate_ecg_signal(50, heart_rate, amplitude, noise_level)
-    
-    # Atualizar buffer (deslocamento e adição de novos dados)
-    st.session_state.ecg_buffer = np.roll(st.session_state.ecg_buffer, -len(new_segment))
-    st.session_state.ecg_buffer[-len(new_segment):] = new_segment
-    
-    # Criar figura do Plotly
-    fig = go.Figure()
-    
-    # Adicionar trace do ECG
-    fig.add_trace(go.Scatter(
-        y=st.session_state.ecg_buffer,
-        line=dict(color='#2e7d32', width=2),
-        name='Sinal ECG',
-        hoverinfo='none'
-    ))
-    
-    # Configurações do layout
-    fig.update_layout(
-        title="Eletrocardiograma (ECG) em Tempo Real",
-        xaxis=dict(
-            title="Tempo (ms)",
-            showgrid=True,
-            gridcolor='lightgray',
-            zeroline=False
-        ),
-        yaxis=dict(
-            title="Amplitude (mV)",
-            showgrid=True,
-            gridcolor='lightgray',
-            zeroline=True,
-            zerolinecolor='black'
-        ),
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        height=400,
-        margin=dict(l=40, r=40, t=60, b=40),
-        showlegend=False
-    )
-    
-    # Adicionar linha de zero
-    fig.add_hline(y=0, line_dash="dot", line_color="gray")
-    
+    # Gerar novo segmento de ECG e gravar na posição do ponteiro da tela
+    screen.write(generate_ecg_signal(samples_per_update, heart_rate, amplitude, noise_level))
+
+    x, y = screen.sweep() if display_mode == "Varredura" else screen.scroll()
+    fig.data[0].x = x
+    fig.data[0].y = y
+
     # Mostrar o gráfico no placeholder
     with ecg_placeholder.container():
         st.plotly_chart(fig, use_container_width=True)
-    
+
     # Intervalo de atualização
     time.sleep(update_interval / 1000)
\ No newline at end of file
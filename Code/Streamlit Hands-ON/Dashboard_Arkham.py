@@ -1,12 +1,25 @@
+import os
 import streamlit as st
-import pandas as pd
 import numpy as np
-from matplotlib.colors import LinearSegmentedColormap
-import plotly.express as px
-import pickle
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier
+from dados_csv import CacheCSV, IndiceFiltros
+from modelo_risco import CAMINHO_MODELO, ModeloRisco, RiscosTabela
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# Colunas do CSV usadas pelos filtros; as demais são tipadas automaticamente (ver dados_csv.py)
+ESQUEMA_CSV = {
+    'regiao': 'category',
+    'idade_meses': 'float32',
+    'tipo_domicilio': 'category',
+    'acesso_alimentos': 'category',
+}
+FAIXAS_ETARIAS = [0, 12, 24, 36, 48, 60]
+# Indicadores mostrados para a seleção atual (médias calculadas pelo IndiceFiltros)
+SCORES = {
+    'score_alimentos': "Score Alimentos",
+    'score_saude': "Score Saúde",
+    'score_infraestrutura': "Score Infraestrutura",
+}
 
 # ----------------------------------------------------------
 # Configuração da Página e CSS Customizado
@@ -299,7 +312,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 nutrition_palette = ["#3a86ff", "#38b000", "#ff9e00", "#9d4edd", "#ef476f", "#073b4c"]
-nutrition_cmap = LinearSegmentedColormap.from_list("nutrition_cmap", ["#3a86ff", "#ef476f"])
+nutrition_scale = ["#3a86ff", "#ef476f"]  # escala contínua (ex.: color_continuous_scale do Plotly)
+nutrition_icons = {"main": "🍎", "dados": "📋", "filtro": "🔍"}
 
 # ----------------------------------------------------------
 # Cabeçalho e Introdução
@@ -343,7 +357,7 @@ st.markdown("""
 # Sidebar para Filtros e Controles
 # ----------------------------------------------------------
 with st.sidebar:
-    st.image("C:\Users\ALUNOS MALOCA\Documents\Streamlit Hands-ON\Brasão_da_UFRR.png")
+    st.image(os.path.join(PASTA, "Brasão_da_UFRR.png"))
     st.title(f"Controle de Dados")
     st.markdown('<div style="border-bottom: 1px solid #e9ecef; margin-bottom: 20px;"></div>', unsafe_allow_html=True)
 
@@ -365,7 +379,7 @@ with st.sidebar:
                 unsafe_allow_html=True)
     faixa_etaria = st.select_slider(
         "",
-        options=[0, 12, 24, 36, 48, 60],
+        options=FAIXAS_ETARIAS,
         value=(0, 60),
         format_func=lambda x: f"{x} meses"
     )
@@ -403,3 +417,91 @@ with st.sidebar:
         unsafe_allow_html=True
     )
 
+# ----------------------------------------------------------
+# Carregamento e Filtragem dos Dados
+# ----------------------------------------------------------
+# Uma única cache por processo: o CSV é lido e tipado uma vez por conteúdo, e os reruns
+# causados pelos filtros só combinam os bitmaps do IndiceFiltros montado para a tabela
+@st.cache_resource
+def cache_csv():
+    return CacheCSV(esquema=ESQUEMA_CSV)
+
+
+# O modelo de risco também é carregado uma vez por processo e compartilhado entre as sessões
+@st.cache_resource
+def modelo_risco():
+    if not os.path.exists(CAMINHO_MODELO):
+        return None
+    return ModeloRisco.carregar(CAMINHO_MODELO)
+
+
+def construir_indice(dados):
+    indicadores = list(SCORES)
+    if 'indice_desenvolvimento' in dados:
+        indicadores.append('indice_desenvolvimento')
+    return IndiceFiltros(
+        dados,
+        categorias=['regiao', 'tipo_domicilio', 'acesso_alimentos'],
+        faixas={'idade_meses': FAIXAS_ETARIAS},
+        indicadores=indicadores,
+    )
+
+
+def metric_card(valor, rotulo):
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-value">{valor}</div>
+        <div class="metric-label">{rotulo}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+
+if uploaded_file is None:
+    st.info("Carregue um arquivo CSV na barra lateral para iniciar a análise.")
+else:
+    dados = cache_csv().carregar(uploaded_file)
+    indice = cache_csv().derivado(uploaded_file, 'indice_filtros', construir_indice)
+    selecao = {
+        'regiao': salas,
+        'idade_meses': faixa_etaria,
+        'tipo_domicilio': tipo_domicilio,
+        'acesso_alimentos': None if acesso_alimentos == "Todos" else [acesso_alimentos],
+    }
+    agregados = indice.agregados(selecao)
+    medias = dict(agregados['medias'])  # o dicionário guardado no índice não é alterado
+    if 'indice_desenvolvimento' not in medias and all(medias.get(nome) is not None for nome in SCORES):
+        # Sem a coluna no CSV: média dos três scores (igual à média por linha quando não há valores ausentes)
+        medias['indice_desenvolvimento'] = sum(medias[nome] for nome in SCORES) / len(SCORES)
+
+    st.markdown(f'<div class="sub-header">{nutrition_icons["dados"]} Dados Filtrados</div>', unsafe_allow_html=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric_card(f"{agregados['contagem']:,}", "Registros após os filtros")
+    with col2:
+        metric_card(f"{len(dados):,}", "Registros no arquivo")
+    with col3:
+        indice_medio = medias.get('indice_desenvolvimento')
+        metric_card("-" if indice_medio is None else f"{indice_medio:.2f}", "Índice de Desenvolvimento")
+
+    scores = [(nome, rotulo) for nome, rotulo in SCORES.items() if nome in medias]
+    if scores:
+        for coluna, (nome, rotulo) in zip(st.columns(len(scores)), scores):
+            with coluna:
+                media = medias[nome]
+                metric_card("-" if media is None else f"{media:.2f}", rotulo)
+
+    # Só as primeiras linhas da seleção são copiadas para a tabela
+    linhas = np.flatnonzero(indice.mascara(selecao))[:1000]
+    tabela = dados.iloc[linhas]
+    modelo = modelo_risco()
+    if modelo is not None:
+        faltando = modelo.faltando(dados)
+        if faltando:
+            st.warning(f"Modelo de risco não aplicado: colunas ausentes no arquivo ({', '.join(faltando)})")
+        else:
+            # Riscos calculados só para as linhas exibidas e guardados junto com a tabela
+            riscos = cache_csv().derivado(uploaded_file, 'riscos', lambda df: RiscosTabela(modelo, df))
+            tabela = modelo.com_riscos(tabela, riscos.riscos(linhas))
+            if modelo.linhas_por_segundo:
+                st.caption(f"Risco (predict_proba): {modelo.linhas_por_segundo:,.0f} linhas/s")
+    st.dataframe(tabela, use_container_width=True)
@@ -0,0 +1,160 @@
+# Custo de um rerun do Dashboard_Arkham.py com um CSV grande: reler o CSV a cada mudança
+# de filtro contra o CacheCSV (dados_csv.py) com colunas tipadas/categóricas.
+# Uso: python bench_csv.py [linhas]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados_csv import CacheCSV, IndiceFiltros
+
+ESQUEMA_CSV = {
+    'regiao': 'category',
+    'idade_meses': 'float32',
+    'tipo_domicilio': 'category',
+    'acesso_alimentos': 'category',
+}
+SCORES = ['score_alimentos', 'score_saude', 'score_infraestrutura']
+FILTROS = [
+    (['Norte'], (0, 60), ['Casa', 'Apartamento'], "Todos"),
+    (['Norte', 'Sul', 'Nordeste'], (12, 48), ['Casa'], "Sim, sempre"),
+    (['Sudeste'], (0, 24), ['Apartamento', 'Habitação em casa de cômodos'], "Sim, às vezes"),
+]
+
+
+def gerar_csv(caminho, linhas):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'id': np.arange(linhas),
+        'municipio': rng.choice([f"Município {i}" for i in range(5000)], linhas),
+        'regiao': rng.choice(['Norte', 'Sul', 'Sudeste', 'Centro-Oeste', 'Nordeste'], linhas),
+        'idade_meses': rng.integers(0, 61, linhas),
+        'tipo_domicilio': rng.choice(['Casa', 'Apartamento', 'Habitação em casa de cômodos'], linhas),
+        'acesso_alimentos': rng.choice(["Sim, sempre", "Sim, quase sempre", "Sim, às vezes", "Não"], linhas),
+        'peso_kg': rng.normal(12, 3, linhas).round(2),
+        'altura_cm': rng.normal(85, 12, linhas).round(1),
+        'score_alimentos': rng.uniform(0, 10, linhas).round(3),
+        'score_saude': rng.uniform(0, 10, linhas).round(3),
+        'score_infraestrutura': rng.uniform(0, 10, linhas).round(3),
+    }).to_csv(caminho, index=False)
+
+
+def filtrar_texto(df, salas, faixa, tipos, acesso):
+    # Filtro sobre colunas de texto (o que cada rerun faria sem a tipagem)
+    mascara = df['regiao'].isin(salas) & df['idade_meses'].between(*faixa) & df['tipo_domicilio'].isin(tipos)
+    if acesso != "Todos":
+        mascara &= df['acesso_alimentos'] == acesso
+    return df[mascara]
+
+
+def mascara_categorias(coluna, valores):
+    # Tabela booleana indexada pelos códigos da categoria (o último código, -1, é o valor ausente)
+    categorias = coluna.cat.categories
+    tabela = np.zeros(len(categorias) + 1, dtype=bool)
+    tabela[[categorias.get_loc(v) for v in valores if v in categorias]] = True
+    return tabela[coluna.array.codes]
+
+
+def filtrar(df, salas, faixa, tipos, acesso):
+    # Máscaras recalculadas sobre as colunas a cada rerun
+    mascara = mascara_categorias(df['regiao'], salas)
+    idade = df['idade_meses'].to_numpy()
+    mascara &= (idade >= faixa[0]) & (idade <= faixa[1])
+    mascara &= mascara_categorias(df['tipo_domicilio'], tipos)
+    if acesso != "Todos":
+        mascara &= mascara_categorias(df['acesso_alimentos'], [acesso])
+    return df[mascara]
+
+
+def selecao(salas, faixa, tipos, acesso):
+    return {'regiao': salas, 'idade_meses': faixa, 'tipo_domicilio': tipos,
+            'acesso_alimentos': None if acesso == "Todos" else [acesso]}
+
+
+def agregar_indice(indice, f):
+    # O que o Dashboard_Arkham.py faz a cada rerun: agregados da seleção + primeiras linhas da tabela
+    indice.agregados(selecao(*f))
+    return np.flatnonzero(indice.mascara(selecao(*f)))[:1000]
+
+
+def agregar_mascaras(df, f):
+    filtrados = filtrar(df, *f)
+    [filtrados[nome].mean() for nome in SCORES]
+    return filtrados.head(1000)
+
+
+def medir(funcao, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def upload(caminho):
+    # Como o UploadedFile do Streamlit: arquivo binário com um file_id por envio
+    arquivo = open(caminho, 'rb')
+    arquivo.file_id = caminho
+    return arquivo
+
+
+if __name__ == '__main__':
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000_000
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'dados.csv')
+        gerar_csv(caminho, linhas)
+        print(f"CSV de {linhas:,} linhas, {os.path.getsize(caminho) / 2**20:.0f} MiB\n")
+
+        leitura, bruto = medir(lambda: pd.read_csv(caminho), repeticoes=1)
+        filtro, _ = medir(lambda: [filtrar_texto(bruto, *f) for f in FILTROS])
+        filtro /= len(FILTROS)
+        print("Antes: CSV relido a cada rerun")
+        print(f"  pd.read_csv                    {leitura * 1000:9.0f} ms")
+        print(f"  filtro sobre colunas de texto  {filtro * 1000:9.1f} ms")
+        print(f"  rerun                          {(leitura + filtro) * 1000:9.0f} ms"
+              f"   memória {bruto.memory_usage(deep=True).sum() / 2**20:.0f} MiB\n")
+
+        cache = CacheCSV(pasta=os.path.join(pasta, 'cache'), esquema=ESQUEMA_CSV)
+        arquivo = upload(caminho)
+        primeira, dados = medir(lambda: cache.carregar(arquivo), repeticoes=1)
+        repetida, _ = medir(lambda: cache.carregar(arquivo), repeticoes=5)
+        filtro, _ = medir(lambda: [filtrar(dados, *f) for f in FILTROS])
+        filtro /= len(FILTROS)
+        reinicio = CacheCSV(pasta=os.path.join(pasta, 'cache'), esquema=ESQUEMA_CSV)
+        disco, _ = medir(lambda: reinicio.carregar(upload(caminho)), repeticoes=1)
+        print("Depois: CacheCSV")
+        print(f"  primeiro envio (hash + leitura + tipagem + Feather) {primeira * 1000:9.0f} ms")
+        print(f"  após reinício do servidor (hash + Feather)          {disco * 1000:9.0f} ms")
+        print(f"  carregar() em cada rerun                            {repetida * 1000:9.3f} ms")
+        print(f"  filtro sobre categorias                             {filtro * 1000:9.1f} ms")
+        print(f"  rerun                                               {(repetida + filtro) * 1000:9.1f} ms"
+              f"   memória {cache.bytes / 2**20:.0f} MiB\n")
+
+        construir = lambda df: IndiceFiltros(df, ['regiao', 'tipo_domicilio', 'acesso_alimentos'],
+                                             {'idade_meses': [0, 12, 24, 36, 48, 60]}, SCORES)
+        montagem, indice = medir(lambda: construir(dados), repeticoes=1)
+        mascaras, _ = medir(lambda: [agregar_mascaras(dados, f) for f in FILTROS])
+        primeira = 0.0
+        for f in FILTROS:
+            inicio = time.perf_counter()
+            agregar_indice(indice, f)
+            primeira += time.perf_counter() - inicio
+        repetida, _ = medir(lambda: [agregar_indice(indice, f) for f in FILTROS])
+        print("Filtro + médias dos scores + 1000 primeiras linhas, por rerun")
+        print(f"  máscaras sobre as colunas (antes)                   {mascaras / len(FILTROS) * 1000:9.1f} ms")
+        print(f"  IndiceFiltros: montagem (uma vez por tabela)        {montagem * 1000:9.1f} ms")
+        print(f"  IndiceFiltros: seleção nova                         {primeira / len(FILTROS) * 1000:9.1f} ms")
+        print(f"  IndiceFiltros: seleção repetida (agregados em cache) {repetida / len(FILTROS) * 1000:8.1f} ms")
+
+        for f in FILTROS:
+            esperado = filtrar_texto(bruto, *f)
+            assert len(filtrar(dados, *f)) == len(esperado)
+            agregados = indice.agregados(selecao(*f))
+            assert agregados['contagem'] == len(esperado)
+            for nome in SCORES:
+                assert abs(agregados['medias'][nome] - esperado[nome].mean()) < 1e-3
+            assert (np.flatnonzero(indice.mascara(selecao(*f))) == esperado.index.to_numpy()).all()
@@ -0,0 +1,127 @@
+# Tempo por quadro dos gráficos Matplotlib de teste.py/teste2.py: figura nova a cada
+# atualização (plt.subplots + st.pyplot) contra a figura reaproveitada de figuras.py.
+# Uso: python bench_figuras.py [quadros]
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoramento-Arkham"))
+from ecg import ECGGenerator, SweepBuffer
+from figuras import GraficoLinhas
+
+
+def png_pyplot(fig):
+    # O que o st.pyplot faz com a figura
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=200, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+# === ANTES: figura nova por quadro, nunca fechada ===
+def antigo_ecg(t, y):
+    fig, ax = plt.subplots(figsize=(10, 2))
+    ax.plot(t, y, color='blue')
+    ax.set_title("Gráfico ECG")
+    ax.axis("off")
+    return png_pyplot(fig)
+
+
+def antigo_temperatura(t, original, filtrada):
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(t, original, label='Temperatura Original', color='red', alpha=0.5)
+    ax.plot(t, filtrada, label='Temperatura Filtrada', color='green', linewidth=2)
+    ax.set_ylabel("Temperatura (°C)")
+    ax.set_title("Temperatura Corporal")
+    ax.legend()
+    return png_pyplot(fig)
+
+
+# === DEPOIS: figura criada uma vez (como em teste2.py) ===
+def novo_grafico_ecg():
+    grafico = GraficoLinhas(figsize=(10, 2))
+    grafico.linha('ecg', color='blue')
+    grafico.eixo.set_title("Gráfico ECG")
+    grafico.eixo.axis("off")
+    grafico.limites_x = (0, 5)
+    grafico.limites_y = (-1, 2.5)
+    return grafico
+
+
+def novo_grafico_temperatura():
+    grafico = GraficoLinhas(figsize=(10, 4))
+    grafico.linha('original', label='Temperatura Original', color='red', alpha=0.5)
+    grafico.linha('filtrada', label='Temperatura Filtrada', color='green', linewidth=2)
+    grafico.eixo.set_ylabel("Temperatura (°C)")
+    grafico.eixo.set_title("Temperatura Corporal")
+    grafico.eixo.legend()
+    return grafico
+
+
+def medir(nome, quadro, quadros):
+    tempos = []
+    for i in range(quadros):
+        inicio = time.perf_counter()
+        quadro(i)
+        tempos.append(time.perf_counter() - inicio)
+    tempos = np.array(tempos[1:]) * 1000  # o primeiro quadro cria a figura
+    # Memória retida por mais quadros, medida à parte (o tracemalloc deixa tudo mais lento)
+    tracemalloc.start()
+    for i in range(quadros):
+        quadro(i)
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{nome:<34} mediana {np.median(tempos):7.1f} ms  p95 {np.percentile(tempos, 95):7.1f} ms"
+          f"  memória retida {memoria / 2**20:6.1f} MiB  figuras pyplot abertas {len(plt.get_fignums())}")
+    return np.median(tempos)
+
+
+if __name__ == '__main__':
+    quadros = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+
+    gerador = ECGGenerator(fs=100, noise=0.1)
+    tela = SweepBuffer(500, fs=100)
+
+    def sinal_ecg(i):
+        tela.write(gerador.next(100, 75, amplitude=2))
+        return tela.sweep()
+
+    tempo = np.datetime64('2026-01-01T00:00') + np.arange(quadros * 2) * np.timedelta64(2, 's')
+    temperatura = 36.5 + np.cumsum(np.random.default_rng(0).normal(0, 0.05, len(tempo)))
+    filtrada = np.convolve(temperatura, np.ones(5) / 5, mode='same')
+
+    def serie(i):
+        n = quadros + i  # o histórico cresce a cada atualização
+        return tempo[:n], temperatura[:n], filtrada[:n]
+
+    print("ECG (10 x 2 pol., 200 dpi, tela fixa)")
+    antes = medir("  antes: plt.subplots + savefig", lambda i: antigo_ecg(*sinal_ecg(i)), quadros)
+    plt.close('all')
+    grafico = novo_grafico_ecg()
+
+    def quadro_ecg(i):
+        x, y = sinal_ecg(i)
+        grafico.atualizar(ecg=(x, y))
+        return grafico.renderizar()
+    depois = medir("  depois: set_data + blit + PNG", quadro_ecg, quadros)
+    grafico.fechar()
+    print(f"  ganho: {antes / depois:.1f}x\n")
+
+    print("Temperatura (10 x 4 pol., 200 dpi, eixo x cresce a cada quadro)")
+    antes = medir("  antes: plt.subplots + savefig", lambda i: antigo_temperatura(*serie(i)), quadros)
+    plt.close('all')
+    grafico = novo_grafico_temperatura()
+
+    def quadro_temperatura(i):
+        t, original, media = serie(i)
+        grafico.atualizar(original=(t, original), filtrada=(t, media))
+        return grafico.renderizar()
+    depois = medir("  depois: set_data + draw + PNG", quadro_temperatura, quadros)
+    grafico.fechar()
+    print(f"  ganho: {antes / depois:.1f}x")
@@ -0,0 +1,147 @@
+# Leitura do /paciente com o BancoLocal (firebase_local.py) no lugar do Realtime Database:
+# custo por atualização (get() síncrono contra o cache do LeitorFirebase), vazão e atraso
+# dos eventos e comportamento durante uma queda de conexão.
+# Uso: python bench_firebase.py [latencia_em_ms]
+import sys
+import threading
+import time
+
+import numpy as np
+
+from firebase_local import BancoLocal
+from leitor_firebase import LeitorFirebase
+
+
+def leitura(i):
+    return {'heart_rate': 60 + i % 40, 'spo2': 98, 'temperature': 36.5, 'enviado': time.monotonic()}
+
+
+def esperar_dados(leitor, limite=5):
+    fim = time.monotonic() + limite
+    while leitor.ultimo()[0] is None and time.monotonic() < fim:
+        time.sleep(0.001)
+
+
+def resumo(nome, valores_ms):
+    valores_ms = np.asarray(valores_ms)
+    print(f"  {nome:<40} média {valores_ms.mean():9.3f} ms  p95 {np.percentile(valores_ms, 95):9.3f} ms"
+          f"  máx {valores_ms.max():9.3f} ms")
+
+
+def custo_por_atualizacao(latencia, atualizacoes=50):
+    print(f"Custo de cada atualização da página (latência simulada {latencia * 1000:.0f} ms)")
+    banco = BancoLocal({'paciente': leitura(0)}, latencia=latencia)
+    ref = banco.reference('/paciente')
+
+    tempos = []
+    for _ in range(atualizacoes):
+        inicio = time.perf_counter()
+        ref.get()  # get_firebase_data() antigo
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    resumo("antes: ref.get() a cada atualização", tempos)
+
+    leitor = LeitorFirebase(ref)
+    esperar_dados(leitor)
+    tempos = []
+    for _ in range(atualizacoes):
+        inicio = time.perf_counter()
+        leitor.ultimo()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    resumo("depois: LeitorFirebase.ultimo()", tempos)
+    leitor.parar()
+
+
+def vazao(escritas=5000):
+    print("\nVazão do listener (sem latência: só o custo do BancoLocal + LeitorFirebase)")
+    banco = BancoLocal({'paciente': leitura(0)})
+    ref = banco.reference('/paciente')
+    leitor = LeitorFirebase(ref)
+    esperar_dados(leitor)
+    inicial = leitor.eventos
+    inicio = time.perf_counter()
+    for i in range(escritas):
+        ref.update({'heart_rate': 60 + i % 40})
+    while leitor.eventos - inicial < escritas:
+        time.sleep(0.001)
+    duracao = time.perf_counter() - inicio
+    print(f"  {escritas} eventos patch em {duracao:.2f} s: {escritas / duracao:,.0f} eventos/s")
+    leitor.parar()
+
+
+def atraso(latencia, taxa=20, duracao=3):
+    print(f"\nIdade do cache ao chegar cada leitura ({taxa} escritas/s, latência {latencia * 1000:.0f} ms)")
+    banco = BancoLocal({'paciente': leitura(0)}, latencia=latencia)
+    ref = banco.reference('/paciente')
+    leitor = LeitorFirebase(ref)
+    esperar_dados(leitor)
+    parar = threading.Event()
+
+    def escrever():
+        i = 0
+        while not parar.is_set():
+            ref.set(leitura(i))
+            i += 1
+            parar.wait(1 / taxa)
+
+    threading.Thread(target=escrever, daemon=True).start()
+    atrasos, visto = [], None
+    fim = time.monotonic() + duracao
+    while time.monotonic() < fim:
+        dados, _ = leitor.ultimo()
+        if dados['enviado'] != visto:
+            visto = dados['enviado']
+            atrasos.append((time.monotonic() - visto) * 1000)
+        time.sleep(0.001)
+    parar.set()
+    resumo("set() + entrega do evento até o cache", atrasos[1:])
+    leitor.parar()
+
+
+def queda(latencia, fora_do_ar=3.0):
+    print(f"\nQueda de conexão de {fora_do_ar:.0f} s (latência {latencia * 1000:.0f} ms)")
+    banco = BancoLocal({'paciente': leitura(0)}, latencia=latencia)
+    ref = banco.reference('/paciente')
+    leitor = LeitorFirebase(ref, verificar_cada=0.05)
+    esperar_dados(leitor)
+    parar = threading.Event()
+
+    def escrever():
+        i = 0
+        while not parar.is_set():
+            try:
+                ref.set(leitura(i))
+            except ConnectionError:
+                pass
+            i += 1
+            parar.wait(0.1)
+
+    threading.Thread(target=escrever, daemon=True).start()
+    time.sleep(0.5)
+    banco.falhar()
+    queda_em = time.monotonic()
+    tempos, idade_max = [], 0.0
+    while time.monotonic() - queda_em < fora_do_ar:
+        inicio = time.perf_counter()
+        _, idade = leitor.ultimo()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        idade_max = max(idade_max, idade)
+        time.sleep(0.01)
+    resumo("ultimo() com o banco fora do ar", tempos)
+    print(f"  idade máxima do cache durante a queda: {idade_max:.2f} s"
+          f" ({leitor.falhas} tentativas de reconexão, erro: {leitor.ultimo_erro})")
+    banco.restaurar()
+    restaurado_em = time.monotonic()
+    while leitor.idade() > time.monotonic() - restaurado_em:
+        time.sleep(0.001)
+    print(f"  dados novos {time.monotonic() - restaurado_em:.2f} s depois de o banco voltar"
+          " (inclui o backoff da reconexão)")
+    parar.set()
+    leitor.parar()
+
+
+if __name__ == '__main__':
+    latencia = (float(sys.argv[1]) if len(sys.argv) > 1 else 80) / 1000
+    custo_por_atualizacao(latencia)
+    vazao()
+    atraso(latencia)
+    queda(latencia)
@@ -0,0 +1,113 @@
+# Tempo de importação na partida de cada dashboard (python -X importtime em um processo novo,
+# com os imports que rodam no nível do módulo, inclusive dentro de if/try/with) e orçamento por
+# dashboard: sai com código 1 se algum passar do orçamento. O tempo do próprio streamlit não
+# entra na conta.
+# Uso: python bench_importacao.py [repeticoes]
+import ast
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+MONITORAMENTO = os.path.join(PASTA, "..", "Monitoramento-Arkham")
+
+# Orçamento (ms) dos imports de cada dashboard, além do streamlit
+ORCAMENTOS = {
+    os.path.join(PASTA, "Dashboard_Arkham.py"): 900,
+    os.path.join(PASTA, "Dashboard Arkham.py"): 400,
+    os.path.join(PASTA, "teste.py"): 1000,
+    os.path.join(PASTA, "teste2.py"): 1000,
+    os.path.join(MONITORAMENTO, "dashboard-tempo-real.py"): 500,
+}
+MAIS_PESADOS = 8
+
+
+def _imports_do_modulo(nos, condicional=False):
+    # Imports executados ao carregar o script: os do corpo do módulo e os de blocos if/try/with/for
+    # e corpos de classe (que também rodam na importação). Só os de dentro de funções são sob demanda.
+    for no in nos:
+        if isinstance(no, (ast.Import, ast.ImportFrom)):
+            yield no, condicional
+        elif isinstance(no, ast.ClassDef):
+            yield from _imports_do_modulo(no.body, condicional)
+        elif not isinstance(no, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            filhos = [getattr(no, campo, []) for campo in ("body", "orelse", "finalbody")]
+            filhos += [handler.body for handler in getattr(no, "handlers", [])]
+            for bloco in filhos:
+                if isinstance(bloco, list):
+                    yield from _imports_do_modulo(bloco, True)
+
+
+def imports_do_topo(caminho):
+    """Código com os imports do nível do módulo.
+
+    Os condicionais (ex.: "if not FIREBASE_LOCAL: import firebase_admin") entram todos, já que o
+    caminho padrão costuma passar por eles; se o pacote não estiver instalado, o nome é listado na
+    saída em vez de derrubar a medição.
+    """
+    with open(caminho, encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    linhas = ["_faltando = []"]
+    for no, condicional in _imports_do_modulo(arvore.body):
+        if condicional:
+            modulo = no.names[0].name if isinstance(no, ast.Import) else no.module
+            linhas += ["try:", f"    {ast.unparse(no)}", "except ImportError:", f"    _faltando.append({modulo!r})"]
+        else:
+            linhas.append(ast.unparse(no))
+    linhas.append("print(','.join(_faltando))")
+    return "\n".join(linhas)
+
+
+def medir(caminho):
+    """([(profundidade, módulo, próprio_us, acumulado_us)] na ordem do -X importtime, [não instalados])."""
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join([PASTA, MONITORAMENTO]))
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", imports_do_topo(caminho)],
+                              cwd=os.path.dirname(caminho), env=ambiente,
+                              capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(caminho)}: {processo.stderr.strip().splitlines()[-1]}")
+    linhas = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        profundidade = (len(nome) - len(nome.lstrip()) - 1) // 2
+        linhas.append((profundidade, nome.strip(), int(proprio), int(acumulado)))
+    return linhas, list(dict.fromkeys(nome for nome in processo.stdout.strip().split(",") if nome))
+
+
+def resumo(linhas):
+    # Tempo total (sem o streamlit) e tempo próprio somado por pacote
+    total = sum(acumulado for profundidade, nome, _, acumulado in linhas
+                if profundidade == 0 and nome != "streamlit")
+    pacotes = defaultdict(int)
+    dentro_do_streamlit = False
+    for profundidade, nome, proprio, _ in reversed(linhas):
+        # O -X importtime lista os filhos antes do pai: o que vem antes de "streamlit" (nível 0) é dele
+        if profundidade == 0:
+            dentro_do_streamlit = nome == "streamlit"
+        if not dentro_do_streamlit:
+            pacotes[nome.split(".")[0]] += proprio
+    return total / 1000, sorted(pacotes.items(), key=lambda item: -item[1])
+
+
+if __name__ == '__main__':
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    estourados = []
+    for caminho, orcamento in ORCAMENTOS.items():
+        nome = os.path.basename(caminho)
+        # O menor de algumas execuções: a primeira ainda paga a leitura dos .pyc do disco
+        medicoes = [medir(caminho) for _ in range(repeticoes)]
+        total, pacotes = min((resumo(linhas) for linhas, _ in medicoes), key=lambda r: r[0])
+        situacao = "ok" if total <= orcamento else "ACIMA DO ORÇAMENTO"
+        print(f"{nome:<26} {total:8.0f} ms  (orçamento {orcamento} ms)  {situacao}")
+        if medicoes[0][1]:
+            print(f"    não instalados (fora da medição): {', '.join(medicoes[0][1])}")
+        for pacote, proprio in pacotes[:MAIS_PESADOS]:
+            print(f"    {pacote:<28} {proprio / 1000:8.1f} ms")
+        if total > orcamento:
+            estourados.append(nome)
+    if estourados:
+        print(f"\nAcima do orçamento: {', '.join(estourados)}")
+        sys.exit(1)
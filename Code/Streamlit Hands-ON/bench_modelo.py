@@ -0,0 +1,107 @@
+# Risco por modelo no Dashboard_Arkham.py: custo de carregar/treinar o modelo dentro de um
+# rerun contra o ModeloRisco carregado uma vez (modelo_risco.py), vazão do predict_proba em
+# lotes, memória de pico com o limite por lote e custo por rerun da tabela de 1000 linhas.
+# Uso: python bench_modelo.py [linhas]
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from modelo_risco import ModeloRisco, RiscosTabela
+
+COLUNAS = ['idade_meses', 'peso_kg', 'altura_cm', 'score_alimentos', 'score_saude', 'score_infraestrutura']
+TREINO = 50_000
+PREVIA = 1000
+
+
+def gerar(linhas, semente=0):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        'idade_meses': rng.integers(0, 61, linhas).astype(np.float32),
+        'peso_kg': rng.normal(12, 3, linhas).astype(np.float32),
+        'altura_cm': rng.normal(85, 12, linhas).astype(np.float32),
+        'score_alimentos': rng.uniform(0, 10, linhas).astype(np.float32),
+        'score_saude': rng.uniform(0, 10, linhas).astype(np.float32),
+        'score_infraestrutura': rng.uniform(0, 10, linhas).astype(np.float32),
+    })
+    risco = 3 - 0.25 * df['peso_kg'] - 0.15 * df['score_alimentos'] + rng.normal(0, 0.5, linhas)
+    df['desnutricao'] = (risco > 0).astype(np.int8)
+    return df
+
+
+def treinar(df):
+    modelo = RandomForestClassifier(n_estimators=100, max_depth=12, n_jobs=-1, random_state=0)
+    return modelo.fit(df[COLUNAS], df['desnutricao'])
+
+
+def medir(funcao, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def pico(funcao):
+    tracemalloc.start()
+    funcao()
+    _, maximo = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return maximo / 2 ** 20
+
+
+if __name__ == '__main__':
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dados = gerar(linhas)
+    previa = np.flatnonzero(dados['idade_meses'].to_numpy() <= 24)[:PREVIA]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'modelo_risco.pkl')
+        treino, modelo = medir(lambda: treinar(gerar(TREINO, semente=1)), repeticoes=1)
+        with open(caminho, 'wb') as arquivo:
+            pickle.dump(modelo, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Modelo: RandomForest (100 árvores) treinado com {TREINO:,} linhas,"
+              f" pickle de {os.path.getsize(caminho) / 2**20:.1f} MiB\n")
+
+        def carregar():
+            with open(caminho, 'rb') as arquivo:
+                return pickle.load(arquivo)
+
+        carga, _ = medir(carregar)
+        predicao, _ = medir(lambda: modelo.predict_proba(dados.iloc[previa][COLUNAS]))
+        print(f"Antes: modelo obtido dentro do rerun (tabela de {PREVIA} linhas)")
+        print(f"  treinar a cada rerun         {(treino + predicao) * 1000:9.0f} ms")
+        print(f"  pickle.load a cada rerun     {(carga + predicao) * 1000:9.0f} ms\n")
+
+        risco = ModeloRisco.carregar(caminho)
+        tabela = RiscosTabela(risco, dados)
+        primeira, _ = medir(lambda: risco.com_riscos(dados.iloc[previa], tabela.riscos(previa)), repeticoes=1)
+        repetida, _ = medir(lambda: risco.com_riscos(dados.iloc[previa], tabela.riscos(previa)), repeticoes=5)
+        print("Depois: ModeloRisco em cache (st.cache_resource) + RiscosTabela por tabela")
+        print(f"  carregar o modelo (uma vez por processo)      {carga * 1000:9.0f} ms")
+        print(f"  rerun com linhas novas na tabela              {primeira * 1000:9.1f} ms")
+        print(f"  rerun com as mesmas linhas                    {repetida * 1000:9.2f} ms\n")
+
+        completo, riscos = medir(lambda: risco.pontuar(dados), repeticoes=1)
+        print(f"Vazão do predict_proba em lotes ({linhas:,} linhas, lotes de {risco.tamanho_lote:,})")
+        print(f"  {linhas / completo:,.0f} linhas/s\n")
+
+        amostra = dados.iloc[:min(linhas, 500_000)]
+        sem_limite = pico(lambda: modelo.predict_proba(amostra[COLUNAS]))
+        com_limite = pico(lambda: ModeloRisco(modelo, max_bytes_lote=8 * 2**20).pontuar(amostra))
+        print(f"Memória de pico para {len(amostra):,} linhas")
+        print(f"  predict_proba da tabela inteira            {sem_limite:9.0f} MiB")
+        print(f"  ModeloRisco (lotes de 8 MiB)               {com_limite:9.0f} MiB")
+
+        esperado = modelo.predict_proba(dados[COLUNAS])
+        assert np.allclose(riscos, esperado, atol=1e-6)
+        assert np.allclose(tabela.riscos(previa), esperado[previa], atol=1e-6)
+        registros = dados.iloc[:10][COLUNAS].to_dict('records')
+        assert np.allclose(risco.pontuar_registros(registros), esperado[:10], atol=1e-6)
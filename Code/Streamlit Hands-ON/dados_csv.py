@@ -0,0 +1,276 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pyarrow import csv as pa_csv
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
+# Memória máxima ocupada pelas tabelas carregadas; acima disso a usada há mais tempo sai
+MAX_BYTES = 1024 * 1024 ** 2
+# Cópias em Feather das tabelas já tipadas (sobrevivem ao reinício do servidor); acima de
+# MAX_BYTES_DISCO na pasta, os arquivos usados há mais tempo (mtime) são apagados
+PASTA_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "arkham", "csv")
+MAX_BYTES_DISCO = 4 * 1024 ** 3
+# Uploads (file_id) com hash lembrado; o usado há mais tempo sai
+MAX_UPLOADS = 256
+# Colunas de texto com menos valores distintos que essa fração das linhas viram categoria
+LIMITE_CATEGORIA = 0.5
+# Com pyarrow, colunas de texto com até essa quantidade de valores distintos já são lidas como categoria
+MAX_CATEGORIAS = 100_000
+TAMANHO_LEITURA = 8 * 1024 ** 2
+# Seleções de filtro com agregados guardados em cada IndiceFiltros (a usada há mais tempo sai)
+MAX_AGREGADOS = 256
+
+
+def hash_conteudo(arquivo):
+    """Hash do conteúdo do arquivo (lido em blocos, sem carregar tudo na memória)."""
+    h = hashlib.blake2b(digest_size=16)
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(TAMANHO_LEITURA), b""):
+        h.update(bloco)
+    arquivo.seek(0)
+    return h.hexdigest()
+
+
+def tipar(df, esquema=None):
+    """Converte as colunas para tipos compactos: categorias para texto repetido e números reduzidos."""
+    esquema = esquema or {}
+    colunas = {}
+    for nome, coluna in df.items():
+        tipo = esquema.get(nome)
+        if tipo is not None:
+            colunas[nome] = coluna.astype(tipo)
+        elif coluna.dtype == object or pd.api.types.is_string_dtype(coluna):
+            if coluna.nunique(dropna=True) <= LIMITE_CATEGORIA * len(coluna):
+                colunas[nome] = coluna.astype("category")
+            else:
+                colunas[nome] = coluna
+        elif pd.api.types.is_integer_dtype(coluna):
+            colunas[nome] = pd.to_numeric(coluna, downcast="integer")
+        elif pd.api.types.is_float_dtype(coluna):
+            colunas[nome] = pd.to_numeric(coluna, downcast="float")
+        else:
+            colunas[nome] = coluna
+    return pd.DataFrame(colunas)
+
+
+class CacheCSV:
+    """Tabelas carregadas de CSVs enviados, indexadas pelo hash do conteúdo.
+
+    O CSV é lido e tipado uma única vez (tipar()); reenviar o mesmo arquivo,
+    ou qualquer rerun do Streamlit, devolve o mesmo DataFrame em memória, que
+    deve ser tratado como somente leitura. A memória é limitada a `max_bytes`,
+    descartando a tabela usada há mais tempo (LRU). Com pyarrow, uma cópia em
+    Feather fica em `pasta` e é lida no lugar do CSV depois de um reinício; a
+    pasta é limitada a `max_bytes_disco` pelo mesmo critério, usando o mtime
+    (renovado a cada leitura) como data do último uso.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, pasta=PASTA_CACHE, esquema=None, max_bytes_disco=MAX_BYTES_DISCO):
+        self.max_bytes = max_bytes
+        self.max_bytes_disco = max_bytes_disco
+        self.pasta = pasta if PYARROW else None
+        self.esquema = esquema or {}
+        self.bytes = 0
+        self._tabelas = OrderedDict()  # hash -> (DataFrame, bytes)
+        self._derivados = {}  # hash -> {nome: objeto calculado a partir da tabela}
+        self._hashes = OrderedDict()  # file_id do upload -> hash (o conteúdo só é lido uma vez por upload)
+        self._lock = threading.Lock()
+
+    def chave(self, arquivo):
+        chave_upload = getattr(arquivo, "file_id", None)
+        if chave_upload:
+            with self._lock:
+                chave = self._hashes.get(chave_upload)
+                if chave is not None:
+                    self._hashes.move_to_end(chave_upload)
+                    return chave
+        chave = hash_conteudo(arquivo)
+        if chave_upload:
+            with self._lock:
+                self._hashes[chave_upload] = chave
+                while len(self._hashes) > MAX_UPLOADS:
+                    self._hashes.popitem(last=False)
+        return chave
+
+    def carregar(self, arquivo):
+        chave = self.chave(arquivo)
+        with self._lock:
+            if chave in self._tabelas:
+                self._tabelas.move_to_end(chave)
+                return self._tabelas[chave][0]
+        df = self._ler(chave, arquivo)
+        with self._lock:
+            self._guardar(chave, df)
+        return df
+
+    def derivado(self, arquivo, nome, construir):
+        """construir(df) calculado uma vez por tabela (ex.: IndiceFiltros); sai da cache junto com ela."""
+        df = self.carregar(arquivo)
+        chave = self.chave(arquivo)
+        with self._lock:
+            derivados = self._derivados.setdefault(chave, {})
+            if nome in derivados:
+                return derivados[nome]
+        objeto = construir(df)
+        with self._lock:
+            return derivados.setdefault(nome, objeto)
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, f"{chave}.feather")
+
+    def _ler(self, chave, arquivo):
+        if self.pasta and os.path.exists(self._caminho(chave)):
+            try:
+                df = pd.read_feather(self._caminho(chave))
+                os.utime(self._caminho(chave))  # marca como usado agora (ver _limitar_pasta)
+                return df
+            except FileNotFoundError:
+                pass  # apagado por outro processo entre a verificação e a leitura: lê o CSV
+        arquivo.seek(0)
+        if PYARROW:
+            # Texto repetido chega como dicionário (categoria) sem passar por uma coluna de strings
+            opcoes = pa_csv.ConvertOptions(auto_dict_encode=True, auto_dict_max_cardinality=MAX_CATEGORIAS)
+            df = pa_csv.read_csv(arquivo, convert_options=opcoes).to_pandas()
+        else:
+            df = pd.read_csv(arquivo)
+        df = tipar(df, {nome: tipo for nome, tipo in self.esquema.items() if nome in df.columns})
+        if self.pasta:
+            os.makedirs(self.pasta, exist_ok=True)
+            temporario = self._caminho(chave) + ".tmp"
+            df.to_feather(temporario)
+            os.replace(temporario, self._caminho(chave))
+            self._limitar_pasta(manter=chave)
+        return df
+
+    def _limitar_pasta(self, manter):
+        # Apaga as cópias usadas há mais tempo até a pasta caber em max_bytes_disco;
+        # a recém-gravada fica mesmo que sozinha passe do limite
+        arquivos = []
+        for entrada in os.scandir(self.pasta):
+            if entrada.name.endswith(".feather") and entrada.name != f"{manter}.feather":
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                arquivos.append((info.st_mtime, info.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos) + os.path.getsize(self._caminho(manter))
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def _guardar(self, chave, df):
+        tamanho = int(df.memory_usage(deep=True).sum())
+        if chave in self._tabelas:
+            self.bytes -= self._tabelas.pop(chave)[1]
+        self._tabelas[chave] = (df, tamanho)
+        self.bytes += tamanho
+        # Mantém sempre a tabela recém-carregada, mesmo que sozinha passe do limite
+        while self.bytes > self.max_bytes and len(self._tabelas) > 1:
+            descartada, (_, liberado) = self._tabelas.popitem(last=False)
+            self._derivados.pop(descartada, None)
+            self.bytes -= liberado
+
+
+class IndiceFiltros:
+    """Bitmaps dos filtros da barra lateral, montados uma vez por tabela carregada.
+
+    Cada valor das colunas categóricas vira um bitmap (1 bit por linha, via
+    np.packbits), assim como "valor >= limite" e "valor <= limite" para cada
+    limite das colunas de faixa. Uma seleção é resolvida com OR dos bitmaps
+    dentro de cada coluna e AND entre colunas, sem voltar à tabela. Contagem e
+    médias dos indicadores de cada seleção saem de um único produto
+    matriz-vetor e ficam guardadas (até MAX_AGREGADOS seleções).
+    """
+
+    def __init__(self, df, categorias=(), faixas=None, indicadores=()):
+        self.linhas = len(df)
+        self._todas = np.packbits(np.ones(self.linhas, dtype=bool))
+        self._categorias = {}
+        for nome in categorias:
+            if nome not in df:
+                continue
+            coluna = df[nome] if isinstance(df[nome].dtype, pd.CategoricalDtype) else df[nome].astype("category")
+            codigos = coluna.array.codes
+            self._categorias[nome] = {valor: np.packbits(codigos == i)
+                                      for i, valor in enumerate(coluna.cat.categories)}
+        self._faixas = {}
+        for nome, limites in (faixas or {}).items():
+            if nome not in df:
+                continue
+            valores = df[nome].to_numpy()
+            self._faixas[nome] = (valores,
+                                  {limite: np.packbits(valores >= limite) for limite in limites},
+                                  {limite: np.packbits(valores <= limite) for limite in limites})
+        # Indicadores como matriz (indicador x linha); ausentes valem 0 e saem da contagem de cada indicador
+        self.indicadores = [nome for nome in indicadores if nome in df]
+        matriz = df[self.indicadores].to_numpy(dtype=np.float32).T.copy()
+        ausentes = np.isnan(matriz)
+        self._presentes = (~ausentes).astype(np.float32) if ausentes.any() else None
+        matriz[ausentes] = 0
+        self._valores = matriz
+        self._agregados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bitmap(self, selecao):
+        """selecao: {coluna: valores} para categorias, {coluna: (mín, máx)} para faixas; None não filtra."""
+        resultado = self._todas
+        for nome, escolha in selecao.items():
+            if escolha is None:
+                continue
+            if nome in self._categorias:
+                bitmaps = self._categorias[nome]
+                coluna = np.zeros_like(self._todas)
+                for valor in escolha:
+                    if valor in bitmaps:
+                        coluna |= bitmaps[valor]
+            elif nome in self._faixas:
+                valores, desde, ate = self._faixas[nome]
+                minimo, maximo = escolha
+                # Limites fora dos pré-calculados ainda funcionam, comparando a coluna
+                coluna = desde[minimo] if minimo in desde else np.packbits(valores >= minimo)
+                coluna = coluna & (ate[maximo] if maximo in ate else np.packbits(valores <= maximo))
+            else:
+                continue
+            resultado = resultado & coluna
+        return resultado
+
+    def mascara(self, selecao):
+        return np.unpackbits(self.bitmap(selecao), count=self.linhas).view(bool)
+
+    def agregados(self, selecao):
+        """{'contagem': linhas selecionadas, 'medias': {indicador: média ou None}}."""
+        chave = tuple(sorted(
+            (nome, tuple(sorted(escolha)) if nome in self._categorias else tuple(escolha))
+            for nome, escolha in selecao.items() if escolha is not None
+        ))
+        with self._lock:
+            if chave in self._agregados:
+                self._agregados.move_to_end(chave)
+                return self._agregados[chave]
+        pesos = self.mascara(selecao).astype(np.float32)
+        contagem = int(np.count_nonzero(pesos))
+        somas = self._valores @ pesos
+        presentes = self._presentes @ pesos if self._presentes is not None else np.full(len(somas), contagem)
+        resultado = {
+            'contagem': contagem,
+            'medias': {nome: float(soma / n) if n else None
+                       for nome, soma, n in zip(self.indicadores, somas, presentes)},
+        }
+        with self._lock:
+            self._agregados[chave] = resultado
+            while len(self._agregados) > MAX_AGREGADOS:
+                self._agregados.popitem(last=False)
+        return resultado
@@ -0,0 +1,109 @@
+from collections import deque
+
+import numpy as np
+
+# Capacidade inicial de cada coluna; dobra quando enche
+CAPACIDADE_INICIAL = 4096
+
+
+class DadosSessao:
+    """Séries da sessão guardadas em colunas NumPy contíguas.
+
+    adicionar() grava cada amostra na próxima posição livre de cada coluna, sem
+    copiar o histórico (o pd.concat a cada atualização custava O(n) por amostra);
+    quando a capacidade acaba a coluna dobra de tamanho, então o custo da cópia
+    é O(1) amortizado. coluna() devolve uma view das posições preenchidas, sem
+    concatenar nada.
+    Contagem, soma, mínimo e máximo de cada coluna numérica são atualizados na
+    chegada, então média() é O(1). A média móvel de uma coluna também é
+    calculada de forma incremental e guardada como coluna "<nome>_filtrada".
+    O DataFrame só é montado quando pedido (para_dataframe()).
+    """
+
+    def __init__(self, colunas, capacidade_inicial=CAPACIDADE_INICIAL):
+        self.colunas = dict(colunas)
+        self.capacidade = capacidade_inicial
+        self.tamanho = 0
+        self._arrays = {nome: np.empty(capacidade_inicial, dtype=tipo) for nome, tipo in self.colunas.items()}
+        self.agregados = {
+            nome: {'contagem': 0, 'soma': 0.0, 'min': np.inf, 'max': -np.inf}
+            for nome, tipo in self.colunas.items() if np.dtype(tipo).kind in 'fiu'
+        }
+        self._filtros = {}  # coluna filtrada -> [coluna de origem, janela, últimos valores, soma]
+
+    def __len__(self):
+        return self.tamanho
+
+    @property
+    def vazio(self):
+        return self.tamanho == 0
+
+    def adicionar(self, linha):
+        posicao = self.tamanho
+        if posicao == self.capacidade:
+            self._crescer(2 * self.capacidade)
+        for nome, array in self._arrays.items():
+            valor = self._valor(nome, linha)
+            array[posicao] = valor
+            agregado = self.agregados.get(nome)
+            if agregado is not None:
+                agregado['contagem'] += 1
+                agregado['soma'] += valor
+                agregado['min'] = min(agregado['min'], valor)
+                agregado['max'] = max(agregado['max'], valor)
+        self.tamanho += 1
+
+    def _crescer(self, capacidade):
+        # Views devolvidas antes por coluna() continuam válidas (apontam para o array antigo)
+        for nome, array in self._arrays.items():
+            novo = np.empty(capacidade, dtype=array.dtype)
+            novo[:self.tamanho] = array[:self.tamanho]
+            self._arrays[nome] = novo
+        self.capacidade = capacidade
+
+    def _valor(self, nome, linha):
+        filtro = self._filtros.get(nome)
+        if filtro is None:
+            return linha[nome]
+        # Média móvel incremental (mesmo resultado de rolling(janela, min_periods=1).mean())
+        origem, janela, valores, _ = filtro
+        valores.append(linha[origem])
+        filtro[3] += linha[origem]
+        if len(valores) > janela:
+            filtro[3] -= valores.popleft()
+        return filtro[3] / len(valores)
+
+    def media_movel(self, nome, janela):
+        """Ativa (ou muda a janela de) "<nome>_filtrada"; só recalcula o histórico quando a janela muda."""
+        coluna_filtrada = f'{nome}_filtrada'
+        filtro = self._filtros.get(coluna_filtrada)
+        if filtro is not None and filtro[1] == janela:
+            return self.coluna(coluna_filtrada)
+        valores = self.coluna(nome).astype(np.float64)
+        soma = np.cumsum(valores)
+        soma_anterior = np.concatenate((np.zeros(janela), soma))[:len(soma)]  # soma até i - janela
+        filtrada = (soma - soma_anterior) / np.minimum(np.arange(1, len(valores) + 1), janela)
+        recentes = valores[-janela:].tolist()
+        self._filtros[coluna_filtrada] = [nome, janela, deque(recentes), float(sum(recentes))]
+        self.colunas[coluna_filtrada] = np.float64
+        array = np.empty(self.capacidade, dtype=np.float64)
+        array[:len(filtrada)] = filtrada
+        self._arrays[coluna_filtrada] = array
+        return self.coluna(coluna_filtrada)
+
+    def coluna(self, nome):
+        # View (sem cópia) das amostras gravadas; O(1) qualquer que seja o tamanho da sessão
+        return self._arrays[nome][:self.tamanho]
+
+    def ultima(self):
+        if self.tamanho == 0:
+            return None
+        return {nome: array[self.tamanho - 1].item() for nome, array in self._arrays.items()}
+
+    def media(self, nome):
+        agregado = self.agregados[nome]
+        return agregado['soma'] / agregado['contagem'] if agregado['contagem'] else None
+
+    def para_dataframe(self):
+        import pandas as pd  # só a página de médias usa; fora da partida do dashboard
+        return pd.DataFrame({nome: self.coluna(nome) for nome in self._arrays})
@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+# Mesma resolução que o st.pyplot usa no savefig
+DPI = 200
+# Compressão rápida: o PNG é refeito a cada atualização e descartado em seguida
+PNG_COMPRESS_LEVEL = 1
+
+
+class GraficoLinhas:
+    """Figura Matplotlib criada uma vez e reaproveitada a cada atualização.
+
+    A figura não passa pelo pyplot (matplotlib.figure.Figure + canvas Agg
+    próprio), então não fica presa no registro global de figuras: é liberada
+    junto com a sessão, ou antes por fechar(). A cada atualização só os dados
+    das linhas mudam (set_data). Enquanto os limites dos eixos não mudam, o
+    fundo (eixos, textos, grade, legenda) é restaurado de uma cópia e só as
+    linhas são redesenhadas (blitting). renderizar() devolve o PNG pronto para
+    o st.image, sem o savefig do st.pyplot (que refaz o desenho inteiro).
+    """
+
+    def __init__(self, figsize, dpi=DPI):
+        self.figura = Figure(figsize=figsize, dpi=dpi, layout="tight")
+        self.canvas = FigureCanvasAgg(self.figura)
+        self.eixo = self.figura.add_subplot()
+        self.linhas = {}
+        self.limites_x = None  # None: ajusta aos dados a cada atualização
+        self.limites_y = None
+        self._fundo = None
+        self._limites_fundo = None
+
+    def linha(self, nome, **estilo):
+        # animated=True: a linha fica fora do fundo e é desenhada por cima a cada quadro
+        self.linhas[nome], = self.eixo.plot([], [], animated=True, **estilo)
+        return self.linhas[nome]
+
+    def atualizar(self, **dados):
+        # nome=(x, y) para cada linha
+        for nome, (x, y) in dados.items():
+            self.eixo.xaxis.update_units(x)  # datas no eixo x, como o plot() faria
+            self.linhas[nome].set_data(x, y)
+        if self.limites_x is None or self.limites_y is None:
+            self.eixo.relim(visible_only=True)
+            self.eixo.autoscale_view(scalex=self.limites_x is None, scaley=self.limites_y is None)
+        if self.limites_x is not None:
+            self.eixo.set_xlim(self.limites_x)
+        if self.limites_y is not None:
+            self.eixo.set_ylim(self.limites_y)
+
+    def renderizar(self):
+        limites = (self.eixo.get_xlim(), self.eixo.get_ylim())
+        if self._fundo is None or limites != self._limites_fundo:
+            self.canvas.draw()
+            # O tight layout refaz o desenho para medir os textos: calculado só no primeiro quadro
+            self.figura.set_layout_engine("none")
+            self._fundo = self.canvas.copy_from_bbox(self.figura.bbox)
+            self._limites_fundo = limites
+        else:
+            self.canvas.restore_region(self._fundo)
+        for linha in self.linhas.values():
+            self.eixo.draw_artist(linha)
+        rgb = np.asarray(self.canvas.buffer_rgba())[:, :, :3]  # fundo opaco: o alfa só aumentaria o PNG
+        buffer = io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(rgb)).save(buffer, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+        return buffer.getvalue()
+
+    def fechar(self):
+        self.figura.clear()
+        self.linhas.clear()
+        self._fundo = None
+
+
+def fechar_graficos(estado, *chaves):
+    # Fecha e remove do session_state os gráficos que a página não usa mais
+    for chave in chaves:
+        grafico = estado.pop(chave, None)
+        if grafico is not None:
+            grafico.fechar()
@@ -0,0 +1,218 @@
+import copy
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+# Substituto em processo do Realtime Database (mesma interface usada de firebase_admin.db:
+# reference(), get(), set(), update(), child() e listen()). Serve para rodar os dashboards
+# e medir latência, vazão e queda de conexão sem rede nem credenciais.
+
+
+def _partes(caminho):
+    return [parte for parte in caminho.strip('/').split('/') if parte]
+
+
+def _caminho(partes):
+    return '/' + '/'.join(partes)
+
+
+class Evento:
+    """Mesmos atributos de firebase_admin.db.Event."""
+
+    def __init__(self, event_type, path, data):
+        self.event_type = event_type  # 'put' ou 'patch'
+        self.path = path  # relativo à referência escutada
+        self.data = data
+
+
+class RegistroLocal:
+    """Equivalente ao ListenerRegistration: entrega os eventos em uma thread própria."""
+
+    def __init__(self, banco, partes, callback):
+        self._banco = banco
+        self.partes = partes
+        self._callback = callback
+        self._fila = queue.Queue()
+        self._fechado = threading.Event()
+        self._thread = threading.Thread(target=self._entregar, name=f"listener{_caminho(partes)}", daemon=True)
+        self._thread.start()
+
+    def _entregar(self):
+        while not self._fechado.is_set():
+            try:
+                evento = self._fila.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if evento is None:  # conexão caiu
+                return
+            entrega, evento = evento
+            # Atraso de rede contado a partir da escrita (eventos seguidos não se somam)
+            espera = entrega - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            if not self._fechado.is_set():
+                self._callback(evento)
+
+    def _enviar(self, evento):
+        self._fila.put((time.monotonic() + self._banco.latencia, evento))
+
+    def close(self):
+        self._fechado.set()
+        self._banco._remover(self)
+
+
+class ReferenciaLocal:
+    def __init__(self, banco, partes):
+        self._banco = banco
+        self._partes = partes
+
+    @property
+    def path(self):
+        return _caminho(self._partes)
+
+    @property
+    def key(self):
+        return self._partes[-1] if self._partes else None
+
+    def child(self, caminho):
+        return ReferenciaLocal(self._banco, self._partes + _partes(caminho))
+
+    def get(self):
+        return self._banco._ler(self._partes)
+
+    def set(self, valor):
+        self._banco._escrever(self._partes, valor)
+
+    def update(self, valores):
+        self._banco._atualizar(self._partes, valores)
+
+    def listen(self, callback):
+        return self._banco._escutar(self._partes, callback)
+
+
+class BancoLocal:
+    """Árvore JSON em memória com latência e quedas de conexão simuladas.
+
+    latencia: segundos de espera em cada operação (get/set/update) e em cada
+    evento entregue a um listener. falhar() derruba os listeners ativos e faz
+    as próximas operações levantarem ConnectionError até restaurar().
+    """
+
+    def __init__(self, dados=None, latencia=0.0):
+        self.latencia = latencia
+        self._dados = copy.deepcopy(dados) if dados is not None else {}
+        self._lock = threading.Lock()
+        self._registros = []
+        self._fora_do_ar = False
+
+    def reference(self, caminho='/'):
+        return ReferenciaLocal(self, _partes(caminho))
+
+    def falhar(self):
+        with self._lock:
+            self._fora_do_ar = True
+            registros, self._registros = self._registros, []
+        for registro in registros:
+            registro._fila.put(None)
+
+    def restaurar(self):
+        self._fora_do_ar = False
+
+    # === OPERAÇÕES ===
+    def _verificar(self):
+        time.sleep(self.latencia)
+        if self._fora_do_ar:
+            raise ConnectionError("Realtime Database local fora do ar")
+
+    def _no(self, partes):
+        no = self._dados
+        for parte in partes:
+            if not isinstance(no, dict) or parte not in no:
+                return None
+            no = no[parte]
+        return no
+
+    def _ler(self, partes):
+        self._verificar()
+        with self._lock:
+            return copy.deepcopy(self._no(partes))
+
+    def _gravar(self, partes, valor):
+        # None apaga o nó, como no Firebase
+        if not partes:
+            self._dados = valor if isinstance(valor, dict) else {}
+            return
+        pai = self._dados
+        for parte in partes[:-1]:
+            if not isinstance(pai.get(parte), dict):
+                pai[parte] = {}
+            pai = pai[parte]
+        if valor is None:
+            pai.pop(partes[-1], None)
+        else:
+            pai[partes[-1]] = valor
+
+    def _escrever(self, partes, valor):
+        self._verificar()
+        valor = copy.deepcopy(valor)
+        with self._lock:
+            self._gravar(partes, valor)
+            self._notificar(partes, 'put', valor)
+
+    def _atualizar(self, partes, valores):
+        self._verificar()
+        valores = copy.deepcopy(valores)
+        with self._lock:
+            for chave, valor in valores.items():
+                self._gravar(partes + _partes(chave), valor)
+            self._notificar(partes, 'patch', valores)
+
+    def _notificar(self, partes, tipo, valor):
+        # Chamado com o lock: cada listener recebe o evento relativo ao caminho que escuta
+        for registro in self._registros:
+            escutado = registro.partes
+            if partes[:len(escutado)] == escutado:
+                evento = Evento(tipo, _caminho(partes[len(escutado):]), copy.deepcopy(valor))
+            elif escutado[:len(partes)] == partes:
+                # Escrita acima do caminho escutado: o listener recebe a subárvore dele inteira
+                evento = Evento('put', '/', copy.deepcopy(self._no(escutado)))
+            else:
+                continue
+            registro._enviar(evento)
+
+    def _escutar(self, partes, callback):
+        self._verificar()
+        with self._lock:
+            registro = RegistroLocal(self, partes, callback)
+            # Como no Firebase, o primeiro evento traz o valor atual
+            registro._enviar(Evento('put', '/', copy.deepcopy(self._no(partes))))
+            self._registros.append(registro)
+        return registro
+
+    def _remover(self, registro):
+        with self._lock:
+            if registro in self._registros:
+                self._registros.remove(registro)
+
+
+def simular_paciente(referencia, intervalo=1.0, parar=None):
+    """Grava leituras simuladas do paciente na referência a cada `intervalo` s (thread daemon)."""
+    parar = parar or threading.Event()
+
+    def executar():
+        while not parar.is_set():
+            try:
+                referencia.set({
+                    'heart_rate': random.randint(60, 100),
+                    'spo2': random.randint(95, 100),
+                    'temperature': round(random.normalvariate(36.5, 0.5), 1),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except ConnectionError:
+                pass
+            parar.wait(intervalo)
+
+    threading.Thread(target=executar, name="simulador-paciente", daemon=True).start()
+    return parar
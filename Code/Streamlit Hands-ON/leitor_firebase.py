@@ -0,0 +1,113 @@
+import copy
+import random
+import threading
+import time
+
+# Espera entre tentativas de reabrir o listener: BASE_BACKOFF * 2^(n-1), até MAX_BACKOFF
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30
+# De quanto em quanto tempo a thread confere se o listener continua de pé
+VERIFICAR_CADA = 1.0
+
+
+def _aplicar(dados, caminho, valor):
+    # Grava `valor` em `caminho` (relativo à raiz escutada); None apaga o nó, como no Firebase
+    partes = [parte for parte in caminho.strip('/').split('/') if parte]
+    if not partes:
+        return valor
+    if not isinstance(dados, dict):
+        dados = {}
+    no = dados
+    for parte in partes[:-1]:
+        if not isinstance(no.get(parte), dict):
+            no[parte] = {}
+        no = no[parte]
+    if valor is None:
+        no.pop(partes[-1], None)
+    else:
+        no[partes[-1]] = valor
+    return dados
+
+
+def _ativo(registro):
+    # O ListenerRegistration não expõe o estado da conexão; a thread dele termina quando o stream cai
+    thread = getattr(registro, '_thread', None)
+    return thread is None or thread.is_alive()
+
+
+class LeitorFirebase:
+    """Último valor de uma referência do Realtime Database, mantido por um listener.
+
+    O listener é aberto uma vez (reference.listen) e cada evento put/patch
+    atualiza o cache local, então ultimo() nunca espera pela rede. Se o
+    listener não abre ou cai, uma thread tenta de novo com backoff exponencial;
+    enquanto isso ultimo() continua devolvendo o último valor recebido, com a
+    idade dele (em vez de trocar por dados aleatórios).
+
+    Funciona com firebase_admin.db.reference(...) ou com o BancoLocal de
+    firebase_local.py.
+    """
+
+    def __init__(self, referencia, verificar_cada=VERIFICAR_CADA):
+        self.referencia = referencia
+        self.verificar_cada = verificar_cada
+        self.eventos = 0
+        self.falhas = 0
+        self.ultimo_erro = None
+        self.conectado = False
+        self._dados = None
+        self._recebido_em = None
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name=f"leitor-firebase{referencia.path}", daemon=True)
+        self._thread.start()
+
+    def idade(self):
+        # Segundos desde o último evento recebido (None se nenhum chegou ainda)
+        if self._recebido_em is None:
+            return None
+        return time.monotonic() - self._recebido_em
+
+    def ultimo(self):
+        """(cópia do último valor, idade em s); (None, None) antes do primeiro evento."""
+        with self._lock:
+            return copy.deepcopy(self._dados), self.idade()
+
+    def parar(self):
+        self._parar.set()
+
+    # === THREAD ===
+    def _evento(self, evento):
+        with self._lock:
+            if evento.event_type == 'patch':
+                for chave, valor in (evento.data or {}).items():
+                    self._dados = _aplicar(self._dados, f"{evento.path}/{chave}", valor)
+            else:
+                self._dados = _aplicar(self._dados, evento.path, evento.data)
+            self._recebido_em = time.monotonic()
+            self.eventos += 1
+        self.falhas = 0
+        self.ultimo_erro = None
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                registro = self.referencia.listen(self._evento)
+            except Exception as e:
+                self._esperar(e)
+                continue
+            self.conectado = True
+            try:
+                while not self._parar.is_set() and _ativo(registro):
+                    self._parar.wait(self.verificar_cada)
+            finally:
+                self.conectado = False
+                registro.close()
+            if not self._parar.is_set():
+                self._esperar(ConnectionError("Listener do Firebase encerrado"))
+
+    def _esperar(self, erro):
+        self.falhas += 1
+        self.ultimo_erro = str(erro)
+        espera = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (self.falhas - 1))
+        self._parar.wait(espera * random.uniform(0.5, 1.0))  # jitter: sessões não reconectam juntas
@@ -0,0 +1,105 @@
+import os
+import pickle
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+# Modelo treinado fora do dashboard (ver o __main__ abaixo); outro arquivo pode ser indicado pela variável
+CAMINHO_MODELO = os.environ.get("MODELO_RISCO", os.path.join(PASTA, "modelo_risco.pkl"))
+# Memória máxima de cada lote do predict_proba (entrada + probabilidades)
+MAX_BYTES_LOTE = 64 * 1024 ** 2
+
+
+class ModeloRisco:
+    """Modelo de risco (predict_proba do scikit-learn) carregado uma vez por processo.
+
+    pontuar() recebe um DataFrame e devolve as probabilidades de cada classe
+    (linhas x classes, float32), processando em lotes de no máximo
+    `max_bytes_lote` bytes. Mede a vazão acumulada em linhas_por_segundo.
+    """
+
+    def __init__(self, modelo, colunas=None, max_bytes_lote=MAX_BYTES_LOTE):
+        self.modelo = modelo
+        self.colunas = list(colunas if colunas is not None else modelo.feature_names_in_)
+        self.classes = list(modelo.classes_)
+        self.nomes = [f"risco_{classe}" for classe in self.classes]
+        # Por linha: entrada em float32 e as probabilidades em float64 (soma das árvores + resultado)
+        por_linha = 4 * len(self.colunas) + 2 * 8 * len(self.classes)
+        self.tamanho_lote = max(1, max_bytes_lote // por_linha)
+        self.linhas = 0
+        self.segundos = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_MODELO, **kwargs):
+        with open(caminho, "rb") as arquivo:
+            return cls(pickle.load(arquivo), **kwargs)
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas / self.segundos if self.segundos else None
+
+    def faltando(self, df):
+        return [nome for nome in self.colunas if nome not in df]
+
+    def pontuar(self, df):
+        inicio = time.perf_counter()
+        entrada = df[self.colunas]
+        riscos = np.empty((len(df), len(self.classes)), dtype=np.float32)
+        for i in range(0, len(df), self.tamanho_lote):
+            riscos[i:i + self.tamanho_lote] = self.modelo.predict_proba(entrada.iloc[i:i + self.tamanho_lote])
+        with self._lock:
+            self.linhas += len(df)
+            self.segundos += time.perf_counter() - inicio
+        return riscos
+
+    def pontuar_registros(self, registros):
+        """Registros avulsos (ex.: leituras do stream), como lista de dicionários."""
+        return self.pontuar(pd.DataFrame.from_records(registros, columns=self.colunas))
+
+    def com_riscos(self, df, riscos):
+        # Cópia de df com uma coluna risco_<classe> por classe
+        return df.assign(**{nome: riscos[:, i] for i, nome in enumerate(self.nomes)})
+
+
+class RiscosTabela:
+    """Riscos das linhas de uma tabela carregada, calculados só quando pedidos.
+
+    Cada linha passa pelo modelo uma vez; reruns que mostram as mesmas linhas
+    (ou parte delas) só leem o que já foi calculado.
+    """
+
+    def __init__(self, modelo, df):
+        self.modelo = modelo
+        self.df = df
+        self._riscos = np.full((len(df), len(modelo.classes)), np.nan, dtype=np.float32)
+        self._calculadas = np.zeros(len(df), dtype=bool)
+        self._lock = threading.Lock()
+
+    def riscos(self, linhas):
+        """Riscos das posições `linhas` (np.ndarray de inteiros), na mesma ordem."""
+        with self._lock:
+            faltam = linhas[~self._calculadas[linhas]]
+            if faltam.size:
+                self._riscos[faltam] = self.modelo.pontuar(self.df.iloc[faltam])
+                self._calculadas[faltam] = True
+            return self._riscos[linhas]
+
+
+if __name__ == '__main__':
+    # Treino offline: python modelo_risco.py dados.csv coluna_alvo [modelo_risco.pkl]
+    from sklearn.ensemble import RandomForestClassifier
+
+    csv, alvo = sys.argv[1], sys.argv[2]
+    destino = sys.argv[3] if len(sys.argv) > 3 else CAMINHO_MODELO
+    dados = pd.read_csv(csv)
+    colunas = [nome for nome in dados.select_dtypes("number").columns if nome != alvo]
+    modelo = RandomForestClassifier(n_estimators=100, max_depth=12, n_jobs=-1, random_state=0)
+    modelo.fit(dados[colunas], dados[alvo])
+    with open(destino, "wb") as arquivo:
+        pickle.dump(modelo, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"Modelo com {len(colunas)} colunas ({', '.join(colunas)}) salvo em {destino}")
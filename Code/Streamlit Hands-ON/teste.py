@@ -1,19 +1,21 @@
 import streamlit as st
-import matplotlib.pyplot as plt
 import numpy as np
 import time
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, db
 import os
+import sys
 from PIL import Image
 
-# Configuração inicial do Firebase (substitua com suas credenciais)
-if not firebase_admin._apps:
-    cred = credentials.Certificate("C:\\Users\\ALUNOS MALOCA\\Documents\\Dashboad_Arkham\\serviceAccountKey.json")  # Arquivo de credenciais do Firebase
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://monitoramento-bpm-e-temp-default-rtdb.firebaseio.com'  # URL do seu banco de dados Firebase
-    })
+# Módulos compartilhados com o Monitoramento-Arkham (ECG sintético)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoramento-Arkham"))
+from ecg import ECGGenerator
+from figuras import GraficoLinhas
+from leitor_firebase import LeitorFirebase
+
+# FIREBASE_LOCAL=1 usa o banco em memória de firebase_local.py (sem rede nem credenciais)
+FIREBASE_LOCAL = os.environ.get("FIREBASE_LOCAL") == "1"
+# Leituras mais velhas que isso (s) são mostradas com aviso
+DADOS_ANTIGOS = 10
 
 # Configuração da página
 st.set_page_config(page_title="Monitoramento de Paciente", page_icon="🩺", layout="wide")
@@ -90,45 +92,38 @@ st.markdown("---")
 
 # Função para simular dados de ECG
 def generate_ecg_data(heart_rate=72, duration=5, fs=250):
-    t = np.linspace(0, duration, int(duration * fs))
-    
-    # Parâmetros do ECG
-    hr = heart_rate
-    rr = 60 / hr  # Intervalo RR em segundos
-    
-    # Componentes do ECG
-    p_wave = 0.25 * np.sin(2 * np.pi * 0.7 * t)
-    qrs_complex = 1.5 * np.sin(2 * np.pi * 15 * t) * np.exp(-20 * (t % rr))
-    t_wave = 0.3 * np.sin(2 * np.pi * 0.3 * t)
-    
-    # Combina os componentes
-    ecg = p_wave + qrs_complex + t_wave
-    
-    # Adiciona ruído
-    noise = 0.05 * np.random.normal(size=len(t))
-    ecg += noise
-    
-    return t, ecg
+    # Janela de `duration` s continuando o traçado anterior (batimento em cache, ver ecg.py)
+    if 'ecg_generator' not in st.session_state or st.session_state.ecg_generator.fs != fs:
+        st.session_state.ecg_generator = ECGGenerator(fs=fs, noise=0.05)
+    n = int(duration * fs)
+    return np.arange(n) / fs, st.session_state.ecg_generator.next(n, heart_rate, amplitude=1.5)
+
+# Referência do /paciente, escolhida no primeiro uso: banco em memória (FIREBASE_LOCAL=1) ou Firebase real
+def get_patient_reference():
+    if FIREBASE_LOCAL:
+        from firebase_local import BancoLocal, simular_paciente
+        ref = BancoLocal().reference('/paciente')
+        simular_paciente(ref)
+        return ref
 
-# Função para obter dados do Firebase
+    # Configuração inicial do Firebase (substitua com suas credenciais)
+    import firebase_admin
+    from firebase_admin import credentials, db
+    if not firebase_admin._apps:
+        cred = credentials.Certificate("C:\\Users\\ALUNOS MALOCA\\Documents\\Dashboad_Arkham\\serviceAccountKey.json")  # Arquivo de credenciais do Firebase
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': 'https://monitoramento-bpm-e-temp-default-rtdb.firebaseio.com'  # URL do seu banco de dados Firebase
+        })
+    return db.reference('/paciente')
+
+# Listener do /paciente aberto uma vez por processo e compartilhado pelas sessões (ver leitor_firebase.py)
+@st.cache_resource
+def get_firebase_reader():
+    return LeitorFirebase(get_patient_reference())
+
+# Função para obter dados do Firebase: último valor em cache e sua idade (s), sem esperar pela rede
 def get_firebase_data():
-    try:
-        ref = db.reference('/paciente')
-        data = ref.get()
-        return data or {
-            'heart_rate': 72,
-            'spo2': 98,
-            'temperature': 36.5,
-            'timestamp': datetime.now().isoformat()
-        }
-    except:
-        # Retorna dados simulados se houver erro na conexão
-        return {
-            'heart_rate': np.random.randint(60, 100),
-            'spo2': np.random.randint(95, 100),
-            'temperature': round(np.random.normal(36.5, 0.5), 1),
-            'timestamp': datetime.now().isoformat()
-        }
+    return get_firebase_reader().ultimo()
 
 # Layout principal
 col1, col2, col3 = st.columns(3)
@@ -136,53 +131,77 @@ col1, col2, col3 = st.columns(3)
 # Atualização em tempo real
 placeholder = st.empty()
 
-while True:
-    # Obter dados do Firebase
-    data = get_firebase_data()
+try:
+    get_firebase_reader()
+except ImportError:
+    placeholder.error("Pacote firebase_admin não instalado. Instale-o ou rode com FIREBASE_LOCAL=1 "
+                      "para usar o banco em memória.")
+    st.stop()
+
+# Figura do ECG criada uma vez e reaproveitada a cada atualização (ver figuras.py)
+grafico_ecg = GraficoLinhas(figsize=(10, 4))
+grafico_ecg.linha('ecg', color='green')
+grafico_ecg.eixo.set_xlabel('Tempo (s)')
+grafico_ecg.eixo.set_ylabel('Amplitude')
+grafico_ecg.eixo.grid(True)
+grafico_ecg.limites_x = (0, 5)  # janela fixa: só as linhas são redesenhadas
+grafico_ecg.limites_y = (-1, 2)
+
+try:
+    while True:
+        # Obter dados do Firebase
+        data, age = get_firebase_data()
+        if data is None:
+            erro = get_firebase_reader().ultimo_erro
+            placeholder.info("Aguardando dados do Firebase..." + (f" ({erro})" if erro else ""))
+            time.sleep(2)
+            continue
     
-    with placeholder.container():
-        # Métricas
-        col1, col2, col3 = st.columns(3)
+        with placeholder.container():
+            if age > DADOS_ANTIGOS:
+                st.warning(f"Sem novos dados do Firebase há {age:.0f} s; mostrando a última leitura recebida.")
+
+            # Métricas
+            col1, col2, col3 = st.columns(3)
         
-        with col1:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-title">Frequência Cardíaca</div>
-                <div class="metric-value">{}</div>
-                <div class="metric-unit">bpm</div>
-            </div>
-            """.format(data['heart_rate']), unsafe_allow_html=True)
+            with col1:
+                st.markdown("""
+                <div class="metric-card">
+                    <div class="metric-title">Frequência Cardíaca</div>
+                    <div class="metric-value">{}</div>
+                    <div class="metric-unit">bpm</div>
+                </div>
+                """.format(data['heart_rate']), unsafe_allow_html=True)
         
-        with col2:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-title">Oxigênio no Sangue</div>
-                <div class="metric-value">{}</div>
-                <div class="metric-unit">% SpO2</div>
-            </div>
-            """.format(data['spo2']), unsafe_allow_html=True)
+            with col2:
+                st.markdown("""
+                <div class="metric-card">
+                    <div class="metric-title">Oxigênio no Sangue</div>
+                    <div class="metric-value">{}</div>
+                    <div class="metric-unit">% SpO2</div>
+                </div>
+                """.format(data['spo2']), unsafe_allow_html=True)
         
-        with col3:
-            st.markdown("""
-            <div class="metric-card">
-                <div class="metric-title">Temperatura</div>
-                <div class="metric-value">{}</div>
-                <div class="metric-unit">°C</div>
-            </div>
-            """.format(data['temperature']), unsafe_allow_html=True)
+            with col3:
+                st.markdown("""
+                <div class="metric-card">
+                    <div class="metric-title">Temperatura</div>
+                    <div class="metric-value">{}</div>
+                    <div class="metric-unit">°C</div>
+                </div>
+                """.format(data['temperature']), unsafe_allow_html=True)
         
-        # Gráfico de ECG
-        st.markdown("### Eletrocardiograma (ECG)")
-        t, ecg = generate_ecg_data(data['heart_rate'])
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(t, ecg, color='green')
-        ax.set_xlabel('Tempo (s)')
-        ax.set_ylabel('Amplitude')
-        ax.grid(True)
-        st.pyplot(fig)
+            # Gráfico de ECG
+            st.markdown("### Eletrocardiograma (ECG)")
+            t, ecg = generate_ecg_data(data['heart_rate'])
+            grafico_ecg.atualizar(ecg=(t, ecg))
+            st.image(grafico_ecg.renderizar())
         
-        # Data e hora da última atualização
-        st.caption(f"Última atualização: {datetime.fromisoformat(data['timestamp']).strftime('%d/%m/%Y %H:%M:%S')}")
+            # Data e hora da última atualização
+            st.caption(f"Última atualização: {datetime.fromisoformat(data['timestamp']).strftime('%d/%m/%Y %H:%M:%S')}")
     
-    # Atualizar a cada 2 segundos
-    time.sleep(2)
\ No newline at end of file
+        # Atualizar a cada 2 segundos
+        time.sleep(2)
+finally:
+    # Sessão encerrada (o Streamlit interrompe o script): libera a figura
+    grafico_ecg.fechar()
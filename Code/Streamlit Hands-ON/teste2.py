@@ -1,9 +1,15 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime, timedelta
 import time
+import os
+import sys
+
+# Módulos compartilhados com o Monitoramento-Arkham (ECG sintético)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Monitoramento-Arkham"))
+from ecg import ECGGenerator, SweepBuffer
+from dados_sessao import DadosSessao
+from figuras import GraficoLinhas, fechar_graficos
 
 st.set_page_config(layout="wide",
                    initial_sidebar_state="expanded",
@@ -64,16 +70,11 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Função de média móvel
-def media_movel(series, janela=5):
-    return series.rolling(window=janela, min_periods=1).mean()
-
-# Simular ECG (visual, não real)
-def simular_ecg(tamanho=500):
-    t = np.linspace(0, 3 * np.pi, tamanho)
-    ecg = np.sin(1.5 * t) + 0.1 * np.random.randn(tamanho)
-    ecg[::50] += 2  # "pico" tipo batimento
-    return ecg
+# Simular ECG (visual, não real): continua o traçado a partir do batimento em cache (ver ecg.py)
+def simular_ecg(tamanho=500, bpm=75):
+    if 'gerador_ecg' not in st.session_state:
+        st.session_state.gerador_ecg = ECGGenerator(fs=100, noise=0.1)
+    return st.session_state.gerador_ecg.next(tamanho, bpm, amplitude=2)
 
 # Sidebar para páginas
 st.sidebar.image("D:\Faculdade\Maloca das iCoisas\Hands-ON Advanced\logo_Arkham.jpg")
@@ -81,9 +82,14 @@ pagina = st.sidebar.radio("Navegar para:", ["Monitoramento em Tempo Real", "Méd
 st.sidebar.image("D:\Faculdade\Maloca das iCoisas\Hands-ON Advanced\logo_maloca.jpg")
 
 
-# DataFrame Global
+# Dados da sessão (colunas em blocos; ver dados_sessao.py)
 if 'dados' not in st.session_state:
-    st.session_state.dados = pd.DataFrame(columns=['tempo', 'frequencia_cardiaca', 'temperatura', 'oxigenacao'])
+    st.session_state.dados = DadosSessao({
+        'tempo': 'datetime64[us]',
+        'frequencia_cardiaca': np.float64,
+        'temperatura': np.float64,
+        'oxigenacao': np.float64
+    })
     st.session_state.tempo_atual = datetime.now()
 
 # Página 1: Monitoramento em Tempo Real
@@ -110,36 +116,39 @@ if pagina == "Monitoramento em Tempo Real":
             'oxigenacao': np.clip(prev['oxigenacao'] + np.random.normal(0, 0.2), 94, 100)
         }
 
-    # Simular novo ponto
-    prev = st.session_state.dados.iloc[-1] if not st.session_state.dados.empty else None
-    novo = novo_dado(prev)
+    # Simular novo ponto (O(1): sem copiar o histórico)
+    dados = st.session_state.dados
+    novo = novo_dado(dados.ultima())
     st.session_state.tempo_atual += timedelta(seconds=atualizar_cada)
     novo['tempo'] = st.session_state.tempo_atual
-    st.session_state.dados = pd.concat([st.session_state.dados, pd.DataFrame([novo])], ignore_index=True)
-
-    # Gráfico temperatura com média móvel
-    dados = st.session_state.dados.copy()
-    dados['temperatura_filtrada'] = media_movel(dados['temperatura'], janela=janela_filtro)
+    dados.media_movel('temperatura', janela_filtro)  # recalcula o histórico só se a janela mudou
+    dados.adicionar(novo)
+    ultima = dados.ultima()
 
+    # Gráfico temperatura com média móvel (figura criada uma vez por sessão, ver figuras.py)
     with grafico_container.container():
-        fig, ax = plt.subplots(figsize=(10, 4))
-        ax.plot(dados['tempo'], dados['temperatura'], label='Temperatura Original', color='red', alpha=0.5)
-        ax.plot(dados['tempo'], dados['temperatura_filtrada'], label='Temperatura Filtrada', color='green', linewidth=2)
-        ax.set_ylabel("Temperatura (°C)")
-        ax.set_title("Temperatura Corporal")
-        ax.legend()
-        st.pyplot(fig)
+        if 'grafico_temperatura' not in st.session_state:
+            grafico = GraficoLinhas(figsize=(10, 4))
+            grafico.linha('original', label='Temperatura Original', color='red', alpha=0.5)
+            grafico.linha('filtrada', label='Temperatura Filtrada', color='green', linewidth=2)
+            grafico.eixo.set_ylabel("Temperatura (°C)")
+            grafico.eixo.set_title("Temperatura Corporal")
+            grafico.eixo.legend()
+            st.session_state.grafico_temperatura = grafico
+        grafico = st.session_state.grafico_temperatura
+        grafico.atualizar(original=(dados.coluna('tempo'), dados.coluna('temperatura')),
+                          filtrada=(dados.coluna('tempo'), dados.coluna('temperatura_filtrada')))
+        st.image(grafico.renderizar())
 
     # Métricas
     with metricas_container.container():
-        st.metric("🌡Temperatura", f"{dados['temperatura'].iloc[-1]:.1f} °C")
-        st.metric("📉Frequência Cardíaca", f"{dados['frequencia_cardiaca'].iloc[-1]:.0f} BPM")
-        st.metric("🔴Oxigenação", f"{dados['oxigenacao'].iloc[-1]:.0f} %")
+        st.metric("🌡Temperatura", f"{ultima['temperatura']:.1f} °C")
+        st.metric("📉Frequência Cardíaca", f"{ultima['frequencia_cardiaca']:.0f} BPM")
+        st.metric("🔴Oxigenação", f"{ultima['oxigenacao']:.0f} %")
 
         st.subheader("Alertas")
 
         alertas = []
-        ultima = dados.iloc[-1]
 
         if ultima['frequencia_cardiaca'] < 60 or ultima['frequencia_cardiaca'] > 100:
             alertas.append("⚠️ Frequência Cardíaca fora do normal!")
@@ -158,43 +167,42 @@ if pagina == "Monitoramento em Tempo Real":
 
     # ECG
     with ecg_container.container():
-        ecg = simular_ecg(100)
+        # Tela de 5 s em modo varredura: grava no ponteiro, sem np.roll (ver SweepBuffer em ecg.py)
         if 'ecg_buffer' not in st.session_state:
-            st.session_state.ecg_buffer = ecg
-        else:
-            st.session_state.ecg_buffer = np.roll(st.session_state.ecg_buffer, -len(ecg))
-            st.session_state.ecg_buffer[-len(ecg):] = ecg
-
-        fig_ecg, ax_ecg = plt.subplots(figsize=(10, 2))
-        ax_ecg.plot(st.session_state.ecg_buffer, color='blue')
-        ax_ecg.set_title("Gráfico ECG")
-        ax_ecg.axis("off")
-        st.pyplot(fig_ecg)
+            st.session_state.ecg_buffer = SweepBuffer(500, fs=100)
+        st.session_state.ecg_buffer.write(simular_ecg(100, ultima['frequencia_cardiaca']))
+        tempo_ecg, sinal_ecg = st.session_state.ecg_buffer.sweep()
+
+        if 'grafico_ecg' not in st.session_state:
+            grafico_ecg = GraficoLinhas(figsize=(10, 2))
+            grafico_ecg.linha('ecg', color='blue')
+            grafico_ecg.eixo.set_title("Gráfico ECG")
+            grafico_ecg.eixo.axis("off")
+            grafico_ecg.limites_x = (0, 5)  # tela fixa: só o traçado é redesenhado
+            grafico_ecg.limites_y = (-1, 2.5)
+            st.session_state.grafico_ecg = grafico_ecg
+        st.session_state.grafico_ecg.atualizar(ecg=(tempo_ecg, sinal_ecg))
+        st.image(st.session_state.grafico_ecg.renderizar())
 
 
 # Página 2: Médias dos Dados
 elif pagina == "Médias dos Dados":
     st.title("📊 Médias dos Sinais Vitais Registrados")
 
-    if not st.session_state.dados.empty:
-        df = st.session_state.dados
+    dados = st.session_state.dados
+    if not dados.vazio:
+        # Médias dos agregados acumulados na chegada de cada amostra: O(1), sem percorrer o histórico
         st.write("### Médias")
         col1, col2, col3 = st.columns(3)
-        col1.metric("Temperatura Média", f"{df['temperatura'].mean():.2f} °C")
-        col2.metric("Frequência Média", f"{df['frequencia_cardiaca'].mean():.1f} BPM")
-        col3.metric("Oxigenação Média", f"{df['oxigenacao'].mean():.1f} %")
-
-        # Garantir os tipos corretos e remover linhas com valores inválidos
-        df_filtrado = df[['tempo', 'temperatura', 'frequencia_cardiaca', 'oxigenacao']].copy()
-        df_filtrado['tempo'] = pd.to_datetime(df_filtrado['tempo'], errors='coerce')
-        df_filtrado['temperatura'] = pd.to_numeric(df_filtrado['temperatura'], errors='coerce')
-        df_filtrado['frequencia_cardiaca'] = pd.to_numeric(df_filtrado['frequencia_cardiaca'], errors='coerce')
-        df_filtrado['oxigenacao'] = pd.to_numeric(df_filtrado['oxigenacao'], errors='coerce')
-
-        df_filtrado = df_filtrado.dropna()  # remove valores inválidos
-        df_filtrado = df_filtrado.set_index('tempo')
+        col1.metric("Temperatura Média", f"{dados.media('temperatura'):.2f} °C")
+        col2.metric("Frequência Média", f"{dados.media('frequencia_cardiaca'):.1f} BPM")
+        col3.metric("Oxigenação Média", f"{dados.media('oxigenacao'):.1f} %")
 
     else:
         st.info("Nenhum dado ainda foi registrado.")
+# Fora do monitoramento as figuras não são usadas: libera a memória delas
+if pagina != "Monitoramento em Tempo Real":
+    fechar_graficos(st.session_state, 'grafico_temperatura', 'grafico_ecg')
+
 if pagina == "Sobre o Projeto":
     st.title("📚 Sobre o Projeto de monitoramento equipe Arkham")